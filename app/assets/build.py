@@ -0,0 +1,71 @@
+"""
+Сборка статических файлов.
+
+Копирует JS и CSS из app/static в app/static/dist с хешем содержимого в имени,
+рядом кладет сжатые варианты .gz и .br (если установлен brotli) и записывает
+manifest.json с соответствием исходных путей собранным:
+
+    python -m app.assets.build
+"""
+import gzip
+import hashlib
+import json
+import shutil
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - без brotli собираются только .gz
+    brotli = None
+
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+DIST_DIR = STATIC_DIR / "dist"
+MANIFEST_PATH = DIST_DIR / "manifest.json"
+
+# Каталоги внутри app/static, файлы которых проходят сборку
+SOURCE_DIRS = ("js", "styles")
+HASH_LENGTH = 12
+
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def build() -> dict:
+    """
+    Собирает статические файлы и возвращает манифест.
+    """
+    if DIST_DIR.exists():
+        shutil.rmtree(DIST_DIR)
+
+    manifest = {}
+    for source_dir in SOURCE_DIRS:
+        for source in sorted((STATIC_DIR / source_dir).rglob("*")):
+            if not source.is_file():
+                continue
+            data = source.read_bytes()
+            relative = source.relative_to(STATIC_DIR)
+            hashed = relative.with_name(
+                f"{relative.stem}.{fingerprint(data)}{relative.suffix}"
+            )
+            target = DIST_DIR / hashed
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+            # mtime=0 делает .gz воспроизводимым между сборками
+            target.with_name(target.name + ".gz").write_bytes(
+                gzip.compress(data, compresslevel=9, mtime=0)
+            )
+            if brotli is not None:
+                target.with_name(target.name + ".br").write_bytes(
+                    brotli.compress(data, quality=11)
+                )
+            manifest[relative.as_posix()] = f"dist/{hashed.as_posix()}"
+
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+if __name__ == "__main__":
+    for source, target in build().items():
+        print(f"{source} -> {target}")
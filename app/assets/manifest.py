@@ -0,0 +1,30 @@
+import json
+from functools import lru_cache
+
+from app.assets.build import MANIFEST_PATH
+
+
+STATIC_URL = "/static/"
+
+
+@lru_cache
+def load_manifest() -> dict:
+    """
+    Загружает манифест собранных файлов. Без сборки возвращает пустой словарь.
+    """
+    try:
+        return json.loads(MANIFEST_PATH.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(path: str) -> str:
+    """
+    Возвращает URL статического файла с хешем содержимого.
+
+    Если файл не собран (например, при локальной разработке без
+    python -m app.assets.build), возвращается URL исходного файла.
+
+    :param path: Путь относительно app/static, например "js/chat.js".
+    """
+    return STATIC_URL + load_manifest().get(path, path)
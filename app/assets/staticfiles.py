@@ -0,0 +1,62 @@
+from mimetypes import guess_type
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+
+
+# Собранные файлы содержат хеш в имени и никогда не меняются
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Предпочтение отдается brotli, затем gzip
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(scope: Scope) -> set:
+    """
+    Возвращает кодировки из Accept-Encoding, не запрещенные через q=0.
+    """
+    encodings = set()
+    for item in Headers(scope=scope).get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        key, _, value = params.strip().partition("=")
+        try:
+            quality = float(value) if key.strip() == "q" else 1.0
+        except ValueError:
+            quality = 1.0
+        if name and quality > 0:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles, который для собранных файлов (dist/) отдает заранее сжатые
+    варианты .br/.gz по Accept-Encoding и разрешает вечное кэширование.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if not path.startswith("dist/") or response.status_code != 200:
+            return response
+
+        encodings = accepted_encodings(scope)
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in encodings:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, path + suffix
+            )
+            if stat_result is not None:
+                response = FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=guess_type(path)[0],
+                    headers={"Content-Encoding": encoding},
+                )
+                break
+
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
@@ -1,10 +1,26 @@
+from kombu import Queue
+
 from app.config import settings
 
+# Очереди задач: каждая обслуживается своим пулом воркеров (см. docker-compose.yml),
+# поэтому очередь писем не задерживает уведомления Telegram
+EMAIL_QUEUE = "email"
+NOTIFICATIONS_QUEUE = "notifications"
+
 broker = settings.CELERY_BROKER_URL
-result_backend = settings.REDIS_URL
+# Результаты задач не читаются, по умолчанию backend не используется
+result_backend = settings.CELERY_RESULT_BACKEND or None
 broker_connection_retry_on_startup = True
-task_serializer = "json"
-result_serializer = "json"
-accept_content = ["json"]
+task_serializer = settings.CELERY_TASK_SERIALIZER
+result_serializer = settings.CELERY_TASK_SERIALIZER
+accept_content = ["json", "msgpack"]
+task_compression = settings.CELERY_TASK_COMPRESSION or None
 timezone = "UTC"
 enable_utc = True
+
+task_default_queue = NOTIFICATIONS_QUEUE
+task_queues = (Queue(NOTIFICATIONS_QUEUE), Queue(EMAIL_QUEUE))
+task_routes = {
+    "app.celery.tasks.send_email": {"queue": EMAIL_QUEUE},
+    "app.celery.tasks.send_telegram_*": {"queue": NOTIFICATIONS_QUEUE},
+}
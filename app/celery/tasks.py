@@ -1,14 +1,17 @@
 import asyncio
+import logging
 import smtplib
 from celery import shared_task
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from app.telegram.bot import bot
 from app.telegram.dao import TelegramUsersDAO
 from app.config import settings
 
 
-@shared_task
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
 def send_email(to_email, subject, message):
     """
     Отправляет email с указанным адресатом, темой и сообщением.
@@ -29,7 +32,7 @@ def send_email(to_email, subject, message):
         server.send_message(msg)
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def send_telegram_notification(user_id: int, message: str):
     """
     Асинхронная отправка уведомления через Telegram.
@@ -43,6 +46,42 @@ async def _send_notification(user_id: int, message: str):
     """
     Фактическая асинхронная логика отправки уведомления.
     """
-    tg_user = await TelegramUsersDAO.find_one_or_none(main_user_id=user_id)
-    if tg_user:
-        await bot.send_message(chat_id=tg_user.telegram_id, text=message)
+    telegram_id = await TelegramUsersDAO.find_value("telegram_id", main_user_id=user_id)
+    if telegram_id:
+        await _send_to_chats([telegram_id], message)
+
+
+@shared_task(ignore_result=True)
+def send_telegram_notifications(user_ids: list, message: str):
+    """
+    Отправка одного уведомления через Telegram нескольким пользователям.
+
+    Используется при отправке сообщения в комнату: одна задача на сообщение
+    вместо задачи на каждого участника оффлайн.
+
+    :param user_ids: ID пользователей.
+    :param message: Текст уведомления.
+    """
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(_send_notifications(user_ids, message))
+
+
+async def _send_notifications(user_ids: list, message: str):
+    """
+    Находит чаты Telegram пользователей одним запросом и отправляет уведомление.
+    """
+    telegram_ids = await TelegramUsersDAO.get_telegram_ids(user_ids)
+    await _send_to_chats(telegram_ids, message)
+
+
+async def _send_to_chats(telegram_ids: list, message: str):
+    # aiogram загружается только воркерами, которые отправляют уведомления
+    from app.telegram.bot import get_bot
+
+    bot = get_bot()
+    for telegram_id in telegram_ids:
+        try:
+            await bot.send_message(chat_id=telegram_id, text=message)
+        except Exception as e:
+            # Заблокированный бот у одного пользователя не должен прерывать рассылку
+            logger.warning(f"Failed to notify Telegram chat {telegram_id}: {e}")
@@ -0,0 +1,495 @@
+import asyncio
+import json
+import logging
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi import WebSocket, status
+from redis.exceptions import RedisError
+
+from app.chat import fanout
+from app.config import settings
+from app.redis.redis_client import redis_client
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack необязателен для JSON-клиентов
+    msgpack = None
+
+
+logger = logging.getLogger(__name__)
+
+# Без подпротокола используется исторический формат: одно событие на JSON-кадр.
+# Подпротоколы версии 2 объединяют события в пакеты {"v": 2, "events": [...]}.
+SUBPROTOCOL_V2_JSON = "mychat.v2.json"
+SUBPROTOCOL_V2_MSGPACK = "mychat.v2.msgpack"
+
+
+# Служебное событие: буфер не покрывает пропуск, клиент должен перечитать историю
+RESYNC_EVENT = {"type": "resync"}
+
+# Служебное событие перед остановкой процесса: клиент переподключается через after_ms
+RECONNECT_EVENT_TYPE = "reconnect"
+
+# Количество пользователей в одном pipeline при рассылке события в комнату
+PUBLISH_CHUNK_SIZE = 500
+
+
+def stream_key(user_id: int) -> str:
+    """
+    Ключ Redis Stream с последними событиями пользователя.
+    """
+    return f"events:{user_id}"
+
+
+def parse_event_id(event_id: str) -> Tuple[int, int]:
+    """
+    Разбирает ID записи Redis Stream ("<мс>-<номер>") для сравнения.
+
+    :raises ValueError: Если ID имеет неверный формат.
+    """
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def supported_subprotocols() -> List[str]:
+    """
+    Возвращает список поддерживаемых сервером подпротоколов в порядке предпочтения.
+    """
+    if msgpack is not None:
+        return [SUBPROTOCOL_V2_MSGPACK, SUBPROTOCOL_V2_JSON]
+    return [SUBPROTOCOL_V2_JSON]
+
+
+def negotiate_subprotocol(websocket: WebSocket) -> Optional[str]:
+    """
+    Выбирает подпротокол из заголовка Sec-WebSocket-Protocol клиента.
+
+    Сервер отдает предпочтение msgpack, если клиент его предложил.
+    Старые клиенты ничего не предлагают и получают протокол v1 (None).
+    """
+    offered = websocket.scope.get("subprotocols") or []
+    for subprotocol in supported_subprotocols():
+        if subprotocol in offered:
+            return subprotocol
+    return None
+
+
+class ClientConnection:
+    """
+    WebSocket-подключение пользователя с очередью исходящих событий.
+
+    Отправка выполняется отдельной задачей-писателем, поэтому медленный клиент
+    не задерживает обработчик, который публикует событие. В протоколе v2 события,
+    пришедшие в течение окна WS_BATCH_WINDOW_MS, объединяются в один кадр.
+
+    Если очередь переполнена или писатель завершился с ошибкой, подключение
+    снимается с учета (on_close) и сокет закрывается: клиент переподключится
+    и дочитает пропущенное из буфера по last_event_id.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        subprotocol: Optional[str] = None,
+        on_close: Optional[Callable[["ClientConnection"], None]] = None,
+    ):
+        self.websocket = websocket
+        self.subprotocol = subprotocol
+        self.on_close = on_close
+        self.closed = False
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE)
+        self._writer: Optional[asyncio.Task] = None
+        self._closer: Optional[asyncio.Task] = None
+        # ID последнего отправленного события из буфера, для отсева повторов
+        self.last_event_id: Optional[Tuple[int, int]] = None
+
+    @property
+    def is_batched(self) -> bool:
+        return self.subprotocol is not None
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def stop(self):
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._writer = None
+
+    def send(self, event: dict) -> bool:
+        """
+        Ставит событие в очередь отправки без ожидания.
+
+        Переполненная очередь означает, что клиент не успевает читать: соединение
+        закрывается, а отправитель события не ждет медленного клиента.
+
+        :param event: Словарь с данными события
+        :return: False, если событие не поставлено в очередь.
+        """
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("WebSocket send queue is full, closing connection")
+            self.abort(status.WS_1013_TRY_AGAIN_LATER)
+            return False
+        return True
+
+    def offer(self, event: dict) -> bool:
+        """
+        Ставит эфемерное событие в очередь, только если у клиента нет отставания.
+
+        Половина очереди оставлена под сообщения: медленный клиент теряет
+        события "печатает" и "просмотрено", а не задерживает их отправителя.
+        """
+        if self.closed or self.queue.qsize() >= self.queue.maxsize // 2:
+            return False
+        self.queue.put_nowait(event)
+        return True
+
+    def abort(self, code: int):
+        """
+        Снимает подключение с учета и закрывает сокет в фоне.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self.on_close is not None:
+            self.on_close(self)
+        self._closer = asyncio.create_task(self._close(code))
+
+    async def _close(self, code: int):
+        await self.stop()
+        try:
+            await self.websocket.close(code=code)
+        except Exception as e:
+            # Клиент уже отключился
+            logger.debug(f"WebSocket close failed: {e}")
+
+    async def send_now(self, events: List[dict]):
+        """
+        Отправляет события сразу, минуя очередь (используется до запуска писателя).
+        """
+        self._remember(events)
+        if not self.is_batched:
+            for event in events:
+                await self.websocket.send_json(event)
+            return
+        step = settings.WS_BATCH_MAX_EVENTS
+        for start in range(0, len(events), step):
+            await self._send_frame(events[start:start + step])
+
+    async def drain(self, event: dict, timeout: float):
+        """
+        Отправляет событие после уже поставленных в очередь и закрывает соединение
+        с кодом 1012 (Service Restart).
+
+        Писатель завершается, дойдя до конца очереди. Что не успело уйти за
+        timeout секунд, клиент получит из буфера после переподключения.
+        """
+        if self._writer is not None:
+            try:
+                await asyncio.wait_for(self._finish(event), timeout)
+            except asyncio.TimeoutError:
+                logger.debug("WebSocket queue was not flushed before shutdown")
+        await self.stop()
+        try:
+            await self.websocket.close(code=status.WS_1012_SERVICE_RESTART)
+        except Exception as e:
+            # Клиент уже отключился
+            logger.debug(f"WebSocket close failed: {e}")
+
+    async def _finish(self, event: dict):
+        await self.queue.put(event)
+        # None завершает писателя после отправки всей очереди
+        await self.queue.put(None)
+        await self._writer
+
+    def _remember(self, events: List[dict]):
+        for event in events:
+            if "eid" in event:
+                self.last_event_id = parse_event_id(event["eid"])
+
+    def _is_duplicate(self, event: dict) -> bool:
+        # Событие могло попасть и в догоняющую выборку из буфера, и в очередь
+        return (
+            self.last_event_id is not None
+            and "eid" in event
+            and parse_event_id(event["eid"]) <= self.last_event_id
+        )
+
+    async def _write_loop(self):
+        try:
+            await self._write_events()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Без писателя очередь больше не разбирается: подключение снимается
+            # с учета сразу, не дожидаясь обработчика websocket_endpoint
+            logger.debug(f"WebSocket send failed: {e}")
+            self.abort(status.WS_1011_INTERNAL_ERROR)
+
+    async def _write_events(self):
+        window = settings.WS_BATCH_WINDOW_MS / 1000
+        max_events = settings.WS_BATCH_MAX_EVENTS
+        loop = asyncio.get_running_loop()
+        while True:
+            event = await self.queue.get()
+            if event is None:
+                return
+            if self._is_duplicate(event):
+                continue
+            if not self.is_batched:
+                await self.websocket.send_json(event)
+                continue
+
+            # Собираем все события, пришедшие в течение окна, в один кадр
+            events = [event]
+            finished = False
+            deadline = loop.time() + window
+            while len(events) < max_events:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if event is None:
+                    finished = True
+                    break
+                if not self._is_duplicate(event):
+                    events.append(event)
+            await self._send_frame(events)
+            if finished:
+                return
+
+    async def _send_frame(self, events: List[dict]):
+        frame = {"v": 2, "events": events}
+        if self.subprotocol == SUBPROTOCOL_V2_MSGPACK:
+            await self.websocket.send_bytes(msgpack.packb(frame, use_bin_type=True))
+        else:
+            await self.websocket.send_text(
+                json.dumps(frame, ensure_ascii=False, separators=(",", ":"))
+            )
+
+
+class ConnectionManager:
+    """
+    Реестр активных WebSocket-подключений текущего процесса.
+
+    События для пользователей, подключенных к другим процессам, доставляются
+    через Redis Pub/Sub (app/chat/fanout.py).
+    """
+
+    def __init__(self):
+        # Хранит активные подключения WebSocket пользователей
+        self.active_connections: Dict[int, ClientConnection] = {}
+        # Процесс останавливается: новые подключения не принимаются
+        self.draining = False
+
+    async def connect(
+        self, websocket: WebSocket, user_id: int, last_event_id: Optional[str] = None
+    ) -> ClientConnection:
+        """
+        Принимает подключение, согласовывает протокол и регистрирует пользователя.
+
+        Если клиент передал ID последнего полученного события, сначала отправляются
+        пропущенные события из буфера, затем живые. Если пропуск старше буфера,
+        клиент получает событие resync и перечитывает историю целиком.
+        """
+        subprotocol = negotiate_subprotocol(websocket)
+        await websocket.accept(subprotocol=subprotocol)
+        connection = ClientConnection(
+            websocket,
+            subprotocol,
+            on_close=lambda closed: self._forget(user_id, closed),
+        )
+
+        # Регистрируем до чтения буфера: живые события копятся в очереди и не теряются
+        previous = self.active_connections.get(user_id)
+        self.active_connections[user_id] = connection
+        if previous is not None:
+            await previous.stop()
+
+        if last_event_id:
+            missed = await self.replay(user_id, last_event_id)
+            await connection.send_now([RESYNC_EVENT] if missed is None else missed)
+        connection.start()
+        return connection
+
+    async def publish(self, user_id: int, message: dict) -> dict:
+        """
+        Добавляет событие в буфер пользователя и возвращает его с полем eid.
+
+        Буфер ограничен WS_REPLAY_MAXLEN записями и WS_REPLAY_TTL секундами.
+        """
+        return (await self.publish_many([user_id], message))[user_id]
+
+    async def publish_many(self, user_ids: List[int], message: dict) -> Dict[int, dict]:
+        """
+        Добавляет одно событие в буферы нескольких пользователей.
+
+        Событие сериализуется один раз, команды отправляются пачками в pipeline.
+        Возвращает событие с eid каждого пользователя.
+        """
+        data = {"data": orjson.dumps(message)}
+        published = {}
+        for start in range(0, len(user_ids), PUBLISH_CHUNK_SIZE):
+            chunk = user_ids[start:start + PUBLISH_CHUNK_SIZE]
+            pipe = redis_client.pipeline(transaction=False)
+            for user_id in chunk:
+                key = stream_key(user_id)
+                pipe.xadd(
+                    key, data, maxlen=settings.WS_REPLAY_MAXLEN, approximate=True
+                )
+                pipe.expire(key, settings.WS_REPLAY_TTL)
+            results = await pipe.execute()
+            for user_id, event_id in zip(chunk, results[::2]):
+                if isinstance(event_id, bytes):
+                    event_id = event_id.decode()
+                published[user_id] = {**message, "eid": event_id}
+        return published
+
+    async def replay(self, user_id: int, last_event_id: str) -> Optional[List[dict]]:
+        """
+        Возвращает события после last_event_id или None, если буфер не покрывает пропуск.
+        """
+        key = stream_key(user_id)
+        try:
+            last_seen = parse_event_id(last_event_id)
+            first = await redis_client.xrange(key, "-", "+", count=1)
+            if not first or parse_event_id(self._decode(first[0][0])) > last_seen:
+                return None
+            entries = await redis_client.xrange(
+                key, f"({last_event_id}", "+", count=settings.WS_REPLAY_MAXLEN
+            )
+        except (RedisError, ValueError) as e:
+            logger.warning(f"Replay for user {user_id} failed: {e}")
+            return None
+        # Обрезка MAXLEN ~ приблизительная, буфер бывает длиннее WS_REPLAY_MAXLEN:
+        # полная выборка могла не дойти до новых событий, клиент получит resync
+        if len(entries) == settings.WS_REPLAY_MAXLEN:
+            return None
+        return [
+            {**orjson.loads(fields[b"data"]), "eid": self._decode(event_id)}
+            for event_id, fields in entries
+        ]
+
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def disconnect(self, user_id: int, connection: ClientConnection):
+        """
+        Удаляет подключение из реестра, если оно не было заменено более новым.
+        """
+        self._forget(user_id, connection)
+        await connection.stop()
+
+    def _forget(self, user_id: int, connection: ClientConnection):
+        if self.active_connections.get(user_id) is connection:
+            self.active_connections.pop(user_id, None)
+
+    async def drain(self):
+        """
+        Отключает всех клиентов процесса перед остановкой, распределяя их переподключение.
+
+        Каждый клиент получает событие {"type": "reconnect", "after_ms": N} со
+        случайной задержкой в пределах WS_DRAIN_RECONNECT_WINDOW_MS, после
+        отправки очереди соединение закрывается с кодом 1012. События, пришедшие
+        во время остановки, попадают только в буфер Redis и досылаются после
+        переподключения по last_event_id.
+        """
+        self.draining = True
+        connections = list(self.active_connections.values())
+        self.active_connections.clear()
+        if not connections:
+            return
+        logger.info(f"Draining {len(connections)} WebSocket connections")
+        window = settings.WS_DRAIN_RECONNECT_WINDOW_MS
+        await asyncio.gather(
+            *(
+                connection.drain(
+                    {"type": RECONNECT_EVENT_TYPE, "after_ms": random.randint(0, window)},
+                    settings.WS_DRAIN_TIMEOUT_S,
+                )
+                for connection in connections
+            )
+        )
+
+    async def notify(self, user_id: int, message: dict):
+        """
+        Сохраняет событие в буфер пользователя и отправляет его подключениям
+        пользователя в этом и других процессах.
+        """
+        event = message
+        try:
+            event = await self.publish(user_id, message)
+        except RedisError as e:
+            # Без буфера событие все равно доставляется подключенному клиенту
+            logger.warning(f"Event buffer for user {user_id} is unavailable: {e}")
+        connection = self.active_connections.get(user_id)
+        if connection is not None:
+            connection.send(event)
+        await fanout.publish([(user_id, event.get("eid"))], message)
+
+    def notify_ephemeral(self, user_id: int, event: dict) -> bool:
+        """
+        Отправляет эфемерное событие подключениям пользователя.
+
+        Событие не сохраняется в буфер и не досылается после переподключения.
+        Возвращает False, если пользователь не подключен к этому процессу или
+        событие отброшено; другим процессам событие публикуется в фоне.
+        """
+        fanout.publish_soon([(user_id, None)], event, ephemeral=True)
+        connection = self.active_connections.get(user_id)
+        if connection is None:
+            return False
+        return connection.offer(event)
+
+    def deliver_remote(self, recipients: List[tuple], message: dict, ephemeral: bool):
+        """
+        Передает событие, опубликованное другим процессом, подключениям этого процесса.
+
+        Вызывается из единственного подписчика процесса, поэтому не ждет ни одного
+        клиента: отстающий клиент отключается при переполнении очереди (send),
+        эфемерные события для него отбрасываются (offer).
+        """
+        for user_id, event_id in recipients:
+            connection = self.active_connections.get(user_id)
+            if connection is None:
+                continue
+            event = message if event_id is None else {**message, "eid": event_id}
+            if ephemeral:
+                connection.offer(event)
+            else:
+                connection.send(event)
+
+    async def notify_many(self, user_ids: List[int], message: dict):
+        """
+        Сохраняет событие в буферы пользователей и отправляет его их подключениям
+        в этом и других процессах. Используется для рассылки в комнаты.
+        """
+        try:
+            published = await self.publish_many(user_ids, message)
+        except RedisError as e:
+            logger.warning(f"Event buffers for {len(user_ids)} users are unavailable: {e}")
+            published = {}
+        recipients = []
+        for user_id in user_ids:
+            event = published.get(user_id, message)
+            recipients.append((user_id, event.get("eid")))
+            connection = self.active_connections.get(user_id)
+            if connection is not None:
+                connection.send(event)
+        await fanout.publish(recipients, message)
+
+
+manager = ConnectionManager()
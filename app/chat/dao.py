@@ -1,12 +1,123 @@
-from sqlalchemy import select, and_, or_
-from app.dao.base import BaseDAO
-from app.chat.models import Message
-from app.database import async_session_maker
+from typing import Any, Iterable, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, and_, or_, func, literal_column, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.dao.base import BULK_CHUNK_SIZE, BaseDAO, chunked
+from app.chat.models import Message, SEARCH_CONFIG
+from app.config import settings
+from app.dao.routing import read_session, write_session
+from app.redis.idempotency import get_sent_message, payload_digest, remember_sent_message
+
+
+class ClientMessageIdConflictError(Exception):
+    """
+    Клиентский ID сообщения уже использован для сообщения с другим содержимым.
+    """
+
+
+# Параметры ts_headline для фрагментов результатов поиска
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=5"
 
 
 class MessagesDAO(BaseDAO):
     model = Message
 
+    # Колонки, возвращаемые быстрым путем чтения истории (совпадают с MessageRead)
+    read_fields = ("id", "sender_id", "recipient_id", "content")
+    # Колонки истории комнаты (совпадают с RoomMessageRead)
+    room_read_fields = ("id", "room_id", "sender_id", "content")
+    # Колонки, загружаемые через COPY; остальные заполняются значениями по умолчанию и триггером
+    copy_fields = ("sender_id", "recipient_id", "content")
+
+    @classmethod
+    def _conversation_filter(cls, user_id_1: int, user_id_2: int):
+        return or_(
+            and_(
+                cls.model.sender_id == user_id_1,
+                cls.model.recipient_id == user_id_2,
+            ),
+            and_(
+                cls.model.sender_id == user_id_2,
+                cls.model.recipient_id == user_id_1,
+            ),
+        )
+
+    @classmethod
+    def _conversation_rows_query(cls, user_id_1: int, user_id_2: int):
+        columns = [getattr(cls.model, field) for field in cls.read_fields]
+        return (
+            select(*columns)
+            .filter(cls._conversation_filter(user_id_1, user_id_2))
+            .order_by(cls.model.id)
+        )
+
+    @classmethod
+    async def add_idempotent(
+        cls, client_message_id: Optional[UUID], outbox: Sequence[Any] = (), **values
+    ) -> Tuple[int, bool]:
+        """
+        Асинхронно сохраняет сообщение ровно один раз для клиентского ID.
+
+        Повтор сначала ищется в Redis (без обращения к базе данных), затем
+        уникальный индекс (sender_id, client_message_id) отсеивает повторы,
+        пришедшие после истечения ключа или параллельно с первой попыткой.
+        Повтор должен совпадать с сохраненным сообщением по всем колонкам values.
+
+        Аргументы:
+            client_message_id: ID сообщения, сгенерированный клиентом, или None.
+            outbox: События outbox, сохраняемые вместе с сообщением (не для повторов).
+            **values: Значения колонок сообщения, должен быть указан sender_id.
+
+        Возвращает:
+            Кортеж (ID сообщения, True если сообщение создано этим вызовом).
+
+        Исключения:
+            ClientMessageIdConflictError: Клиентский ID уже использован для
+                сообщения с другим получателем или содержимым.
+        """
+        if client_message_id is None:
+            return (await cls.add(outbox=outbox, **values)).id, True
+
+        sender_id = values["sender_id"]
+        digest = payload_digest(values)
+        sent = await get_sent_message(sender_id, client_message_id)
+        if sent is not None:
+            message_id, sent_digest = sent
+            if sent_digest != digest:
+                raise ClientMessageIdConflictError
+            return message_id, False
+
+        statement = (
+            pg_insert(cls.model)
+            .values(client_message_id=client_message_id, **values)
+            .on_conflict_do_nothing(index_elements=["sender_id", "client_message_id"])
+            .returning(cls.model.id)
+        )
+        async with write_session() as session:
+            async with session.begin():
+                message_id = (await session.execute(statement)).scalar_one_or_none()
+                created = message_id is not None
+                if created:
+                    session.add_all(outbox)
+                else:
+                    # Конфликт: сообщение сохранила предыдущая попытка
+                    result = await session.execute(
+                        select(
+                            cls.model.id, *[getattr(cls.model, key) for key in values]
+                        ).where(
+                            cls.model.sender_id == sender_id,
+                            cls.model.client_message_id == client_message_id,
+                        )
+                    )
+                    message_id, *stored = result.one()
+                    if stored != list(values.values()):
+                        raise ClientMessageIdConflictError
+        if created:
+            await cls.invalidate_cache()
+        await remember_sent_message(sender_id, client_message_id, message_id, digest)
+        return message_id, created
+
     @classmethod
     async def get_messages_between_users(cls, user_id_1: int, user_id_2: int):
         """
@@ -19,22 +130,227 @@ class MessagesDAO(BaseDAO):
         Возвращает:
             Список сообщений между двумя пользователями.
         """
-        async with async_session_maker() as session:
+        async with read_session() as session:
             query = (
                 select(cls.model)
-                .filter(
-                    or_(
-                        and_(
-                            cls.model.sender_id == user_id_1,
-                            cls.model.recipient_id == user_id_2,
-                        ),
-                        and_(
-                            cls.model.sender_id == user_id_2,
-                            cls.model.recipient_id == user_id_1,
-                        ),
-                    )
-                )
+                .filter(cls._conversation_filter(user_id_1, user_id_2))
                 .order_by(cls.model.id)
             )
             result = await session.execute(query)
             return result.scalars().all()
+
+    @classmethod
+    async def get_last_message_id(cls, user_id_1: int, user_id_2: int) -> int:
+        """
+        Асинхронно возвращает ID последнего сообщения между двумя пользователями.
+
+        Аргументы:
+            user_id_1: ID первого пользователя.
+            user_id_2: ID второго пользователя.
+
+        Возвращает:
+            ID последнего сообщения или 0, если сообщений нет.
+        """
+        async with read_session() as session:
+            query = select(func.max(cls.model.id)).filter(
+                cls._conversation_filter(user_id_1, user_id_2)
+            )
+            result = await session.execute(query)
+            return result.scalar_one_or_none() or 0
+
+    @classmethod
+    async def has_conversation(cls, user_id_1: int, user_id_2: int) -> bool:
+        """
+        Асинхронно проверяет, есть ли между пользователями хотя бы одно сообщение.
+        """
+        async with read_session() as session:
+            query = select(
+                select(cls.model.id)
+                .filter(cls._conversation_filter(user_id_1, user_id_2))
+                .exists()
+            )
+            result = await session.execute(query)
+            return bool(result.scalar())
+
+    @classmethod
+    async def get_message_rows_between_users(cls, user_id_1: int, user_id_2: int):
+        """
+        Асинхронно возвращает переписку двух пользователей в виде строк-кортежей.
+
+        Выбираются только колонки из read_fields, ORM-объекты не создаются.
+
+        Аргументы:
+            user_id_1: ID первого пользователя.
+            user_id_2: ID второго пользователя.
+
+        Возвращает:
+            Список кортежей (id, sender_id, recipient_id, content).
+        """
+        async with read_session() as session:
+            result = await session.execute(
+                cls._conversation_rows_query(user_id_1, user_id_2)
+            )
+            return result.all()
+
+    @classmethod
+    async def stream_message_rows_between_users(
+        cls, user_id_1: int, user_id_2: int, batch_size: int = 1000
+    ):
+        """
+        Асинхронный генератор строк переписки двух пользователей.
+
+        Использует серверный курсор, поэтому вся история не загружается в память.
+
+        Аргументы:
+            user_id_1: ID первого пользователя.
+            user_id_2: ID второго пользователя.
+            batch_size: Количество строк, получаемых из курсора за раз.
+        """
+        async with read_session() as session:
+            query = cls._conversation_rows_query(user_id_1, user_id_2).execution_options(
+                yield_per=batch_size
+            )
+            result = await session.stream(query)
+            async for row in result:
+                yield row
+
+    @classmethod
+    async def search(
+        cls,
+        user_id: int,
+        query: str,
+        limit: int = 20,
+        before_id: Optional[int] = None,
+        with_user_id: Optional[int] = None,
+    ):
+        """
+        Асинхронно ищет сообщения в переписках пользователя по полнотекстовому индексу.
+
+        Совпадения отбираются по GIN-индексу content_tsv и упорядочиваются от новых
+        к старым; страница продолжается с before_id (keyset-пагинация), поэтому
+        стоимость запроса не зависит от номера страницы. Релевантность и фрагменты
+        с подсветкой вычисляются в базе только для строк текущей страницы.
+
+        Аргументы:
+            user_id: ID пользователя, в переписках которого выполняется поиск.
+            query: Поисковый запрос в синтаксисе websearch_to_tsquery.
+            limit: Размер страницы.
+            before_id: Искать сообщения с ID меньше указанного.
+            with_user_id: Ограничить поиск перепиской с этим пользователем.
+
+        Возвращает:
+            Список строк (id, sender_id, recipient_id, snippet, rank), не длиннее limit + 1.
+            Наличие лишней строки означает, что есть следующая страница.
+        """
+        config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+        tsquery = func.websearch_to_tsquery(config, query)
+
+        if with_user_id is not None:
+            participant = cls._conversation_filter(user_id, with_user_id)
+        else:
+            # Поиск только по личным перепискам, сообщения комнат исключены
+            participant = and_(
+                or_(cls.model.sender_id == user_id, cls.model.recipient_id == user_id),
+                cls.model.room_id.is_(None),
+            )
+        page = (
+            select(
+                cls.model.id,
+                cls.model.sender_id,
+                cls.model.recipient_id,
+                cls.model.content,
+                cls.model.content_tsv,
+            )
+            .where(participant, cls.model.content_tsv.op("@@")(tsquery))
+            .order_by(cls.model.id.desc())
+            .limit(limit + 1)
+        )
+        if before_id is not None:
+            page = page.where(cls.model.id < before_id)
+        page = page.subquery()
+
+        # Экранируем HTML до подсветки: в ответе остаются только теги <mark>
+        escaped = func.replace(
+            func.replace(func.replace(page.c.content, "&", "&amp;"), "<", "&lt;"),
+            ">",
+            "&gt;",
+        )
+        statement = select(
+            page.c.id,
+            page.c.sender_id,
+            page.c.recipient_id,
+            func.ts_headline(config, escaped, tsquery, HEADLINE_OPTIONS).label("snippet"),
+            func.ts_rank_cd(page.c.content_tsv, tsquery).label("rank"),
+        ).order_by(page.c.id.desc())
+
+        async with read_session() as session:
+            async with session.begin():
+                # Ограничиваем время запроса, чтобы редкие тяжелые запросы
+                # не занимали соединения пула
+                await session.execute(
+                    text(
+                        f"SET LOCAL statement_timeout = {int(settings.SEARCH_STATEMENT_TIMEOUT_MS)}"
+                    )
+                )
+                result = await session.execute(statement)
+                return result.all()
+
+    @classmethod
+    async def get_room_message_rows(
+        cls, room_id: int, before_id: Optional[int] = None, limit: int = 50
+    ):
+        """
+        Асинхронно возвращает последние сообщения комнаты кортежами колонок room_read_fields.
+
+        Аргументы:
+            room_id: ID комнаты.
+            before_id: Вернуть сообщения с ID меньше указанного (keyset-пагинация).
+            limit: Максимальное количество сообщений.
+
+        Возвращает:
+            Список кортежей, упорядоченный по ID по возрастанию.
+        """
+        columns = [getattr(cls.model, field) for field in cls.room_read_fields]
+        query = select(*columns).where(cls.model.room_id == room_id)
+        if before_id is not None:
+            query = query.where(cls.model.id < before_id)
+        query = query.order_by(cls.model.id.desc()).limit(limit)
+        async with read_session() as session:
+            result = await session.execute(query)
+            return result.all()[::-1]
+
+    @classmethod
+    async def copy_messages(
+        cls,
+        rows: Iterable[Tuple[int, int, str]],
+        chunk_size: int = BULK_CHUNK_SIZE * 50,
+    ) -> int:
+        """
+        Асинхронно загружает сообщения через COPY (asyncpg) в одной транзакции.
+
+        Предназначен для наполнения базы и нагрузочных тестов: это самый быстрый
+        способ вставки в PostgreSQL. Уведомления, события WebSocket и версии
+        переписок в Redis не обновляются.
+
+        Аргументы:
+            rows: Кортежи (sender_id, recipient_id, content), можно передать генератор.
+            chunk_size: Количество строк в одной команде COPY.
+
+        Возвращает:
+            Количество загруженных сообщений.
+        """
+        count = 0
+        async with write_session() as session:
+            async with session.begin():
+                connection = await session.connection()
+                raw_connection = await connection.get_raw_connection()
+                driver_connection = raw_connection.driver_connection
+                for chunk in chunked(rows, chunk_size):
+                    await driver_connection.copy_records_to_table(
+                        cls.model.__tablename__,
+                        records=chunk,
+                        columns=cls.copy_fields,
+                    )
+                    count += len(chunk)
+        await cls.invalidate_cache()
+        return count
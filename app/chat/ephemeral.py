@@ -0,0 +1,185 @@
+"""
+Эфемерные события WebSocket: "печатает" и "просмотрено".
+
+Клиент отправляет по своему WebSocket кадр {"type": "typing", "to": <ID>} или
+{"type": "seen", "to": <ID>, "message_id": <ID>}. События не пишутся ни в
+PostgreSQL, ни в буфер Redis Stream и не досылаются после переподключения.
+
+События пересылаются только собеседникам: пользователям, с которыми у
+отправителя есть переписка или общая комната. Результат проверки хранится
+в подключении, отказ перепроверяется через PEER_RECHECK_S (первое сообщение
+новой переписки).
+
+На сервере события прореживаются по паре отправитель-получатель:
+- typing пересылается не чаще раза в WS_TYPING_INTERVAL_MS, лишние отбрасываются;
+- seen не чаще раза в WS_SEEN_INTERVAL_MS, события внутри окна объединяются,
+  и в конце окна получатель видит только наибольший message_id.
+
+Кроме того, все пересылаемые события отправителя, по всем его подключениям
+и получателям, ограничены token bucket RATE_LIMITS["ephemeral"]; сверх
+лимита события отбрасываются.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+import orjson
+
+from app.chat.dao import MessagesDAO
+from app.config import settings
+from app.exceptions import TooManyRequestsException
+from app.rate_limit import check_rate_limit
+from app.rooms.dao import RoomMembersDAO
+
+
+logger = logging.getLogger(__name__)
+
+TYPING = "typing"
+SEEN = "seen"
+EPHEMERAL_TYPES = (TYPING, SEEN)
+
+# Максимальный размер входящего кадра клиента, байты
+MAX_CLIENT_FRAME = 1024
+# Порог размера таблицы прореживания, после которого удаляются устаревшие пары
+THROTTLE_PRUNE_SIZE = 1000
+# Через сколько секунд перепроверяется получатель, не бывший собеседником
+PEER_RECHECK_S = 30
+
+
+def parse_client_event(text: Optional[str]) -> Optional[dict]:
+    """
+    Разбирает эфемерное событие клиента, неизвестные и неверные кадры игнорируются.
+    """
+    if not text or len(text) > MAX_CLIENT_FRAME:
+        return None
+    try:
+        data = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or data.get("type") not in EPHEMERAL_TYPES:
+        return None
+    to = data.get("to")
+    if not isinstance(to, int) or isinstance(to, bool):
+        return None
+    event = {"type": data["type"], "to": to}
+    if data["type"] == SEEN:
+        message_id = data.get("message_id")
+        if not isinstance(message_id, int) or isinstance(message_id, bool):
+            return None
+        event["message_id"] = message_id
+    return event
+
+
+class EphemeralThrottle:
+    """
+    Прореживание эфемерных событий одного подключения отправителя.
+
+    Состояние живет вместе с подключением и удаляется при его закрытии.
+    """
+
+    def __init__(self, sender_id: int, deliver):
+        self.sender_id = sender_id
+        self._deliver = deliver
+        # (тип, получатель) -> время последней пересылки
+        self._last_sent: Dict[Tuple[str, int], float] = {}
+        # получатель -> наибольший message_id, ожидающий конца окна
+        self._pending_seen: Dict[int, int] = {}
+        self._flushes: Dict[int, asyncio.Task] = {}
+        # получатель -> (собеседник ли, время проверки)
+        self._peers: Dict[int, Tuple[bool, float]] = {}
+
+    @staticmethod
+    def interval(event_type: str) -> float:
+        if event_type == TYPING:
+            return settings.WS_TYPING_INTERVAL_MS / 1000
+        return settings.WS_SEEN_INTERVAL_MS / 1000
+
+    async def handle(self, event: dict):
+        """
+        Пересылает событие получателю или откладывает и объединяет его.
+        """
+        event_type, to = event["type"], event["to"]
+        if to == self.sender_id:
+            return
+        key = (event_type, to)
+        now = time.monotonic()
+        interval = self.interval(event_type)
+        elapsed = now - self._last_sent.get(key, float("-inf"))
+        if elapsed < interval and event_type == TYPING:
+            return
+        if not await self._is_peer(to, now):
+            return
+
+        if elapsed >= interval:
+            await self._send(key, now, self._outgoing(event))
+            return
+        pending = self._pending_seen.get(to)
+        if pending is None or event["message_id"] > pending:
+            self._pending_seen[to] = event["message_id"]
+        if to not in self._flushes:
+            self._flushes[to] = asyncio.create_task(
+                self._flush_seen(to, interval - elapsed)
+            )
+
+    async def _is_peer(self, to: int, now: float) -> bool:
+        cached = self._peers.get(to)
+        if cached is not None and (cached[0] or now - cached[1] < PEER_RECHECK_S):
+            return cached[0]
+        try:
+            allowed = await MessagesDAO.has_conversation(self.sender_id, to)
+            if not allowed:
+                allowed = await RoomMembersDAO.share_room(self.sender_id, to)
+        except Exception as e:
+            # Ошибка базы не разрывает подключение, событие отбрасывается
+            logger.warning(f"Ephemeral peer check failed for {self.sender_id}->{to}: {e}")
+            return False
+        if len(self._peers) >= THROTTLE_PRUNE_SIZE:
+            self._peers.clear()
+        self._peers[to] = (allowed, now)
+        return allowed
+
+    def _outgoing(self, event: dict) -> dict:
+        outgoing = {"type": event["type"], "sender_id": self.sender_id}
+        if "message_id" in event:
+            outgoing["message_id"] = event["message_id"]
+        return outgoing
+
+    async def _send(self, key: Tuple[str, int], now: float, outgoing: dict):
+        try:
+            await check_rate_limit("ephemeral", f"user:{self.sender_id}")
+        except TooManyRequestsException:
+            return
+        if len(self._last_sent) >= THROTTLE_PRUNE_SIZE:
+            self._prune(now)
+        self._last_sent[key] = now
+        self._deliver(key[1], outgoing)
+
+    def _prune(self, now: float):
+        longest = max(self.interval(TYPING), self.interval(SEEN))
+        self._last_sent = {
+            key: sent for key, sent in self._last_sent.items() if now - sent < longest
+        }
+
+    async def _flush_seen(self, to: int, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._flushes.pop(to, None)
+        message_id = self._pending_seen.pop(to, None)
+        if message_id is not None:
+            await self._send(
+                (SEEN, to),
+                time.monotonic(),
+                {"type": SEEN, "sender_id": self.sender_id, "message_id": message_id},
+            )
+
+    async def close(self):
+        """
+        Отменяет отложенные события: после отключения отправителя они не нужны.
+        """
+        tasks = list(self._flushes.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pending_seen.clear()
@@ -0,0 +1,134 @@
+"""
+Доставка событий WebSocket между процессами API.
+
+Каждый процесс (воркер app.serve, отдельный контейнер) держит только свои
+подключения. Событие для пользователей дополнительно публикуется в канал
+Redis Pub/Sub; все процессы подписаны на канал и передают событие своим
+подключениям, свои же сообщения процесс пропускает. Pub/Sub не хранит
+сообщения: событие, пропущенное во время переподписки, клиент получит из
+буфера Redis Stream после переподключения по last_event_id.
+
+Для развертывания из одного процесса рассылку можно отключить
+(WS_FANOUT_ENABLED=false).
+"""
+import asyncio
+import logging
+import os
+import socket
+from typing import Callable, List, Optional, Tuple
+
+import orjson
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.redis.redis_client import create_pubsub_client, redis_client
+
+
+logger = logging.getLogger(__name__)
+
+FANOUT_CHANNEL = "ws:fanout"
+
+# Уникален для процесса, в том числе для воркеров одного контейнера
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# (ID пользователя, eid события в буфере или None)
+Recipient = Tuple[int, Optional[str]]
+# Доставка подключениям процесса; не должна ждать клиентов, иначе один
+# медленный клиент задержит события всех пользователей процесса, а Redis
+# отключит подписчика по лимиту буфера вывода
+Deliver = Callable[[List[Recipient], dict, bool], None]
+
+_subscriber: Optional[asyncio.Task] = None
+_pending = set()
+
+
+async def publish(recipients: List[Recipient], message: dict, ephemeral: bool = False):
+    """
+    Публикует событие для подключений пользователей в других процессах.
+
+    :param recipients: Получатели и ID события в их буферах.
+    :param message: Событие без поля eid.
+    :param ephemeral: Эфемерное событие: отбрасывается у клиентов с очередью.
+    """
+    if not settings.WS_FANOUT_ENABLED or not recipients:
+        return
+    payload = orjson.dumps(
+        {"o": PROCESS_ID, "m": message, "r": recipients, "x": ephemeral}
+    )
+    try:
+        await redis_client.publish(FANOUT_CHANNEL, payload)
+    except RedisError as e:
+        logger.warning(f"WebSocket fanout publish failed: {e}")
+
+
+def publish_soon(recipients: List[Recipient], message: dict, ephemeral: bool = False):
+    """
+    Публикует событие в фоне, для вызова из синхронного кода.
+    """
+    if not settings.WS_FANOUT_ENABLED:
+        return
+    task = asyncio.create_task(publish(recipients, message, ephemeral))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def run_subscriber(deliver: Deliver):
+    """
+    Передает события других процессов в deliver до отмены задачи.
+
+    При ошибке Redis подписка восстанавливается через WS_FANOUT_RETRY_DELAY_S.
+    """
+    client = create_pubsub_client()
+    try:
+        while True:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(FANOUT_CHANNEL)
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                    if message is not None:
+                        dispatch(message["data"], deliver)
+            except RedisError as e:
+                logger.warning(f"WebSocket fanout subscription failed: {e}")
+            finally:
+                await pubsub.reset()
+            await asyncio.sleep(settings.WS_FANOUT_RETRY_DELAY_S)
+    finally:
+        if client is not redis_client:
+            await client.close()
+
+
+def dispatch(data: bytes, deliver: Deliver):
+    try:
+        payload = orjson.loads(data)
+        if payload["o"] == PROCESS_ID:
+            return
+        deliver(
+            [tuple(recipient) for recipient in payload["r"]], payload["m"], payload["x"]
+        )
+    except Exception:
+        # Ошибка одного сообщения не останавливает подписку
+        logger.exception("WebSocket fanout delivery failed")
+
+
+def start_fanout(deliver: Deliver):
+    """
+    Запускает подписку процесса на события других процессов (WS_FANOUT_ENABLED).
+    """
+    global _subscriber
+    if settings.WS_FANOUT_ENABLED and _subscriber is None:
+        _subscriber = asyncio.create_task(run_subscriber(deliver))
+
+
+async def stop_fanout():
+    global _subscriber
+    if _subscriber is None:
+        return
+    _subscriber.cancel()
+    try:
+        await _subscriber
+    except asyncio.CancelledError:
+        pass
+    _subscriber = None
@@ -1,12 +1,53 @@
-from sqlalchemy import Integer, Text, ForeignKey
+import uuid
+from typing import Optional
+
+from sqlalchemy import CheckConstraint, FetchedValue, Index, Integer, Text, ForeignKey, Uuid
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
 from app.database import Base
 
 
+# Конфигурация полнотекстового поиска, совпадает с триггером в миграции
+SEARCH_CONFIG = "russian"
+
+
 class Message(Base):
     __tablename__ = "messages"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     sender_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
-    recipient_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
+    # Личное сообщение адресовано recipient_id, сообщение комнаты - room_id
+    recipient_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=True
+    )
+    room_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("rooms.id", ondelete="CASCADE"), nullable=True
+    )
     content: Mapped[str] = mapped_column(Text)
+    # ID, сгенерированный клиентом: повтор отправки не создает второе сообщение
+    client_message_id: Mapped[Optional[uuid.UUID]] = mapped_column(Uuid, nullable=True)
+    # Заполняется триггером messages_content_tsv_trigger, в обычных выборках не загружается
+    content_tsv: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR().with_variant(Text, "sqlite"),
+        nullable=True,
+        deferred=True,
+        server_default=FetchedValue(),
+        server_onupdate=FetchedValue(),
+    )
+
+    __table_args__ = (
+        Index("ix_messages_content_tsv", "content_tsv", postgresql_using="gin"),
+        Index("ix_messages_sender_id_id", "sender_id", "id"),
+        Index("ix_messages_recipient_id_id", "recipient_id", "id"),
+        Index("ix_messages_room_id_id", "room_id", "id"),
+        Index(
+            "uq_messages_sender_id_client_message_id",
+            "sender_id",
+            "client_message_id",
+            unique=True,
+        ),
+        CheckConstraint(
+            "(recipient_id IS NULL) <> (room_id IS NULL)",
+            name="ck_messages_recipient_or_room",
+        ),
+    )
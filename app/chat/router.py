@@ -1,21 +1,46 @@
-import asyncio
-from typing import List, Dict
+from typing import List, Optional
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Request, Depends
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    status,
+)
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from sqlalchemy.exc import DBAPIError
 
-from app.celery.tasks import send_telegram_notification
-from app.chat.dao import MessagesDAO
-from app.chat.schemas import MessageRead, MessageCreate
+from app.chat.connections import manager
+from app.chat.dao import ClientMessageIdConflictError, MessagesDAO
+from app.chat.ephemeral import EphemeralThrottle, parse_client_event
+from app.chat.schemas import MessageRead, MessageCreate, MessageSearchPage, MessageSent
+from app.assets.manifest import asset_url
+from app.dao.routing import replicas_enabled
+from app.exceptions import ClientMessageIdConflictException, SearchTimeoutException
+from app.outbox.events import NEW_MESSAGE_NOTIFICATION, telegram_notification
+from app.rate_limit import rate_limit_by_user
+from app.redis.watermarks import get_conversation_watermark, set_conversation_watermark
+from app.responses import (
+    ETAG_CACHE_HEADERS,
+    ResponseFormat,
+    etag_matches,
+    fast_list_response,
+    not_modified,
+    weak_etag,
+)
 from app.users.auth import is_user_online
 from app.users.dao import UsersDAO
-from app.users.dependencies import get_current_user
+from app.users.dependencies import get_current_user, get_current_user_id
 from app.users.models import User
 
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_url"] = asset_url
 
 
 @router.get("/", response_class=HTMLResponse, summary="Chat Page")
@@ -23,16 +48,12 @@ async def get_chat_page(request: Request, user_data: User = Depends(get_current_
     """
     Страница чата. Отображает HTML-страницу с информацией о пользователе и всех доступных пользователях.
     """
-    users_all = await UsersDAO.find_all()
+    users_all = await UsersDAO.find_directory()
     return templates.TemplateResponse(
         "chat.html", {"request": request, "user": user_data, "users_all": users_all}
     )
 
 
-# Хранит активные подключения WebSocket пользователей
-active_connections: Dict[int, WebSocket] = {}
-
-
 async def notify_user(user_id: int, message: dict):
     """
     Уведомляет пользователя, если он подключен через WebSocket.
@@ -40,48 +61,178 @@ async def notify_user(user_id: int, message: dict):
     :param user_id: ID пользователя
     :param message: Словарь с данными сообщения
     """
-    if user_id in active_connections:
-        websocket = active_connections[user_id]
-        await websocket.send_json(message)
+    await manager.notify(user_id, message)
 
 
 @router.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int):
+async def websocket_endpoint(
+    websocket: WebSocket, user_id: int, last_event_id: Optional[str] = None
+):
     """
     Управляет WebSocket-подключением пользователя.
 
-    При подключении добавляет пользователя в список активных соединений.
-    При разрыве связи удаляет пользователя из списка.
+    Подключение разрешено только владельцу сессии (cookie users_access_token).
+    При подключении согласовывает версию протокола (подпротокол WebSocket),
+    досылает события, пропущенные после last_event_id, и добавляет пользователя
+    в список активных соединений. При разрыве связи удаляет пользователя из списка.
+
+    От клиента принимаются эфемерные события typing и seen (app/chat/ephemeral.py),
+    они пересылаются собеседнику без записи в базу данных.
+
+    Во время остановки процесса (ConnectionManager.drain) новые подключения
+    закрываются с кодом 1012, клиент переподключается к другому процессу.
     """
-    await websocket.accept()
-    active_connections[user_id] = websocket
+    if manager.draining:
+        await websocket.close(code=status.WS_1012_SERVICE_RESTART)
+        return
+
+    try:
+        current_user_id = await get_current_user_id(
+            websocket.cookies.get("users_access_token") or ""
+        )
+    except HTTPException:
+        current_user_id = None
+    if current_user_id != user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    connection = await manager.connect(websocket, user_id, last_event_id)
+    throttle = EphemeralThrottle(user_id, manager.notify_ephemeral)
     try:
         while True:
-            await asyncio.sleep(1)
-    except WebSocketDisconnect:
-        active_connections.pop(user_id, None)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            event = parse_client_event(message.get("text"))
+            if event is not None:
+                await throttle.handle(event)
+    finally:
+        await throttle.close()
+        await manager.disconnect(user_id, connection)
 
 
 @router.get("/messages/{user_id}", response_model=List[MessageRead])
-async def get_messages(user_id: int, current_user: User = Depends(get_current_user)):
+async def get_messages(
+    user_id: int,
+    request: Request,
+    response: Response,
+    response_format: ResponseFormat = Query(ResponseFormat.json, alias="format"),
+    current_user_id: int = Depends(get_current_user_id),
+):
     """
     Получает список сообщений между текущим пользователем и указанным пользователем.
 
+    Ответ помечается слабым ETag по ID последнего сообщения переписки из Redis.
+    Если клиент прислал совпадающий If-None-Match, возвращается 304 без обращения
+    к базе данных.
+
+    Параметр format включает быстрый путь: orjson отдает проекцию колонок без
+    ORM-объектов и валидации pydantic, stream и ndjson отдают историю потоком.
+
     :param user_id: ID другого пользователя
-    :param current_user: Текущий пользователь, извлекается через зависимость
+    :param response_format: Формат ответа, по умолчанию стандартный JSON
+    :param current_user_id: ID текущего пользователя, извлекается через зависимость
     """
+    # Водяной знак читается до выборки истории: выборка содержит как минимум
+    # все сообщения до него, поэтому ETag никогда не опережает тело ответа
+    last_message_id = await get_conversation_watermark(user_id, current_user_id)
+    if last_message_id is None:
+        last_message_id = await set_conversation_watermark(
+            user_id,
+            current_user_id,
+            await MessagesDAO.get_last_message_id(user_id, current_user_id),
+        )
+    low, high = sorted((user_id, current_user_id))
+    etag = weak_etag("m", low, high, last_message_id, response_format.value)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    def body_etag_headers(body_last_id: int) -> dict:
+        # Реплика может отставать от водяного знака: ETag не должен опережать тело,
+        # иначе клиент закэширует неполную историю под актуальным ETag
+        last_id = min(last_message_id, body_last_id)
+        return {
+            "ETag": weak_etag("m", low, high, last_id, response_format.value),
+            **ETAG_CACHE_HEADERS,
+        }
+
+    # Сбрасываем флаг уведомления, если сообщения были прочитаны
+    await UsersDAO.set_notification_sent(current_user_id, False)
+
+    if response_format != ResponseFormat.json:
+        if response_format == ResponseFormat.orjson:
+            rows = await MessagesDAO.get_message_rows_between_users(
+                user_id_1=user_id, user_id_2=current_user_id
+            )
+            fast_response = fast_list_response(
+                response_format, MessagesDAO.read_fields, rows
+            )
+            fast_response.headers.update(body_etag_headers(rows[-1][0] if rows else 0))
+        else:
+            stream = MessagesDAO.stream_message_rows_between_users(
+                user_id_1=user_id, user_id_2=current_user_id
+            )
+            fast_response = fast_list_response(
+                response_format, MessagesDAO.read_fields, stream=stream
+            )
+            # Заголовки отправляются до тела, проверить полноту потока с реплики нельзя
+            if not replicas_enabled():
+                fast_response.headers.update({"ETag": etag, **ETAG_CACHE_HEADERS})
+        return fast_response
+
     messages = (
         await MessagesDAO.get_messages_between_users(
-            user_id_1=user_id, user_id_2=current_user.id
+            user_id_1=user_id, user_id_2=current_user_id
         )
         or []
     )
-    # Сбрасываем флаг уведомления, если сообщения были прочитаны
-    await UsersDAO.set_notification_sent(current_user.id, False)
+    response.headers.update(body_etag_headers(messages[-1].id if messages else 0))
     return messages
 
 
-@router.post("/messages", response_model=MessageCreate)
+@router.get("/search", response_model=MessageSearchPage)
+async def search_messages(
+    q: str = Query(..., min_length=2, max_length=200, description="Поисковый запрос"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[int] = Query(None, description="Курсор из next_cursor"),
+    user_id: Optional[int] = Query(None, description="Искать только в переписке с пользователем"),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """
+    Полнотекстовый поиск по сообщениям переписок текущего пользователя.
+
+    Результаты упорядочены от новых к старым, для следующей страницы
+    передайте next_cursor в параметре cursor.
+
+    :param q: Поисковый запрос (поддерживаются кавычки, OR и минус)
+    :param limit: Размер страницы
+    :param cursor: Курсор следующей страницы
+    :param user_id: ID собеседника для поиска в одной переписке
+    :param current_user_id: ID текущего пользователя, извлекается через зависимость
+    """
+    try:
+        rows = await MessagesDAO.search(
+            current_user_id, q, limit=limit, before_id=cursor, with_user_id=user_id
+        )
+    except DBAPIError as e:
+        # 57014 - query_canceled: сработал statement_timeout
+        if getattr(e.orig, "sqlstate", None) == "57014":
+            raise SearchTimeoutException
+        raise
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [row._asdict() for row in rows],
+        "next_cursor": rows[-1].id if has_more else None,
+    }
+
+
+@router.post(
+    "/messages",
+    response_model=MessageSent,
+    dependencies=[Depends(rate_limit_by_user("send_message"))],
+)
 async def send_message(
     message: MessageCreate, current_user: User = Depends(get_current_user)
 ):
@@ -90,44 +241,62 @@ async def send_message(
 
     После отправки уведомляет как отправителя, так и получателя о новом сообщении через WebSocket.
 
+    Если передан client_message_id, повтор запроса (например, после таймаута)
+    не создает второе сообщение: возвращается ID сохраненного сообщения с
+    duplicate=true, уведомления повторно не отправляются. Повтор с тем же
+    client_message_id, но другим получателем или текстом отклоняется с 409.
+
+    Уведомление в Telegram для получателя оффлайн сохраняется в outbox в одной
+    транзакции с сообщением и публикуется процессом app.outbox.relay.
+
     :param message: Данные сообщения (содержит получателя и контент)
     :param current_user: Текущий авторизованный пользователь
     """
-    await MessagesDAO.add(
-        sender_id=current_user.id,
-        content=message.content,
-        recipient_id=message.recipient_id,
-    )
+    outbox = []
+    if not await is_user_online(message.recipient_id):
+        # Флаг notification_sent выставляет relay: задача публикуется,
+        # только если получатель еще не был уведомлен
+        outbox.append(
+            telegram_notification(
+                [message.recipient_id], NEW_MESSAGE_NOTIFICATION, countdown=60
+            )
+        )
+    try:
+        message_id, created = await MessagesDAO.add_idempotent(
+            message.client_message_id,
+            outbox=outbox,
+            sender_id=current_user.id,
+            content=message.content,
+            recipient_id=message.recipient_id,
+        )
+    except ClientMessageIdConflictError:
+        raise ClientMessageIdConflictException
+    response_data = {
+        "id": message_id,
+        "recipient_id": message.recipient_id,
+        "content": message.content,
+        "client_message_id": message.client_message_id,
+        "duplicate": not created,
+    }
+    if not created:
+        return response_data
+
+    # Поднимаем водяной знак переписки, чтобы ETag истории сменился
+    await set_conversation_watermark(current_user.id, message.recipient_id, message_id)
 
-    # Формируем данные для уведомления
+    # Формируем данные для уведомления; по client_message_id отправитель
+    # сопоставляет событие с сообщением, уже показанным в чате
     message_data = {
+        "id": message_id,
         "sender_id": current_user.id,
         "recipient_id": message.recipient_id,
         "content": message.content,
     }
+    if message.client_message_id is not None:
+        message_data["client_message_id"] = str(message.client_message_id)
 
     # Уведомляем как отправителя, так и получателя
     await notify_user(message.recipient_id, message_data)
     await notify_user(current_user.id, message_data)
 
-    # Проверяем, онлайн ли получатель и было ли уже отправлено уведомление в ТГ
-    if not await is_user_online(
-        message.recipient_id
-    ) and not await UsersDAO.is_notification_sent(message.recipient_id):
-        # Отправляем уведомление через Celery
-        send_telegram_notification.apply_async(
-            (
-                message.recipient_id,
-                "У вас новое непрочитанное сообщение в mychat.",
-            ),
-            countdown=60,
-        )
-        # Устанавливаем флаг, что уведомление отправлено
-        await UsersDAO.set_notification_sent(message.recipient_id, True)
-
-    return {
-        "recipient_id": message.recipient_id,
-        "content": message.content,
-        "status": "ok",
-        "msg": "Message saved!",
-    }
+    return response_data
@@ -1,3 +1,6 @@
+from typing import List, Optional
+from uuid import UUID
+
 from pydantic import BaseModel, Field
 
 
@@ -11,3 +14,33 @@ class MessageRead(BaseModel):
 class MessageCreate(BaseModel):
     recipient_id: int = Field(..., description="ID получателя сообщения")
     content: str = Field(..., description="Содержимое сообщения")
+    client_message_id: Optional[UUID] = Field(
+        None, description="ID сообщения, сгенерированный клиентом; повторы с ним безопасны"
+    )
+
+
+class MessageSent(BaseModel):
+    id: int = Field(..., description="ID сохраненного сообщения")
+    recipient_id: int = Field(..., description="ID получателя сообщения")
+    content: str = Field(..., description="Содержимое сообщения")
+    client_message_id: Optional[UUID] = Field(None, description="ID сообщения клиента")
+    duplicate: bool = Field(
+        False, description="Сообщение уже было сохранено предыдущей попыткой"
+    )
+
+
+class MessageSearchHit(BaseModel):
+    id: int = Field(..., description="Уникальный идентификатор сообщения")
+    sender_id: int = Field(..., description="ID отправителя сообщения")
+    recipient_id: int = Field(..., description="ID получателя сообщения")
+    snippet: str = Field(
+        ..., description="Фрагмент сообщения с подсветкой совпадений тегом <mark>"
+    )
+    rank: float = Field(..., description="Релевантность сообщения запросу")
+
+
+class MessageSearchPage(BaseModel):
+    items: List[MessageSearchHit] = Field(..., description="Найденные сообщения")
+    next_cursor: Optional[int] = Field(
+        None, description="Курсор следующей страницы (передается как cursor)"
+    )
@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from pydantic_settings import BaseSettings
 
 
@@ -7,20 +9,91 @@ class Settings(BaseSettings):
 
     Атрибуты:
     - database_url: URL для подключения к базе данных.
+    - DATABASE_REPLICA_URLS: URL реплик для чтения (JSON-список в окружении), по умолчанию чтение с основной базы.
+    - DB_REPLICA_STRATEGY: Выбор реплики: round_robin или least_loaded (меньше всего занятых подключений).
+    - DB_STICKY_SECONDS: Сколько секунд после записи чтения пользователя идут в основную базу.
     - SECRET_KEY: Секретный ключ для подписи JWT.
     - ALGORITHM: Алгоритм для подписи JWT.
     - TG_TOKEN: Токен для Telegram бота.
     - TG_URL: URL для Telegram бота.
     - CELERY_BROKER_URL: URL для брокера сообщений Celery.
-    - REDIS_URL: URL для подключения к Redis.
+    - CELERY_RESULT_BACKEND: URL хранилища результатов задач, по умолчанию результаты не сохраняются.
+    - CELERY_TASK_SERIALIZER: Формат сообщений задач: json или msgpack.
+    - CELERY_TASK_COMPRESSION: Сжатие сообщений задач: gzip, zlib, bzip2 или пусто (без сжатия).
+    - REDIS_URL: URL для подключения к Redis (в режиме cluster - один из начальных узлов).
+    - REDIS_MODE: Режим Redis: standalone, sentinel или cluster.
+    - REDIS_SENTINELS: Адреса Sentinel вида host:port (режим sentinel).
+    - REDIS_SENTINEL_SERVICE: Имя мастера, отслеживаемого Sentinel.
+    - REDIS_MAX_CONNECTIONS: Максимум соединений пула Redis (в кластере - на каждый узел).
+    - REDIS_POOL_TIMEOUT: Время ожидания свободного соединения пула, секунды.
+    - REDIS_SOCKET_TIMEOUT: Таймаут операций сокета Redis, секунды.
+    - REDIS_SOCKET_CONNECT_TIMEOUT: Таймаут подключения к Redis, секунды.
+    - REDIS_HEALTH_CHECK_INTERVAL: Проверка простаивающего соединения PING перед использованием, секунды.
+    - REDIS_RETRY_ATTEMPTS: Количество повторов команды при сетевых ошибках и таймаутах.
+    - REDIS_RETRY_BACKOFF_MS: Начальная пауза экспоненциальной задержки между повторами, мс.
+    - REDIS_RETRY_BACKOFF_CAP_MS: Максимальная пауза между повторами, мс.
     - SMTP_SERVER: Адрес SMTP сервера для отправки почты.
     - SMTP_PORT: Порт SMTP сервера.
     - SMTP_USER: Пользователь для подключения к SMTP серверу.
     - SMTP_PASSWORD: Пароль для подключения к SMTP серверу.
     - SHOW_WITH_NGROK: Флаг для запуска приложения с Ngrok
     - NGROK_AUTH_TOKEN: Токен аутентификации для Ngrok
+    - WS_BATCH_WINDOW_MS: Окно объединения событий WebSocket в один кадр (протокол v2), мс.
+    - WS_BATCH_MAX_EVENTS: Максимальное количество событий в одном кадре.
+    - WS_SEND_QUEUE_SIZE: Размер очереди исходящих событий одного подключения.
+    - WS_REPLAY_MAXLEN: Количество последних событий пользователя в буфере Redis Stream.
+    - WS_REPLAY_TTL: Время жизни буфера событий пользователя, секунды.
+    - WS_TYPING_INTERVAL_MS: Минимальный интервал между событиями "печатает" для пары пользователей, мс.
+    - WS_SEEN_INTERVAL_MS: Окно объединения событий "просмотрено" для пары пользователей, мс.
+    - WS_DRAIN_RECONNECT_WINDOW_MS: Окно, в котором клиенты переподключаются после остановки процесса, мс.
+    - WS_DRAIN_TIMEOUT_S: Время на отправку очереди событий клиенту при остановке процесса, секунды.
+    - WS_FANOUT_ENABLED: Флаг доставки событий WebSocket между процессами через Redis Pub/Sub.
+    - WS_FANOUT_RETRY_DELAY_S: Пауза перед повторной подпиской после ошибки Redis, секунды.
+    - SERVER_WORKERS: Количество воркеров python -m app.serve, 0 - по числу доступных ядер.
+    - SERVER_BACKLOG: Размер очереди входящих TCP-подключений.
+    - SERVER_KEEP_ALIVE_S: Время жизни простаивающего keep-alive соединения, секунды.
+    - SERVER_GRACEFUL_TIMEOUT_S: Время на завершение запросов при остановке воркера, секунды.
+    - CLIENT_MESSAGE_ID_TTL: Время хранения клиентских ID отправленных сообщений в Redis, секунды.
+    - OUTBOX_BATCH_SIZE: Количество событий outbox, публикуемых relay за одну транзакцию.
+    - OUTBOX_POLL_INTERVAL_MS: Пауза relay после неполной пачки событий, мс.
+    - OUTBOX_RETRY_DELAY_S: Пауза relay после ошибки пачки и первая задержка повтора события, секунды.
+    - OUTBOX_MAX_ATTEMPTS: Количество попыток публикации события outbox до пометки dead_at.
+    - WATERMARK_TTL: Время жизни водяных знаков переписок в Redis (для ETag), секунды.
+    - CACHE_ENABLED: Флаг кэширования чтений DAO (app/dao/cache.py).
+    - CACHE_TTL_S: Время жизни значения кэша DAO в Redis, секунды.
+    - CACHE_NEGATIVE_TTL_S: Время жизни пустого результата (None) в кэше DAO, секунды.
+    - CACHE_L1_TTL_S: Время жизни значения в памяти процесса, секунды (0 отключает L1).
+    - CACHE_L1_MAX_ENTRIES: Максимальное количество значений в памяти процесса.
+    - SEARCH_STATEMENT_TIMEOUT_MS: Ограничение времени выполнения поискового запроса, мс.
+    - RATE_LIMIT_ENABLED: Флаг ограничения частоты запросов.
+    - RATE_LIMITS: Лимиты маршрутов в виде "<запросов>/<секунд>" (JSON-объект в окружении).
+    - RATE_LIMIT_TRUSTED_PROXIES: Сети прокси, которым доверяется заголовок X-Real-IP.
+    - TG_MODE: Режим работы бота в API-процессе: polling, webhook (отдельный сервис) или off.
+    - TG_API_URL: Базовый URL Bot API (локальный сервер или заглушка), по умолчанию api.telegram.org.
+    - TG_FSM_STORAGE: Хранилище состояний FSM: redis или memory.
+    - TG_WEBHOOK_URL: Публичный URL вебхука бота.
+    - TG_WEBHOOK_SECRET: Секрет, который Telegram передает в X-Telegram-Bot-Api-Secret-Token.
+    - TG_WEBHOOK_HOST: Адрес, на котором слушает сервис вебхука.
+    - TG_WEBHOOK_PORT: Порт сервиса вебхука.
+    - TG_WORKERS: Количество обработчиков обновлений в сервисе вебхука.
+    - TG_UPDATE_QUEUE_SIZE: Размер очереди обновлений одного обработчика.
+    - VERIFICATION_TOKEN_TTL: Срок действия токена верификации, секунды.
+    - PROFILING_ENABLED: Профилировать каждый запрос (только для отладки).
+    - PROFILING_SECRET: Ключ подписи заголовка X-Profile-Token для профилирования отдельных запросов.
+    - PROFILING_INTERVAL_MS: Интервал сэмплирования стека, мс.
+    - PROFILING_DIR: Каталог для профилей запросов (формат folded stacks).
+    - SQL_QUERY_WARN_THRESHOLD: Предупреждать, если запрос выполнил больше SQL-запросов.
+    - SQL_REPEAT_WARN_THRESHOLD: Предупреждать, если один SQL-запрос повторился столько раз (N+1).
+    - SQL_SLOW_QUERY_MS: Порог журнала медленных запросов, мс.
+    - LOOP_LAG_MONITOR_ENABLED: Флаг сторожа задержки event loop.
+    - LOOP_LAG_INTERVAL_MS: Интервал измерения задержки event loop, мс.
+    - LOOP_LAG_THRESHOLD_MS: Задержка, при которой loop считается заблокированным и снимается стек, мс.
+    - LOOP_LAG_STACK_INTERVAL_S: Минимальный интервал между снятиями стека, секунды.
     """
     database_url: str = ""
+    DATABASE_REPLICA_URLS: List[str] = []
+    DB_REPLICA_STRATEGY: str = "round_robin"
+    DB_STICKY_SECONDS: int = 5
 
     SECRET_KEY: str
     ALGORITHM: str
@@ -29,7 +102,21 @@ class Settings(BaseSettings):
     TG_URL: str
 
     CELERY_BROKER_URL: str
+    CELERY_RESULT_BACKEND: str = ""
+    CELERY_TASK_SERIALIZER: str = "json"
+    CELERY_TASK_COMPRESSION: str = ""
     REDIS_URL: str
+    REDIS_MODE: str = "standalone"
+    REDIS_SENTINELS: List[str] = []
+    REDIS_SENTINEL_SERVICE: str = "mymaster"
+    REDIS_MAX_CONNECTIONS: int = 100
+    REDIS_POOL_TIMEOUT: float = 5
+    REDIS_SOCKET_TIMEOUT: float = 5
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    REDIS_RETRY_ATTEMPTS: int = 3
+    REDIS_RETRY_BACKOFF_MS: int = 50
+    REDIS_RETRY_BACKOFF_CAP_MS: int = 1000
 
     SMTP_SERVER: str
     SMTP_PORT: str
@@ -39,6 +126,79 @@ class Settings(BaseSettings):
     SHOW_WITH_NGROK: bool
     NGROK_AUTH_TOKEN: str
 
+    WS_BATCH_WINDOW_MS: int = 20
+    WS_BATCH_MAX_EVENTS: int = 100
+    WS_SEND_QUEUE_SIZE: int = 1000
+    WS_REPLAY_MAXLEN: int = 500
+    WS_REPLAY_TTL: int = 3600
+    WS_TYPING_INTERVAL_MS: int = 3000
+    WS_SEEN_INTERVAL_MS: int = 1000
+    WS_DRAIN_RECONNECT_WINDOW_MS: int = 10000
+    WS_DRAIN_TIMEOUT_S: float = 5
+    WS_FANOUT_ENABLED: bool = True
+    WS_FANOUT_RETRY_DELAY_S: float = 1
+
+    SERVER_WORKERS: int = 0
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEP_ALIVE_S: int = 75
+    SERVER_GRACEFUL_TIMEOUT_S: float = 30
+    CLIENT_MESSAGE_ID_TTL: int = 600
+
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL_MS: int = 200
+    OUTBOX_RETRY_DELAY_S: float = 5
+    OUTBOX_MAX_ATTEMPTS: int = 10
+
+    WATERMARK_TTL: int = 7 * 24 * 3600
+
+    CACHE_ENABLED: bool = True
+    CACHE_TTL_S: int = 3600
+    CACHE_NEGATIVE_TTL_S: int = 30
+    CACHE_L1_TTL_S: float = 1
+    CACHE_L1_MAX_ENTRIES: int = 1000
+
+    SEARCH_STATEMENT_TIMEOUT_MS: int = 2000
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: Dict[str, str] = {
+        "login": "10/60",
+        "register": "5/300",
+        "send_message": "20/10",
+        # Эфемерные события WebSocket отправителя по всем получателям
+        "ephemeral": "30/10",
+    }
+    RATE_LIMIT_TRUSTED_PROXIES: List[str] = [
+        "127.0.0.1/32",
+        "10.0.0.0/8",
+        "172.16.0.0/12",
+        "192.168.0.0/16",
+    ]
+
+    TG_MODE: str = "polling"
+    TG_API_URL: str = ""
+    TG_FSM_STORAGE: str = "redis"
+    TG_WEBHOOK_URL: str = ""
+    TG_WEBHOOK_SECRET: str = ""
+    TG_WEBHOOK_HOST: str = "0.0.0.0"
+    TG_WEBHOOK_PORT: int = 8081
+    TG_WORKERS: int = 8
+    TG_UPDATE_QUEUE_SIZE: int = 100
+
+    VERIFICATION_TOKEN_TTL: int = 24 * 3600
+
+    PROFILING_ENABLED: bool = False
+    PROFILING_SECRET: str = ""
+    PROFILING_INTERVAL_MS: float = 5
+    PROFILING_DIR: str = "profiles"
+    SQL_QUERY_WARN_THRESHOLD: int = 10
+    SQL_REPEAT_WARN_THRESHOLD: int = 3
+    SQL_SLOW_QUERY_MS: float = 200
+
+    LOOP_LAG_MONITOR_ENABLED: bool = True
+    LOOP_LAG_INTERVAL_MS: float = 100
+    LOOP_LAG_THRESHOLD_MS: float = 200
+    LOOP_LAG_STACK_INTERVAL_S: float = 60
+
     class ConfigDict:
         env_file = ".env"
 
@@ -1,12 +1,60 @@
+from collections import namedtuple
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.future import select
-from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete, func
-from app.database import async_session_maker
+from sqlalchemy import (
+    insert as sqlalchemy_insert,
+    update as sqlalchemy_update,
+    delete as sqlalchemy_delete,
+    func,
+)
+from app.dao.cache import invalidate
+from app.dao.routing import read_session, write_session
+
+
+# Размер пачки массовых операций. Ограничивает память на стороне приложения;
+# внутри пачки SQLAlchemy сама делит INSERT на страницы по числу параметров.
+BULK_CHUNK_SIZE = 1000
+
+
+def chunked(rows: Iterable, size: int) -> Iterator[list]:
+    """
+    Делит последовательность или генератор на списки длиной не больше size.
+    """
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+@lru_cache(maxsize=None)
+def projection_row(name: str, columns: Tuple[str, ...]):
+    """
+    Возвращает тип строки проекции для указанного набора колонок.
+
+    Строка проекции - это namedtuple: неизменяемая, без __dict__, без
+    инструментирования ORM и без регистрации в identity map сессии.
+    Тип создается один раз на каждую пару (модель, колонки).
+    """
+    return namedtuple(f"{name}Row", columns)
 
 
 class BaseDAO:
     model = None
 
+    @classmethod
+    async def invalidate_cache(cls):
+        """
+        Сбрасывает кэшированные чтения (app/dao/cache.py), зависящие от таблицы модели.
+
+        Вызывается общими методами записи после фиксации транзакции. Методы
+        наследников, изменяющие кэшируемые данные своим SQL, вызывают его сами.
+        """
+        await invalidate(cls.model.__tablename__)
+
     @classmethod
     async def find_one_or_none_by_id(cls, data_id: int):
         """
@@ -18,7 +66,7 @@ class BaseDAO:
         Возвращает:
             Экземпляр модели или None, если ничего не найдено.
         """
-        async with async_session_maker() as session:
+        async with read_session() as session:
             query = select(cls.model).filter_by(id=data_id)
             result = await session.execute(query)
             return result.scalar_one_or_none()
@@ -34,7 +82,7 @@ class BaseDAO:
         Возвращает:
             Экземпляр модели или None, если ничего не найдено.
         """
-        async with async_session_maker() as session:
+        async with read_session() as session:
             query = select(cls.model).filter_by(**filter_by)
             result = await session.execute(query)
             return result.scalar_one_or_none()
@@ -50,55 +98,250 @@ class BaseDAO:
         Возвращает:
             Список экземпляров модели.
         """
-        async with async_session_maker() as session:
+        async with read_session() as session:
             query = select(cls.model).filter_by(**filter_by)
             result = await session.execute(query)
             return result.scalars().all()
 
     @classmethod
-    async def add(cls, **values):
+    def _projection_query(
+        cls, columns: Sequence[str], filter_by: dict, order_by: Sequence[str] = ()
+    ):
+        query = select(*[getattr(cls.model, column) for column in columns]).where(
+            *[getattr(cls.model, k) == v for k, v in filter_by.items()]
+        )
+        if order_by:
+            query = query.order_by(*[getattr(cls.model, column) for column in order_by])
+        return query
+
+    @classmethod
+    async def find_all_projected(
+        cls, columns: Sequence[str], order_by: Sequence[str] = (), **filter_by
+    ) -> list:
+        """
+        Асинхронно находит записи модели и возвращает только указанные колонки.
+
+        В отличие от find_all, ORM-объекты не создаются: строки возвращаются
+        неизменяемыми namedtuple с доступом к полям по имени (row.name).
+
+        Аргументы:
+            columns: Имена колонок модели, которые нужно выбрать.
+            order_by: Имена колонок для сортировки.
+            **filter_by: Критерии фильтрации в виде именованных параметров.
+
+        Возвращает:
+            Список строк проекции.
+        """
+        row_type = projection_row(cls.model.__name__, tuple(columns))
+        async with read_session() as session:
+            result = await session.execute(
+                cls._projection_query(columns, filter_by, order_by)
+            )
+            return list(map(row_type._make, result.tuples()))
+
+    @classmethod
+    async def find_one_or_none_projected(
+        cls, columns: Sequence[str], **filter_by
+    ) -> Optional[tuple]:
+        """
+        Асинхронно находит одну запись модели и возвращает только указанные колонки.
+
+        Аргументы:
+            columns: Имена колонок модели, которые нужно выбрать.
+            **filter_by: Критерии фильтрации в виде именованных параметров.
+
+        Возвращает:
+            Строку проекции или None, если ничего не найдено.
+        """
+        async with read_session() as session:
+            result = await session.execute(cls._projection_query(columns, filter_by))
+            row = result.tuples().one_or_none()
+        if row is None:
+            return None
+        return projection_row(cls.model.__name__, tuple(columns))._make(row)
+
+    @classmethod
+    async def find_value(cls, column: str, **filter_by) -> Any:
+        """
+        Асинхронно возвращает значение одной колонки записи модели.
+
+        Аргументы:
+            column: Имя колонки модели.
+            **filter_by: Критерии фильтрации в виде именованных параметров.
+
+        Возвращает:
+            Значение колонки или None, если запись не найдена.
+        """
+        async with read_session() as session:
+            result = await session.execute(cls._projection_query((column,), filter_by))
+            return result.scalar_one_or_none()
+
+    @classmethod
+    async def add(cls, outbox: Sequence[Any] = (), **values):
         """
         Асинхронно создает новый экземпляр модели с указанными значениями.
 
         Аргументы:
+            outbox: События outbox (app/outbox/events.py), сохраняемые в той же транзакции.
             **values: Именованные параметры для создания нового экземпляра модели.
 
         Возвращает:
             Созданный экземпляр модели.
         """
-        async with async_session_maker() as session:
+        async with write_session() as session:
             async with session.begin():
                 new_instance = cls.model(**values)
                 session.add(new_instance)
+                session.add_all(outbox)
                 try:
                     await session.commit()
                 except SQLAlchemyError as e:
                     await session.rollback()
                     raise e
-                return new_instance
+        await cls.invalidate_cache()
+        return new_instance
 
     @classmethod
-    async def add_many(cls, instances: list[dict]):
+    async def add_many(cls, instances: list[dict], chunk_size: int = BULK_CHUNK_SIZE):
         """
         Асинхронно создает несколько новых экземпляров модели с указанными значениями.
 
+        Записи вставляются пачками через INSERT ... RETURNING, без предварительного
+        создания объектов и add_all.
+
         Аргументы:
             instances: Список словарей, где каждый словарь содержит именованные параметры для создания нового
             экземпляра модели.
+            chunk_size: Размер пачки.
 
         Возвращает:
-            Список созданных экземпляров модели.
+            Список созданных экземпляров модели в порядке instances.
         """
-        async with async_session_maker() as session:
+        new_instances = []
+        async with write_session() as session:
             async with session.begin():
-                new_instances = [cls.model(**values) for values in instances]
-                session.add_all(new_instances)
-                try:
-                    await session.commit()
-                except SQLAlchemyError as e:
-                    await session.rollback()
-                    raise e
-                return new_instances
+                # Без sort_by_parameter_order порядок RETURNING при пакетной
+                # вставке (insertmanyvalues) не гарантирован
+                statement = sqlalchemy_insert(cls.model).returning(
+                    cls.model, sort_by_parameter_order=True
+                )
+                for chunk in chunked(instances, chunk_size):
+                    result = await session.scalars(statement, chunk)
+                    new_instances.extend(result.all())
+        await cls.invalidate_cache()
+        return new_instances
+
+    @classmethod
+    async def insert_many(
+        cls,
+        rows: Iterable[dict],
+        returning: Sequence[str] = ("id",),
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> List[tuple]:
+        """
+        Асинхронно вставляет записи пачками в одной транзакции без создания ORM-объектов.
+
+        Аргументы:
+            rows: Словари значений колонок, можно передать генератор.
+            returning: Колонки, возвращаемые для каждой вставленной записи.
+                Пустой кортеж отключает RETURNING.
+            chunk_size: Размер пачки.
+
+        Возвращает:
+            Список строк проекции returning в порядке вставки.
+        """
+        return await cls._execute_many(
+            sqlalchemy_insert(cls.model), rows, returning, chunk_size
+        )
+
+    @classmethod
+    async def upsert_many(
+        cls,
+        rows: Iterable[dict],
+        index_elements: Sequence[str],
+        update_columns: Optional[Sequence[str]] = None,
+        returning: Sequence[str] = ("id",),
+        chunk_size: int = BULK_CHUNK_SIZE,
+    ) -> List[tuple]:
+        """
+        Асинхронно вставляет записи пачками, разрешая конфликты через ON CONFLICT.
+
+        Аргументы:
+            rows: Словари значений колонок, можно передать генератор.
+            index_elements: Колонки уникального индекса, по которому определяется конфликт.
+            update_columns: Колонки, обновляемые при конфликте. Если не указаны,
+                конфликтующие записи пропускаются (DO NOTHING).
+            returning: Колонки, возвращаемые для вставленных и обновленных записей.
+            chunk_size: Размер пачки.
+
+        Возвращает:
+            Список строк проекции returning. Пропущенные записи в него не попадают.
+            С update_columns строки идут в порядке rows; при DO NOTHING порядок
+            не гарантирован (пропуски не позволяют сопоставить строки с параметрами).
+        """
+        statement = pg_insert(cls.model)
+        if update_columns:
+            statement = statement.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={column: statement.excluded[column] for column in update_columns},
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=index_elements)
+        return await cls._execute_many(
+            statement, rows, returning, chunk_size, ordered=bool(update_columns)
+        )
+
+    @classmethod
+    async def _execute_many(
+        cls,
+        statement,
+        rows: Iterable[dict],
+        returning: Sequence[str],
+        chunk_size: int,
+        ordered: bool = True,
+    ) -> List[tuple]:
+        if returning:
+            row_type = projection_row(cls.model.__name__, tuple(returning))
+            # Без sort_by_parameter_order порядок RETURNING при пакетной вставке
+            # (insertmanyvalues) не гарантирован. С пропусками строк (ON CONFLICT
+            # DO NOTHING) SQLAlchemy не может сопоставить их с параметрами
+            statement = statement.returning(
+                *[getattr(cls.model, column) for column in returning],
+                sort_by_parameter_order=ordered,
+            )
+        result_rows = []
+        async with write_session() as session:
+            async with session.begin():
+                for chunk in chunked(rows, chunk_size):
+                    result = await session.execute(statement, chunk)
+                    if returning:
+                        result_rows.extend(map(row_type._make, result.tuples()))
+        await cls.invalidate_cache()
+        return result_rows
+
+    @classmethod
+    async def update_many(
+        cls, rows: Iterable[dict], chunk_size: int = BULK_CHUNK_SIZE
+    ) -> int:
+        """
+        Асинхронно обновляет записи по первичному ключу пачками (executemany).
+
+        Аргументы:
+            rows: Словари, каждый содержит id записи и новые значения колонок.
+                Набор колонок в пачке может различаться.
+            chunk_size: Размер пачки.
+
+        Возвращает:
+            Количество переданных для обновления записей.
+        """
+        count = 0
+        async with write_session() as session:
+            async with session.begin():
+                for chunk in chunked(rows, chunk_size):
+                    await session.execute(sqlalchemy_update(cls.model), chunk)
+                    count += len(chunk)
+        await cls.invalidate_cache()
+        return count
 
     @classmethod
     async def update(cls, filter_by, **values):
@@ -113,13 +356,14 @@ class BaseDAO:
         Возвращает:
             Количество обновленных экземпляров модели.
         """
-        async with async_session_maker() as session:
+        async with write_session() as session:
             async with session.begin():
                 query = (
                     sqlalchemy_update(cls.model)
                     .where(*[getattr(cls.model, k) == v for k, v in filter_by.items()])
                     .values(**values)
-                    .execution_options(synchronize_session="fetch")
+                    # Сессия закрывается сразу после запроса, синхронизировать нечего
+                    .execution_options(synchronize_session=False)
                 )
                 result = await session.execute(query)
                 try:
@@ -127,7 +371,8 @@ class BaseDAO:
                 except SQLAlchemyError as e:
                     await session.rollback()
                     raise e
-                return result.rowcount
+        await cls.invalidate_cache()
+        return result.rowcount
 
     @classmethod
     async def delete(cls, delete_all: bool = False, **filter_by):
@@ -147,7 +392,7 @@ class BaseDAO:
                     "Необходимо указать хотя бы один параметр для удаления."
                 )
 
-        async with async_session_maker() as session:
+        async with write_session() as session:
             async with session.begin():
                 query = sqlalchemy_delete(cls.model).filter_by(**filter_by)
                 result = await session.execute(query)
@@ -156,4 +401,5 @@ class BaseDAO:
                 except SQLAlchemyError as e:
                     await session.rollback()
                     raise e
-                return result.rowcount
+        await cls.invalidate_cache()
+        return result.rowcount
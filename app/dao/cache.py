@@ -0,0 +1,209 @@
+"""
+Кэш чтений DAO: L1 в памяти процесса и L2 в Redis с инвалидацией по тегам.
+
+Тег - имя таблицы, от которой зависит результат. У каждого тега в Redis есть
+версия; значение в L2 хранится вместе с версиями тегов на момент чтения из базы
+и считается устаревшим, как только версия любого тега изменилась. Запись через
+BaseDAO (add, update, delete и массовые методы) меняет версию тега своей
+таблицы, поэтому кэш можно держать долго без риска отдать устаревшие данные.
+
+L1 сбрасывается сразу при записи в том же процессе, изменения из других
+процессов видны в L1 не позже чем через CACHE_L1_TTL_S. Одновременные промахи
+по одному ключу в процессе выполняют один запрос к базе (single-flight).
+Результат None кэшируется на CACHE_NEGATIVE_TTL_S.
+
+Загрузка в кэш всегда читает основную базу: значение с отстающей реплики
+было бы сохранено под новой версией тега и отдавалось бы до истечения TTL.
+"""
+import asyncio
+import functools
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import orjson
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.dao.routing import read_from_primary
+from app.redis.redis_client import redis_client
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "daocache"
+
+# Теги, от которых зависят кэшируемые чтения; запись в остальные таблицы
+# не обращается к Redis
+cached_tags: Set[str] = set()
+
+# ключ -> (срок L1, локальные поколения тегов, значение)
+_l1: "OrderedDict[str, Tuple[float, tuple, object]]" = OrderedDict()
+_local_generations: Dict[str, int] = {}
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+def tag_key(tag: str) -> str:
+    return f"{CACHE_PREFIX}:tag:{tag}"
+
+
+def cache_key(name: str, args: tuple, kwargs: dict) -> str:
+    arguments = orjson.dumps([args, kwargs], option=orjson.OPT_SORT_KEYS)
+    return f"{CACHE_PREFIX}:{name}:{hashlib.sha1(arguments).hexdigest()[:16]}"
+
+
+def cached(*tags: str, ttl: Optional[int] = None, negative_ttl: Optional[int] = None):
+    """
+    Кэширует результат метода класса DAO.
+
+    Аргументы и результат метода должны сериализоваться в JSON (словари,
+    списки, строки, числа). Результат из кэша разделяется между вызовами и
+    не должен изменяться.
+
+    :param tags: Таблицы, от которых зависит результат.
+    :param ttl: Время жизни значения в Redis, по умолчанию CACHE_TTL_S.
+    :param negative_ttl: Время жизни результата None, по умолчанию CACHE_NEGATIVE_TTL_S.
+    """
+    if not tags:
+        raise ValueError("Укажите хотя бы один тег кэша")
+    cached_tags.update(tags)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(cls, *args, **kwargs):
+            if not settings.CACHE_ENABLED:
+                return await func(cls, *args, **kwargs)
+            key = cache_key(func.__qualname__, args, kwargs)
+            return await get_or_load(
+                key,
+                tags,
+                lambda: func(cls, *args, **kwargs),
+                settings.CACHE_TTL_S if ttl is None else ttl,
+                settings.CACHE_NEGATIVE_TTL_S if negative_ttl is None else negative_ttl,
+            )
+
+        wrapper.cache_tags = tags
+        return wrapper
+
+    return decorator
+
+
+async def get_or_load(
+    key: str,
+    tags: Sequence[str],
+    load: Callable[[], Awaitable],
+    ttl: int,
+    negative_ttl: int,
+):
+    """
+    Возвращает значение из L1, L2 или загружает его, объединяя одновременные промахи.
+    """
+    generations = tuple(_local_generations.get(tag, 0) for tag in tags)
+    entry = _l1.get(key)
+    if entry is not None and entry[0] > time.monotonic() and entry[1] == generations:
+        _l1.move_to_end(key)
+        return entry[2]
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(
+            _load(key, tags, load, ttl, negative_ttl, generations)
+        )
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Отмена одного ожидающего не отменяет общую загрузку
+    return await asyncio.shield(task)
+
+
+async def _load(key, tags, load, ttl, negative_ttl, generations):
+    versions = None
+    try:
+        payload, versions = await _read_l2(key, tags)
+        if payload is not None:
+            stored = orjson.loads(payload)
+            if stored["t"] == versions:
+                _remember(key, generations, stored["v"])
+                return stored["v"]
+    except RedisError as e:
+        logger.warning(f"DAO cache read failed for {key}: {e}")
+
+    # Версии прочитаны до запроса к базе: если запись произойдет во время
+    # загрузки, сохраненное значение сразу окажется устаревшим. Загрузка
+    # выполняется отдельной задачей, выбор базы не влияет на запрос
+    read_from_primary()
+    value = await load()
+    if versions is not None:
+        try:
+            await redis_client.set(
+                key,
+                orjson.dumps({"t": versions, "v": value}),
+                ex=negative_ttl if value is None else ttl,
+            )
+        except RedisError as e:
+            logger.warning(f"DAO cache write failed for {key}: {e}")
+    _remember(key, generations, value)
+    return value
+
+
+async def _read_l2(key: str, tags: Sequence[str]) -> Tuple[Optional[bytes], List[str]]:
+    """
+    Читает значение и версии тегов за один обмен с Redis.
+
+    Отсутствующие версии (первый запуск, очистка Redis) инициализируются
+    текущим временем, чтобы не совпасть с версиями значений, сохраненных ранее.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.get(key)
+    for tag in tags:
+        pipe.get(tag_key(tag))
+    payload, *versions = await pipe.execute()
+    missing = [tag for tag, version in zip(tags, versions) if version is None]
+    if missing:
+        pipe = redis_client.pipeline(transaction=False)
+        for tag in missing:
+            pipe.set(tag_key(tag), time.time_ns(), nx=True)
+        for tag in missing:
+            pipe.get(tag_key(tag))
+        initialized = dict(zip(missing, (await pipe.execute())[len(missing):]))
+        versions = [
+            initialized[tag] if version is None else version
+            for tag, version in zip(tags, versions)
+        ]
+    return payload, [_decode(version) for version in versions]
+
+
+def _remember(key: str, generations: tuple, value):
+    if settings.CACHE_L1_TTL_S <= 0:
+        return
+    _l1[key] = (time.monotonic() + settings.CACHE_L1_TTL_S, generations, value)
+    _l1.move_to_end(key)
+    while len(_l1) > settings.CACHE_L1_MAX_ENTRIES:
+        _l1.popitem(last=False)
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+async def invalidate(*tags: str):
+    """
+    Делает устаревшими кэшированные чтения, зависящие от тегов.
+
+    Вызывается после фиксации транзакции. Версия тега заменяется текущим
+    временем, L1 процесса сбрасывается сразу.
+    """
+    tags = [tag for tag in tags if tag in cached_tags]
+    if not tags:
+        return
+    for tag in tags:
+        _local_generations[tag] = _local_generations.get(tag, 0) + 1
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.set(tag_key(tag), time.time_ns())
+        await pipe.execute()
+    except RedisError as e:
+        # Другие процессы могут отдавать устаревшие данные до истечения TTL
+        logger.error(f"DAO cache invalidation failed for {tags}: {e}")
@@ -0,0 +1,131 @@
+"""
+Маршрутизация запросов DAO между основной базой и репликами.
+
+Чтения идут на реплики, записи - в основную базу. После записи пользователь
+на DB_STICKY_SECONDS "прилипает" к основной базе (ключ в Redis), чтобы
+отправитель сразу видел свои сообщения, даже если реплика отстает.
+Без DATABASE_REPLICA_URLS все запросы идут в основную базу и Redis не используется.
+"""
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.database import async_session_maker, replica_engines, replica_session_makers
+from app.observability.sql import dao_method_scope
+from app.redis.redis_client import redis_client
+
+
+logger = logging.getLogger(__name__)
+
+# Пользователь текущего запроса, устанавливается в get_current_user_id
+current_user_id: ContextVar[Optional[int]] = ContextVar("current_user_id", default=None)
+# Читать ли с основной базы до конца запроса; None - еще не проверено в Redis
+_use_primary: ContextVar[Optional[bool]] = ContextVar("use_primary", default=None)
+
+_round_robin = itertools.count()
+
+
+def sticky_key(user_id: int) -> str:
+    return f"db:sticky:{user_id}"
+
+
+def bind_user(user_id: int):
+    """
+    Запоминает пользователя текущего запроса для учета его недавних записей.
+    """
+    current_user_id.set(user_id)
+    _use_primary.set(None)
+
+
+def read_from_primary():
+    """
+    Направляет чтения текущего контекста (запроса или задачи) в основную базу.
+    """
+    _use_primary.set(True)
+
+
+def choose_replica() -> async_sessionmaker:
+    """
+    Выбирает реплику по стратегии DB_REPLICA_STRATEGY.
+    """
+    if settings.DB_REPLICA_STRATEGY == "least_loaded":
+        index = min(
+            range(len(replica_engines)),
+            key=lambda i: replica_engines[i].sync_engine.pool.checkedout(),
+        )
+    else:
+        index = next(_round_robin) % len(replica_session_makers)
+    return replica_session_makers[index]
+
+
+async def _should_use_primary() -> bool:
+    use_primary = _use_primary.get()
+    if use_primary is None:
+        use_primary = False
+        user_id = current_user_id.get()
+        if user_id is not None:
+            try:
+                use_primary = bool(await redis_client.exists(sticky_key(user_id)))
+            except RedisError as e:
+                # Без Redis нельзя проверить недавние записи, надежнее читать с основной базы
+                logger.warning(f"Replica stickiness check failed: {e}")
+                use_primary = True
+        _use_primary.set(use_primary)
+    return use_primary
+
+
+@asynccontextmanager
+async def read_session():
+    """
+    Сессия для запросов только на чтение: реплика или основная база,
+    если текущий пользователь недавно что-то записал.
+    """
+    if replica_session_makers and not await _should_use_primary():
+        session_maker = choose_replica()
+    else:
+        session_maker = async_session_maker
+    # Метод DAO вызывает __aenter__, который выполняет этот генератор
+    with dao_method_scope(depth=2):
+        async with session_maker() as session:
+            yield session
+
+
+def replicas_enabled() -> bool:
+    return bool(replica_session_makers)
+
+
+@asynccontextmanager
+async def write_session(sticky: bool = True):
+    """
+    Сессия основной базы для записи.
+
+    :param sticky: После успешного завершения направлять последующие чтения
+        пользователя в основную базу на DB_STICKY_SECONDS. Отключается для
+        служебных записей, результат которых пользователь не читает.
+    """
+    # Метод DAO вызывает __aenter__, который выполняет этот генератор
+    with dao_method_scope(depth=2):
+        async with async_session_maker() as session:
+            yield session
+    if sticky and replica_session_makers:
+        await mark_recent_write()
+
+
+async def mark_recent_write():
+    """
+    Направляет чтения текущего пользователя в основную базу на DB_STICKY_SECONDS.
+    """
+    _use_primary.set(True)
+    user_id = current_user_id.get()
+    if user_id is None:
+        return
+    try:
+        await redis_client.set(sticky_key(user_id), 1, ex=settings.DB_STICKY_SECONDS)
+    except RedisError as e:
+        logger.warning(f"Failed to mark recent write for user {user_id}: {e}")
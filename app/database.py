@@ -13,7 +13,17 @@ from app.config import settings
 
 
 engine = create_async_engine(url=settings.database_url)
-async_session_maker = async_sessionmaker(engine, class_=AsyncSession)
+# Объекты остаются доступны после commit (например, ID созданной записи)
+async_session_maker = async_sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+
+# Реплики только для чтения; выбор реплики и маршрутизация в app/dao/routing.py
+replica_engines = [create_async_engine(url=url) for url in settings.DATABASE_REPLICA_URLS]
+replica_session_makers = [
+    async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)
+    for replica in replica_engines
+]
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -13,6 +13,15 @@ class TokenNoFoundException(HTTPException):
         )
 
 
+class TooManyRequestsException(HTTPException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много запросов, попробуйте позже",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
 UserAlreadyExistsException = HTTPException(
     status_code=status.HTTP_409_CONFLICT, detail="Пользователь уже существует"
 )
@@ -37,3 +46,25 @@ NoUserIdException = HTTPException(
 ForbiddenException = HTTPException(
     status_code=status.HTTP_403_FORBIDDEN, detail="Недостаточно прав!"
 )
+
+SearchTimeoutException = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="Поиск занял слишком много времени, уточните запрос",
+)
+
+RoomNotFoundException = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND, detail="Комната не найдена"
+)
+
+NotRoomMemberException = HTTPException(
+    status_code=status.HTTP_403_FORBIDDEN, detail="Вы не участник этой комнаты"
+)
+
+RoomMemberNotFoundException = HTTPException(
+    status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден"
+)
+
+ClientMessageIdConflictException = HTTPException(
+    status_code=status.HTTP_409_CONFLICT,
+    detail="client_message_id уже использован для другого сообщения",
+)
@@ -1,23 +1,34 @@
 import asyncio
+import logging
 from contextlib import asynccontextmanager
 
-import ngrok
 from fastapi import FastAPI, Request
 from fastapi.responses import RedirectResponse
 from fastapi.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
 
+from app.assets.staticfiles import PrecompressedStaticFiles
+from app.chat.connections import manager
+from app.chat.fanout import start_fanout, stop_fanout
+from app.database import engine, replica_engines
 from app.exceptions import TokenExpiredException, TokenNoFoundException
-from app.telegram.bot import start_telegram_bot
+from app.observability.loop_lag import start_loop_lag_monitor, stop_loop_lag_monitor
+from app.observability.middleware import RequestObservabilityMiddleware
+from app.observability.router import router as observability_router
+from app.observability.sql import instrument_engine
 from app.users.router import router as users_router
 from app.chat.router import router as chat_router
+from app.rooms.router import router as rooms_router
 from app.redis.redis_client import redis_client
 from app.config import settings
 
 
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -27,29 +38,44 @@ async def lifespan(app: FastAPI):
 
     1. При включенной настройке `SHOW_WITH_NGROK` подключает ngrok для проброса публичного URL и отображает его в консоли.
     2. Инициализирует кэш FastAPI на основе Redis.
-    3. Запускает асинхронную задачу для работы Telegram-бота.
-    4. Завершает задачу Telegram-бота и отключает ngrok (если был активирован) при завершении работы приложения.
+    3. В режиме `TG_MODE=polling` запускает асинхронную задачу для работы Telegram-бота.
+       В режиме webhook бот работает отдельным сервисом (`python -m app.telegram.runner`).
+    4. Запускает сторож задержки event loop (`LOOP_LAG_MONITOR_ENABLED`).
+    5. Подписывает процесс на события WebSocket других процессов (`WS_FANOUT_ENABLED`).
+    6. Завершает задачу Telegram-бота и отключает ngrok (если был активирован) при завершении работы приложения.
 
     Параметры:
     - app: объект FastAPI приложения.
     """
+    # Тяжелые интеграции импортируются только при включенной настройке
     if settings.SHOW_WITH_NGROK:
+        import ngrok
+
         ngrok_auth_token = settings.NGROK_AUTH_TOKEN
         ngrok.set_auth_token(ngrok_auth_token)
         public_url = ngrok.connect(8000)
 
     FastAPICache.init(RedisBackend(redis_client), prefix="fastapi-cache")
 
-    task = asyncio.create_task(start_telegram_bot())
+    task = None
+    if settings.TG_MODE == "polling":
+        from app.telegram.bot import start_telegram_bot
+
+        task = asyncio.create_task(start_telegram_bot())
+    start_loop_lag_monitor()
+    start_fanout(manager.deliver_remote)
     yield
-    task.cancel()
-    await task
+    await stop_fanout()
+    await stop_loop_lag_monitor()
+    if task is not None:
+        task.cancel()
+        await task
     if settings.SHOW_WITH_NGROK:
         ngrok.disconnect(public_url)
 
 
 app = FastAPI(lifespan=lifespan)
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory="app/static"), name="static")
 
 # Настройка CORS для разрешения запросов из других доменов
 app.add_middleware(
@@ -60,9 +86,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Учет SQL-запросов и команд Redis каждого запроса, профилирование по запросу
+app.add_middleware(RequestObservabilityMiddleware)
+for db_engine in (engine, *replica_engines):
+    instrument_engine(db_engine)
+
 # Подключение маршрутов пользователей и чата
 app.include_router(users_router)
 app.include_router(chat_router)
+app.include_router(rooms_router)
+app.include_router(observability_router)
 
 
 @app.get("/")
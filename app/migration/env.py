@@ -14,6 +14,8 @@ from app.config import settings
 from app.users.models import User
 from app.chat.models import Message
 from app.telegram.models import TelegramUser
+from app.rooms.models import Room, RoomMember
+from app.outbox.models import OutboxEvent
 
 
 config = context.config
@@ -0,0 +1,38 @@
+"""messages client_message_id
+
+Revision ID: 9b4e6d2a1c83
+Revises: e5a9c3b17d42
+Create Date: 2026-10-19 16:05:27.318402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4e6d2a1c83'
+down_revision: Union[str, None] = 'e5a9c3b17d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Колонка без значения по умолчанию не перезаписывает таблицу
+    op.add_column('messages', sa.Column('client_message_id', sa.Uuid(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_messages_sender_id_client_message_id', 'messages',
+            ['sender_id', 'client_message_id'],
+            unique=True, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'uq_messages_sender_id_client_message_id', table_name='messages',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('messages', 'client_message_id')
@@ -0,0 +1,84 @@
+"""messages full text search
+
+Revision ID: b7c2e91f4a3d
+Revises: 0137f9fcb5b8
+Create Date: 2026-10-19 10:12:41.527310
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c2e91f4a3d'
+down_revision: Union[str, None] = '0137f9fcb5b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_CONFIG = 'russian'
+BACKFILL_BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    # Колонка без значения по умолчанию добавляется без перезаписи таблицы.
+    # GENERATED ALWAYS AS ... STORED перезаписал бы всю таблицу под эксклюзивной
+    # блокировкой, поэтому колонка поддерживается триггером и заполняется пачками.
+    op.add_column('messages', sa.Column('content_tsv', postgresql.TSVECTOR(), nullable=True))
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION messages_content_tsv_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.content_tsv := to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.content, ''));
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER messages_content_tsv_trigger
+        BEFORE INSERT OR UPDATE OF content ON messages
+        FOR EACH ROW EXECUTE FUNCTION messages_content_tsv_update()
+    """)
+
+    with op.get_context().autocommit_block():
+        backfill = (
+            f"UPDATE messages SET content_tsv = to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')) "
+            "WHERE content_tsv IS NULL"
+        )
+        if context.is_offline_mode():
+            op.execute(backfill)
+        else:
+            # Каждая пачка фиксируется отдельно, чтобы не держать блокировки строк
+            # и не раздувать WAL одной огромной транзакцией
+            bind = op.get_bind()
+            max_id = bind.execute(sa.text('SELECT coalesce(max(id), 0) FROM messages')).scalar()
+            for low in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+                bind.execute(
+                    sa.text(f'{backfill} AND id >= :low AND id < :high'),
+                    {'low': low, 'high': low + BACKFILL_BATCH_SIZE},
+                )
+
+        op.create_index(
+            'ix_messages_content_tsv', 'messages', ['content_tsv'],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True,
+        )
+        # Индексы для фильтра по участнику переписки и keyset-пагинации по id
+        op.create_index(
+            'ix_messages_sender_id_id', 'messages', ['sender_id', 'id'],
+            unique=False, postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_messages_recipient_id_id', 'messages', ['recipient_id', 'id'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_messages_recipient_id_id', table_name='messages', postgresql_concurrently=True)
+        op.drop_index('ix_messages_sender_id_id', table_name='messages', postgresql_concurrently=True)
+        op.drop_index('ix_messages_content_tsv', table_name='messages', postgresql_concurrently=True)
+    op.execute('DROP TRIGGER IF EXISTS messages_content_tsv_trigger ON messages')
+    op.execute('DROP FUNCTION IF EXISTS messages_content_tsv_update()')
+    op.drop_column('messages', 'content_tsv')
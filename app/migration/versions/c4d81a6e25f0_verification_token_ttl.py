@@ -0,0 +1,42 @@
+"""verification token ttl
+
+Revision ID: c4d81a6e25f0
+Revises: b7c2e91f4a3d
+Create Date: 2026-10-19 11:03:17.204955
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d81a6e25f0'
+down_revision: Union[str, None] = 'b7c2e91f4a3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('telegram_users', sa.Column('token_expires_at', sa.DateTime(), nullable=True))
+    op.alter_column('telegram_users', 'token', existing_type=sa.String(), nullable=True)
+    # Использованные токены больше не действуют, неиспользованным даем неделю
+    op.execute("UPDATE telegram_users SET token = NULL WHERE telegram_id IS NOT NULL")
+    op.execute(
+        "UPDATE telegram_users SET token_expires_at = now() + interval '7 days' "
+        "WHERE telegram_id IS NULL"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_telegram_users_token', 'telegram_users', ['token'],
+            unique=True, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_telegram_users_token', table_name='telegram_users', postgresql_concurrently=True)
+    op.execute("UPDATE telegram_users SET token = '' WHERE token IS NULL")
+    op.alter_column('telegram_users', 'token', existing_type=sa.String(), nullable=False)
+    op.drop_column('telegram_users', 'token_expires_at')
@@ -0,0 +1,43 @@
+"""outbox dead letter
+
+Revision ID: d2b8f4c61e07
+Revises: c3f7a1e9d254
+Create Date: 2026-10-19 19:41:12.604381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b8f4c61e07'
+down_revision: Union[str, None] = 'c3f7a1e9d254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'outbox_events',
+        sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    )
+    op.add_column(
+        'outbox_events',
+        sa.Column('next_attempt_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    )
+    op.add_column('outbox_events', sa.Column('last_error', sa.Text(), nullable=True))
+    op.add_column('outbox_events', sa.Column('dead_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'ix_outbox_events_pending_id', 'outbox_events', ['id'],
+        postgresql_where=sa.text('dead_at IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_events_pending_id', table_name='outbox_events')
+    op.drop_column('outbox_events', 'dead_at')
+    op.drop_column('outbox_events', 'last_error')
+    op.drop_column('outbox_events', 'next_attempt_at')
+    op.drop_column('outbox_events', 'attempts')
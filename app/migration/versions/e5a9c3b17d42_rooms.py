@@ -0,0 +1,81 @@
+"""rooms
+
+Revision ID: e5a9c3b17d42
+Revises: c4d81a6e25f0
+Create Date: 2026-10-19 12:41:08.913625
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a9c3b17d42'
+down_revision: Union[str, None] = 'c4d81a6e25f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'rooms',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'room_members',
+        sa.Column('room_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('last_read_message_id', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('room_id', 'user_id'),
+    )
+    op.create_index('ix_room_members_user_id', 'room_members', ['user_id'], unique=False)
+
+    # Новая колонка без значения по умолчанию и снятие NOT NULL не перезаписывают таблицу
+    op.add_column('messages', sa.Column('room_id', sa.Integer(), nullable=True))
+    op.alter_column('messages', 'recipient_id', existing_type=sa.Integer(), nullable=True)
+    # Ограничения добавляются NOT VALID и проверяются отдельно, без эксклюзивной
+    # блокировки messages на время полного прохода по таблице. Миграция идет в
+    # одной транзакции, поэтому VALIDATE выполняется в autocommit_block: ADD и
+    # DROP NOT NULL фиксируются раньше и отпускают ACCESS EXCLUSIVE, а проверка
+    # держит только SHARE UPDATE EXCLUSIVE, не мешающую чтению и записи
+    op.execute(
+        'ALTER TABLE messages ADD CONSTRAINT messages_room_id_fkey '
+        'FOREIGN KEY (room_id) REFERENCES rooms (id) ON DELETE CASCADE NOT VALID'
+    )
+    op.execute(
+        'ALTER TABLE messages ADD CONSTRAINT ck_messages_recipient_or_room '
+        'CHECK ((recipient_id IS NULL) <> (room_id IS NULL)) NOT VALID'
+    )
+
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE messages VALIDATE CONSTRAINT messages_room_id_fkey')
+        op.execute('ALTER TABLE messages VALIDATE CONSTRAINT ck_messages_recipient_or_room')
+        op.create_index(
+            'ix_messages_room_id_id', 'messages', ['room_id', 'id'],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_messages_room_id_id', table_name='messages', postgresql_concurrently=True)
+    op.execute('DELETE FROM messages WHERE room_id IS NOT NULL')
+    op.drop_constraint('ck_messages_recipient_or_room', 'messages', type_='check')
+    op.drop_constraint('messages_room_id_fkey', 'messages', type_='foreignkey')
+    op.alter_column('messages', 'recipient_id', existing_type=sa.Integer(), nullable=False)
+    op.drop_column('messages', 'room_id')
+    op.drop_index('ix_room_members_user_id', table_name='room_members')
+    op.drop_table('room_members')
+    op.drop_table('rooms')
@@ -0,0 +1,171 @@
+"""
+Сторож задержки event loop.
+
+Задача в event loop просыпается каждые LOOP_LAG_INTERVAL_MS и записывает,
+на сколько позже ожидаемого она проснулась, в гистограмму. Отдельный поток
+следит за отметкой последнего пробуждения: если loop не отвечает дольше
+LOOP_LAG_THRESHOLD_MS, поток снимает стек потока loop в момент блокировки
+(не чаще раза в LOOP_LAG_STACK_INTERVAL_S) и пишет его в лог. Так находятся
+синхронные вызовы в асинхронных обработчиках, которые замораживают все
+WebSocket-подключения процесса.
+"""
+import asyncio
+import bisect
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы, мс
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LagHistogram:
+    """
+    Гистограмма задержек с фиксированными корзинами (как histogram в Prometheus).
+    """
+
+    def __init__(self, buckets=LAG_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.sum += value_ms
+        self.max = max(self.max, value_ms)
+
+    def quantile(self, q: float) -> float:
+        """
+        Оценка квантиля по верхней границе корзины.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum, 3),
+            "max_ms": round(self.max, 3),
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+    def prometheus(self, name: str) -> str:
+        """
+        Гистограмма в текстовом формате Prometheus (значения в секундах).
+        """
+        lines = [f"# TYPE {name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound / 1000}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum {self.sum / 1000}")
+        lines.append(f"{name}_count {self.count}")
+        return "\n".join(lines) + "\n"
+
+
+class LoopLagMonitor:
+    """
+    Измеряет задержку event loop и ловит стек при блокировке.
+    """
+
+    def __init__(self, interval_ms: float, threshold_ms: float, stack_interval_s: float):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.stack_interval = stack_interval_s
+        self.histogram = LagHistogram()
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._captured_heartbeat: Optional[float] = None
+        self._last_capture = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._thread_id: Optional[int] = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._tick())
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._thread.join()
+
+    async def _tick(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self.histogram.observe(max(0.0, now - expected) * 1000)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.threshold or heartbeat == self._captured_heartbeat:
+                continue
+            # Одна запись на каждую блокировку, стеки не чаще stack_interval
+            self._captured_heartbeat = heartbeat
+            self.stalls += 1
+            now = time.monotonic()
+            if now - self._last_capture < self.stack_interval:
+                logger.warning(f"Event loop blocked for {blocked * 1000:.0f} ms")
+                continue
+            self._last_capture = now
+            frame = sys._current_frames().get(self._thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            logger.warning(
+                f"Event loop blocked for {blocked * 1000:.0f} ms, loop thread stack:\n{stack}"
+            )
+
+
+monitor: Optional[LoopLagMonitor] = None
+
+
+def start_loop_lag_monitor() -> Optional[LoopLagMonitor]:
+    """
+    Запускает сторож в текущем event loop, если он включен в настройках.
+    """
+    global monitor
+    if not settings.LOOP_LAG_MONITOR_ENABLED:
+        return None
+    monitor = LoopLagMonitor(
+        settings.LOOP_LAG_INTERVAL_MS,
+        settings.LOOP_LAG_THRESHOLD_MS,
+        settings.LOOP_LAG_STACK_INTERVAL_S,
+    )
+    monitor.start()
+    return monitor
+
+
+async def stop_loop_lag_monitor():
+    global monitor
+    if monitor is not None:
+        await monitor.stop()
+        monitor = None
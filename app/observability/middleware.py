@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.observability.profiler import (
+    PROFILE_HEADER,
+    TaskSampler,
+    profile_name,
+    save_profile,
+    verify_profile_token,
+)
+from app.observability.stats import RequestStats, start_request_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+def _server_timing(stats: RequestStats, total: float) -> str:
+    return (
+        f'sql;desc="{stats.sql_queries} queries, {stats.db_checkouts} sessions";'
+        f"dur={stats.sql_time * 1000:.1f}, "
+        f'redis;desc="{stats.redis_commands} commands, '
+        f'{stats.redis_round_trips} round trips", '
+        f"total;dur={total * 1000:.1f}"
+    )
+
+
+class RequestObservabilityMiddleware:
+    """
+    Считает SQL-запросы и команды Redis каждого HTTP-запроса и предупреждает
+    о подозрительных обработчиках: больше SQL_QUERY_WARN_THRESHOLD запросов
+    или один и тот же запрос SQL_REPEAT_WARN_THRESHOLD раз и больше (N+1).
+
+    Если профилирование включено (PROFILING_ENABLED или заголовок
+    X-Profile-Token с подписью PROFILING_SECRET), запрос профилируется:
+    профиль сохраняется в PROFILING_DIR, имя файла возвращается в заголовке
+    X-Profile, счетчики - в заголовке Server-Timing.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = start_request_stats()
+        started = time.perf_counter()
+        sampler = name = None
+        if settings.PROFILING_ENABLED or verify_profile_token(
+            Headers(scope=scope).get(PROFILE_HEADER)
+        ):
+            sampler = TaskSampler(
+                asyncio.current_task(), settings.PROFILING_INTERVAL_MS / 1000
+            )
+            name = profile_name(scope["method"], scope["path"])
+            sampler.start()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and sampler is not None:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", _server_timing(stats, time.perf_counter() - started)
+                )
+                headers.append("X-Profile", name)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if sampler is not None:
+                sampler.stop()
+                save_profile(sampler, name)
+                logger.info(f"Profile of {scope['method']} {scope['path']} saved to {name}")
+            self._check(scope, stats)
+
+    @staticmethod
+    def _check(scope: Scope, stats: RequestStats):
+        repeated = stats.repeated_statements(settings.SQL_REPEAT_WARN_THRESHOLD)
+        if stats.sql_queries <= settings.SQL_QUERY_WARN_THRESHOLD and not repeated:
+            return
+        details = "; ".join(
+            f"{count}x {' '.join(statement.split())[:200]}" for statement, count in repeated
+        )
+        logger.warning(
+            f"{scope['method']} {scope['path']}: {stats.sql_queries} SQL queries in "
+            f"{stats.db_checkouts} sessions, {stats.redis_commands} Redis commands"
+            + (f"; repeated: {details}" if details else "")
+        )
@@ -0,0 +1,149 @@
+"""
+Сэмплирующий профилировщик одного запроса.
+
+Отдельный поток с интервалом PROFILING_INTERVAL_MS снимает стек корутины,
+обрабатывающей запрос. Если задача запроса в этот момент выполняется, берется
+стек потока event loop (время CPU), иначе - цепочка await приостановленной
+корутины (ожидание базы, Redis, сети). Результат сохраняется в формате
+folded stacks, который открывают speedscope и flamegraph.pl.
+
+Подписанный токен для заголовка X-Profile-Token выдается командой:
+
+    python -m app.observability.profiler --ttl 300
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List, Optional
+
+from app.config import settings
+
+
+PROFILE_HEADER = "x-profile-token"
+
+
+def sign_profile_token(expires_at: int) -> str:
+    """
+    Возвращает токен профилирования, действительный до expires_at (unix time).
+    """
+    signature = hmac.new(
+        settings.PROFILING_SECRET.encode(), str(expires_at).encode(), hashlib.sha256
+    ).hexdigest()
+    return f"{expires_at}:{signature}"
+
+
+def verify_profile_token(token: Optional[str]) -> bool:
+    """
+    Проверяет подпись и срок действия токена из заголовка X-Profile-Token.
+    """
+    if not token or not settings.PROFILING_SECRET:
+        return False
+    expires_at, _, _ = token.partition(":")
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(token, sign_profile_token(int(expires_at)))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _thread_stack(frame) -> List[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _await_chain(task: asyncio.Task) -> List[str]:
+    stack = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return stack
+
+
+class TaskSampler:
+    """
+    Периодически снимает стек задачи asyncio из отдельного потока.
+    """
+
+    def __init__(self, task: asyncio.Task, interval: float):
+        self.task = task
+        self.loop = task.get_loop()
+        self.thread_id = threading.get_ident()
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.samples[self._sample()] += 1
+            except Exception:
+                # Стек меняется во время чтения; потерянный сэмпл не важен
+                continue
+
+    def _sample(self) -> str:
+        if asyncio.current_task(self.loop) is self.task:
+            frame = sys._current_frames().get(self.thread_id)
+            return ";".join(["running", *_thread_stack(frame)])
+        return ";".join(["waiting", *_await_chain(self.task)])
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def profile_name(method: str, path: str) -> str:
+    """
+    Имя файла профиля запроса в PROFILING_DIR.
+    """
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    return (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{method.lower()}-{slug}"
+        f"-{os.getpid()}-{threading.get_ident() % 10000}-{time.perf_counter_ns() % 10**6}.folded"
+    )
+
+
+def save_profile(sampler: TaskSampler, name: str):
+    """
+    Сохраняет профиль в PROFILING_DIR.
+    """
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    with open(os.path.join(settings.PROFILING_DIR, name), "w") as file:
+        file.write(sampler.folded())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Выдает токен для заголовка X-Profile-Token.")
+    parser.add_argument("--ttl", type=int, default=300, help="Срок действия, секунды")
+    args = parser.parse_args()
+    if not settings.PROFILING_SECRET:
+        parser.error("PROFILING_SECRET is not set")
+    print(sign_profile_token(int(time.time()) + args.ttl))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import PlainTextResponse
+
+from app.exceptions import ForbiddenException
+from app.observability import loop_lag
+from app.observability.profiler import verify_profile_token
+from app.observability.sql import ORDER_FIELDS, reset_query_stats, top_queries
+from app.redis.redis_client import pool_stats
+
+
+router = APIRouter(prefix="/observability", tags=["Observability"])
+
+
+def check_token(token: Optional[str]):
+    """
+    Доступ к статистике только по токену профилирования (PROFILING_SECRET).
+    """
+    if not verify_profile_token(token):
+        raise ForbiddenException
+
+
+@router.get("/queries")
+async def get_query_stats(
+    limit: int = Query(20, ge=1, le=200),
+    order_by: str = Query("total", pattern=f"^({'|'.join(ORDER_FIELDS)})$"),
+    x_profile_token: Optional[str] = Header(None),
+):
+    """
+    Самые затратные отпечатки SQL-запросов процесса, обработавшего запрос.
+
+    Статистика собирается в памяти каждого процесса отдельно, поле pid
+    показывает, какой процесс ответил.
+
+    :param limit: Количество отпечатков
+    :param order_by: Сортировка: total, count, p95, max или rows
+    """
+    check_token(x_profile_token)
+    return {"pid": os.getpid(), "queries": top_queries(limit, order_by)}
+
+
+@router.delete("/queries")
+async def clear_query_stats(x_profile_token: Optional[str] = Header(None)):
+    """
+    Сбрасывает статистику SQL-запросов процесса, обработавшего запрос.
+    """
+    check_token(x_profile_token)
+    reset_query_stats()
+    return {"pid": os.getpid(), "status": "ok"}
+
+
+@router.get("/loop-lag")
+async def get_loop_lag(x_profile_token: Optional[str] = Header(None)):
+    """
+    Гистограмма задержки event loop и количество блокировок процесса.
+    """
+    check_token(x_profile_token)
+    if loop_lag.monitor is None:
+        return {"pid": os.getpid(), "enabled": False}
+    return {
+        "pid": os.getpid(),
+        "enabled": True,
+        "stalls": loop_lag.monitor.stalls,
+        "lag": loop_lag.monitor.histogram.as_dict(),
+    }
+
+
+@router.get("/redis")
+async def get_redis_pool(x_profile_token: Optional[str] = Header(None)):
+    """
+    Использование пула соединений Redis процессом, обработавшим запрос.
+    """
+    check_token(x_profile_token)
+    return {"pid": os.getpid(), "pool": pool_stats()}
+
+
+def redis_pool_metrics() -> str:
+    stats = pool_stats()
+    lines = [
+        "# TYPE redis_pool_connections_in_use gauge",
+        f"redis_pool_connections_in_use {stats['in_use']}",
+        "# TYPE redis_pool_max_connections gauge",
+        f"redis_pool_max_connections {stats['max_connections']}",
+    ]
+    if "acquired" in stats:
+        lines += [
+            "# TYPE redis_pool_acquired_total counter",
+            f"redis_pool_acquired_total {stats['acquired']}",
+            "# TYPE redis_pool_acquire_seconds_total counter",
+            f"redis_pool_acquire_seconds_total {stats['acquire_seconds']}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(x_profile_token: Optional[str] = Header(None)):
+    """
+    Метрики процесса в текстовом формате Prometheus.
+
+    Как и остальная статистика, доступны только с X-Profile-Token: в задании
+    сбора Prometheus токен передается заголовком (http_headers).
+    """
+    check_token(x_profile_token)
+    metrics = redis_pool_metrics()
+    if loop_lag.monitor is not None:
+        metrics += loop_lag.monitor.histogram.prometheus("event_loop_lag_seconds") + (
+            "# TYPE event_loop_stalls_total counter\n"
+            f"event_loop_stalls_total {loop_lag.monitor.stalls}\n"
+        )
+    return metrics
@@ -0,0 +1,222 @@
+"""
+Инструментирование SQLAlchemy: счетчики запроса, агрегаты по отпечаткам
+запросов и журнал медленных запросов.
+
+Отпечаток (fingerprint) - текст запроса, в котором литералы, параметры и
+списки значений заменены на "?", поэтому запросы одной формы с разными
+значениями попадают в одну строку статистики.
+"""
+import logging
+import re
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.observability.stats import record_db_checkout, record_sql
+
+
+logger = logging.getLogger(__name__)
+
+# Количество последних длительностей на отпечаток для расчета p95
+DURATION_WINDOW = 1000
+# Ограничение числа отпечатков, чтобы динамический SQL не раздувал память
+MAX_FINGERPRINTS = 1000
+OTHER_FINGERPRINT = "<other>"
+ORDER_FIELDS = ("total", "count", "p95", "max", "rows")
+
+# Параметр с необязательным приведением типа: ?::INTEGER, ?::VARCHAR[]
+_PARAM = r"\?(?:::\w+(?:\[\])?)?"
+_NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\$\d+|%\(\w+\)s|%s"), "?"),
+    (re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\s+"), " "),
+    (re.compile(rf"\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)"), "(?+)"),
+    (re.compile(r"(\(\?\+\))(?:\s*,\s*\(\?\+\))+"), r"\1, ..."),
+)
+
+# Метод DAO, открывший текущую сессию (для журнала медленных запросов)
+current_dao_method: ContextVar[Optional[str]] = ContextVar(
+    "current_dao_method", default=None
+)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """
+    Нормализует текст запроса в отпечаток.
+    """
+    for pattern, replacement in _NORMALIZE:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+def parameter_shape(parameters, executemany: bool = False) -> str:
+    """
+    Описывает параметры запроса типами без значений (значения могут содержать
+    персональные данные).
+    """
+    if executemany:
+        if not parameters:
+            return "[]"
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        items = ", ".join(f"{key}: {_value_shape(value)}" for key, value in parameters.items())
+        return f"{{{items}}}"
+    if isinstance(parameters, (list, tuple)):
+        return f"({', '.join(_value_shape(value) for value in parameters)})"
+    return type(parameters).__name__
+
+
+def _value_shape(value) -> str:
+    if isinstance(value, (str, bytes, list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+class FingerprintStats:
+    """
+    Скользящие агрегаты запросов одного отпечатка.
+    """
+
+    __slots__ = ("fingerprint", "count", "total", "max", "rows", "durations", "callers")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.durations = deque(maxlen=DURATION_WINDOW)
+        self.callers = set()
+
+    def add(self, duration: float, rows: int, caller: Optional[str]):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.rows += max(rows, 0)
+        self.durations.append(duration)
+        if caller is not None and len(self.callers) < 10:
+            self.callers.add(caller)
+
+    @property
+    def p95(self) -> float:
+        durations = sorted(self.durations)
+        return durations[int(len(durations) * 0.95)] if durations else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0,
+            "p95_ms": round(self.p95 * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "rows": self.rows,
+            "callers": sorted(self.callers),
+        }
+
+
+query_stats: Dict[str, FingerprintStats] = {}
+
+
+def record_query(statement: str, duration: float, rows: int, parameters, executemany: bool):
+    """
+    Добавляет запрос в агрегаты и пишет в журнал, если он медленнее SQL_SLOW_QUERY_MS.
+    """
+    key = fingerprint(statement)
+    stats = query_stats.get(key)
+    if stats is None:
+        if len(query_stats) >= MAX_FINGERPRINTS:
+            key = OTHER_FINGERPRINT
+            stats = query_stats.get(key)
+        if stats is None:
+            stats = query_stats[key] = FingerprintStats(key)
+    caller = current_dao_method.get()
+    stats.add(duration, rows, caller)
+
+    if duration * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        logger.warning(
+            f"Slow query {duration * 1000:.1f} ms in {caller or 'unknown'}: {key} "
+            f"params={parameter_shape(parameters, executemany)} rows={rows}"
+        )
+
+
+def top_queries(limit: int = 20, order_by: str = "total") -> List[dict]:
+    """
+    Возвращает самые затратные отпечатки запросов текущего процесса.
+
+    :param limit: Количество отпечатков.
+    :param order_by: Поле сортировки: total, count, p95, max или rows.
+    """
+    return [
+        stats.as_dict()
+        for stats in sorted(
+            list(query_stats.values()),
+            key=lambda stats: getattr(stats, order_by),
+            reverse=True,
+        )[:limit]
+    ]
+
+
+def reset_query_stats():
+    query_stats.clear()
+
+
+@contextmanager
+def dao_method_scope(depth: int = 1):
+    """
+    Запоминает метод DAO для журнала медленных запросов на время блока with.
+
+    :param depth: На сколько кадров выше функции, открывшей блок, находится
+        метод DAO (1 - непосредственно вызвавшая ее функция).
+    """
+    # Кадры 0 и 1 - этот генератор и __enter__ контекстного менеджера
+    frame = sys._getframe(depth + 2)
+    owner = frame.f_locals.get("cls")
+    name = (
+        f"{owner.__name__}.{frame.f_code.co_name}"
+        if isinstance(owner, type)
+        else frame.f_code.co_qualname
+    )
+    token = current_dao_method.set(name)
+    try:
+        yield
+    finally:
+        current_dao_method.reset(token)
+
+
+def instrument_engine(engine: AsyncEngine):
+    """
+    Подключает учет SQL-запросов и подключений из пула: счетчики текущего
+    HTTP-запроса, агрегаты по отпечаткам и журнал медленных запросов.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start"].pop()
+        record_sql(statement, duration)
+        record_query(statement, duration, cursor.rowcount, parameters, executemany)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        record_db_checkout()
@@ -0,0 +1,81 @@
+"""
+Счетчики SQL-запросов и команд Redis в рамках одного HTTP-запроса.
+
+Статистика хранится в contextvar, который выставляет RequestObservabilityMiddleware.
+Вне запроса (Celery, бот) функции record_* ничего не делают.
+"""
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+
+class RequestStats:
+    """
+    Статистика обращений к базе данных и Redis за время обработки запроса.
+    """
+
+    __slots__ = (
+        "sql_queries",
+        "sql_time",
+        "db_checkouts",
+        "statements",
+        "redis_commands",
+        "redis_round_trips",
+    )
+
+    def __init__(self):
+        self.sql_queries = 0
+        self.sql_time = 0.0
+        # Каждая сессия DAO берет отдельное подключение из пула
+        self.db_checkouts = 0
+        # Количество выполнений каждого текста запроса (запросы параметризованы,
+        # поэтому одинаковый текст означает одинаковую форму запроса)
+        self.statements: Counter = Counter()
+        self.redis_commands = 0
+        self.redis_round_trips = 0
+
+    def repeated_statements(self, threshold: int):
+        """
+        Возвращает запросы, выполненные не меньше threshold раз (признак N+1).
+        """
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def start_request_stats() -> RequestStats:
+    stats = RequestStats()
+    _request_stats.set(stats)
+    return stats
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def record_sql(statement: str, duration: float):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.sql_queries += 1
+        stats.sql_time += duration
+        stats.statements[statement] += 1
+
+
+def record_db_checkout():
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_checkouts += 1
+
+
+def record_redis(commands: int = 1):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.redis_commands += commands
+        stats.redis_round_trips += 1
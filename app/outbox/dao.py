@@ -0,0 +1,92 @@
+import logging
+from datetime import timedelta
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.dao.base import BaseDAO
+from app.dao.routing import write_session
+from app.outbox.models import OutboxEvent
+
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDAO(BaseDAO):
+    model = OutboxEvent
+
+    @classmethod
+    async def relay_batch(
+        cls,
+        handle: Callable[[AsyncSession, OutboxEvent], Awaitable[None]],
+        limit: int,
+    ) -> int:
+        """
+        Асинхронно обрабатывает пачку самых старых ожидающих событий.
+
+        События блокируются через FOR UPDATE SKIP LOCKED, поэтому несколько
+        процессов relay не обрабатывают одно событие одновременно. Каждое
+        событие обрабатывается в своей точке сохранения (SAVEPOINT): ошибка
+        handle откатывает изменения только этого события. Успешные события
+        удаляются, неудачные откладываются на OUTBOX_RETRY_DELAY_S, удваивая
+        задержку с каждой попыткой, после OUTBOX_MAX_ATTEMPTS попыток
+        помечаются dead_at и больше не выбираются. Все изменения фиксируются
+        после пачки: если фиксация не удалась, события будут обработаны
+        повторно (at-least-once).
+
+        Аргументы:
+            handle: Корутина, получающая сессию транзакции и событие.
+            limit: Максимальный размер пачки.
+
+        Возвращает:
+            Количество выбранных событий.
+        """
+        query = (
+            select(cls.model)
+            .where(cls.model.dead_at.is_(None), cls.model.next_attempt_at <= func.now())
+            .order_by(cls.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        async with write_session(sticky=False) as session:
+            async with session.begin():
+                events = list((await session.execute(query)).scalars())
+                if not events:
+                    return 0
+                handled: List[int] = []
+                for event in events:
+                    # Откат точки сохранения истекает атрибуты объектов сессии
+                    event_id, attempts = event.id, event.attempts
+                    try:
+                        async with session.begin_nested():
+                            await handle(session, event)
+                    except Exception as e:
+                        await cls._fail(session, event_id, attempts + 1, repr(e))
+                    else:
+                        handled.append(event_id)
+                if handled:
+                    await session.execute(
+                        delete(cls.model)
+                        .where(cls.model.id.in_(handled))
+                        .execution_options(synchronize_session=False)
+                    )
+        return len(events)
+
+    @classmethod
+    async def _fail(cls, session: AsyncSession, event_id: int, attempts: int, error: str):
+        values = {"attempts": attempts, "last_error": error}
+        if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            values["dead_at"] = func.now()
+            logger.error(f"Outbox event {event_id} dead after {attempts} attempts: {error}")
+        else:
+            delay = settings.OUTBOX_RETRY_DELAY_S * 2 ** (attempts - 1)
+            values["next_attempt_at"] = func.now() + timedelta(seconds=delay)
+            logger.warning(f"Outbox event {event_id} failed, attempt {attempts}: {error}")
+        await session.execute(
+            update(cls.model)
+            .where(cls.model.id == event_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
@@ -0,0 +1,50 @@
+"""
+Конструкторы событий outbox.
+
+События передаются методам DAO (параметр outbox) и сохраняются в той же
+транзакции, что и доменная строка.
+"""
+from typing import List, Optional
+
+from app.outbox.models import OutboxEvent
+
+
+# Публикация произвольной задачи Celery
+CELERY_TASK = "celery_task"
+# Уведомление в Telegram: relay выставляет notification_sent и публикует задачу
+TELEGRAM_NOTIFICATION = "telegram_notification"
+
+NEW_MESSAGE_NOTIFICATION = "У вас новое непрочитанное сообщение в mychat."
+
+
+def celery_task(task, *args, countdown: Optional[int] = None) -> OutboxEvent:
+    """
+    Событие публикации задачи Celery.
+
+    :param task: Задача Celery (используется ее имя) или имя задачи.
+    :param args: Позиционные аргументы задачи, должны сериализоваться в JSON.
+    :param countdown: Задержка запуска задачи, секунды.
+    """
+    return OutboxEvent(
+        topic=CELERY_TASK,
+        payload={
+            "task": getattr(task, "name", task),
+            "args": list(args),
+            "countdown": countdown,
+        },
+    )
+
+
+def telegram_notification(
+    user_ids: List[int], message: str, countdown: Optional[int] = None
+) -> OutboxEvent:
+    """
+    Событие уведомления пользователей в Telegram.
+
+    Флаг notification_sent выставляется при публикации, в одной транзакции
+    с удалением события: пользователи, уже получившие уведомление, пропускаются.
+    """
+    return OutboxEvent(
+        topic=TELEGRAM_NOTIFICATION,
+        payload={"user_ids": list(user_ids), "message": message, "countdown": countdown},
+    )
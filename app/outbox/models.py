@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import JSON, BigInteger, Index, Integer, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class OutboxEvent(Base):
+    """
+    Побочный эффект, который нужно выполнить после фиксации транзакции.
+
+    Событие записывается в одной транзакции с доменной строкой (сообщением,
+    токеном верификации) и публикуется процессом app.outbox.relay. После
+    неудачной публикации событие откладывается до next_attempt_at, после
+    OUTBOX_MAX_ATTEMPTS попыток помечается dead_at и больше не публикуется.
+    """
+
+    __tablename__ = "outbox_events"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    topic: Mapped[str] = mapped_column(String, nullable=False)
+    payload: Mapped[dict] = mapped_column(
+        JSON().with_variant(JSONB, "postgresql"), nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(Integer, server_default=text("0"))
+    next_attempt_at: Mapped[datetime] = mapped_column(server_default=func.now())
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    dead_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+
+    __table_args__ = (
+        # Relay выбирает только ожидающие события, мертвые не сканируются
+        Index(
+            "ix_outbox_events_pending_id",
+            "id",
+            postgresql_where=text("dead_at IS NULL"),
+        ),
+    )
@@ -0,0 +1,121 @@
+"""
+Relay событий outbox.
+
+Читает события пачками и публикует задачи Celery. Событие удаляется в той же
+транзакции после публикации, поэтому доставка at-least-once: при сбое между
+публикацией и фиксацией задача будет опубликована повторно. Несколько
+экземпляров relay могут работать параллельно (FOR UPDATE SKIP LOCKED).
+
+Ошибка одного события не задерживает остальные: событие откладывается с
+растущей задержкой, после OUTBOX_MAX_ATTEMPTS попыток помечается dead_at и
+остается в таблице для разбора. Повторная публикация мертвых событий:
+
+    UPDATE outbox_events SET dead_at = NULL, attempts = 0, next_attempt_at = now()
+    WHERE dead_at IS NOT NULL;
+
+    python -m app.outbox.relay
+"""
+import asyncio
+import logging
+import signal
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.celery.celery_app import celery_app
+from app.celery.tasks import send_telegram_notification, send_telegram_notifications
+from app.config import settings
+from app.outbox.dao import OutboxDAO
+from app.outbox.events import CELERY_TASK, TELEGRAM_NOTIFICATION
+from app.outbox.models import OutboxEvent
+from app.users.dao import UsersDAO
+
+
+logger = logging.getLogger(__name__)
+
+# (имя задачи, аргументы, задержка запуска)
+Publication = Tuple[str, list, Optional[int]]
+
+
+async def telegram_publications(session: AsyncSession, payload: dict) -> List[Publication]:
+    """
+    Выставляет флаг notification_sent в транзакции relay и возвращает задачу
+    уведомления только для пользователей, у которых флаг еще не стоял.
+    """
+    result = await session.execute(
+        UsersDAO.claim_notifications_query(payload["user_ids"])
+    )
+    user_ids = list(result.scalars())
+    if not user_ids:
+        return []
+    countdown = payload.get("countdown")
+    if len(user_ids) == 1:
+        return [(send_telegram_notification.name, [user_ids[0], payload["message"]], countdown)]
+    return [(send_telegram_notifications.name, [user_ids, payload["message"]], countdown)]
+
+
+async def handle_event(session: AsyncSession, event: OutboxEvent):
+    """
+    Публикует задачи события. Ошибка откатывает изменения только этого
+    события (флаги notification_sent), событие будет опубликовано повторно.
+    """
+    payload = event.payload
+    publications: List[Publication] = []
+    if event.topic == CELERY_TASK:
+        publications.append((payload["task"], payload["args"], payload.get("countdown")))
+    elif event.topic == TELEGRAM_NOTIFICATION and payload["user_ids"]:
+        publications.extend(await telegram_publications(session, payload))
+    elif event.topic != TELEGRAM_NOTIFICATION:
+        logger.error(f"Unknown outbox topic {event.topic!r}, event {event.id} dropped")
+    if publications:
+        # Публикация в брокер синхронная, выполняется вне event loop
+        await asyncio.to_thread(publish, publications)
+
+
+def publish(publications: List[Publication]):
+    for name, args, countdown in publications:
+        celery_app.send_task(name, args=args, countdown=countdown)
+
+
+async def run_relay(stop: asyncio.Event):
+    """
+    Обрабатывает события, пока не установлен stop.
+
+    Полная пачка обрабатывается сразу за предыдущей, после неполной relay
+    ждет OUTBOX_POLL_INTERVAL_MS, после ошибки - OUTBOX_RETRY_DELAY_S.
+    """
+    batch_size = settings.OUTBOX_BATCH_SIZE
+    while not stop.is_set():
+        try:
+            count = await OutboxDAO.relay_batch(handle_event, batch_size)
+        except Exception:
+            logger.exception("Outbox relay batch failed")
+            delay = settings.OUTBOX_RETRY_DELAY_S
+        else:
+            if count:
+                logger.debug(f"Relayed {count} outbox events")
+            if count == batch_size:
+                continue
+            delay = settings.OUTBOX_POLL_INTERVAL_MS / 1000
+        try:
+            await asyncio.wait_for(stop.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def serve():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    logger.info("Outbox relay started")
+    await run_relay(stop)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
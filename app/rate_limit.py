@@ -0,0 +1,129 @@
+import ipaddress
+import logging
+from functools import lru_cache
+from typing import Tuple
+
+from fastapi import Depends, Request
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.exceptions import TooManyRequestsException
+from app.redis.redis_client import redis_client
+from app.users.dependencies import get_current_user_id
+
+
+logger = logging.getLogger(__name__)
+
+# Атомарный token bucket. Время берется из Redis, поэтому часы воркеров
+# не влияют на расчет. Возвращает {разрешено (0/1), через сколько мс повторить}.
+_TOKEN_BUCKET_SCRIPT = redis_client.register_script(
+    """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1])
+    local ts = tonumber(bucket[2])
+    if tokens == nil or ts == nil then
+        tokens = capacity
+        ts = now
+    end
+
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    else
+        retry_after = math.ceil((cost - tokens) * 1000 / rate)
+    end
+
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+    return {allowed, retry_after}
+    """
+)
+
+
+@lru_cache
+def parse_limit(name: str) -> Tuple[int, float]:
+    """
+    Возвращает (емкость, скорость пополнения в токенах в секунду) для маршрута.
+
+    Лимиты задаются в RATE_LIMITS в виде "<запросов>/<секунд>", например "5/60".
+    """
+    requests, period = settings.RATE_LIMITS[name].split("/")
+    return int(requests), int(requests) / float(period)
+
+
+@lru_cache
+def _trusted_proxies():
+    return [ipaddress.ip_network(net) for net in settings.RATE_LIMIT_TRUSTED_PROXIES]
+
+
+def get_client_ip(request: Request) -> str:
+    """
+    Возвращает IP клиента с учетом заголовка X-Real-IP, выставляемого nginx.
+
+    Заголовку доверяем, только если запрос пришел от доверенного прокси,
+    иначе клиент мог бы подменить его и обойти ограничение.
+    """
+    peer = request.client.host if request.client else ""
+    real_ip = request.headers.get("x-real-ip")
+    if real_ip and peer:
+        try:
+            address = ipaddress.ip_address(peer)
+        except ValueError:
+            return peer
+        if any(address in network for network in _trusted_proxies()):
+            return real_ip.strip()
+    return peer
+
+
+async def check_rate_limit(name: str, identity: str, cost: int = 1):
+    """
+    Списывает токены из корзины маршрута name для identity.
+
+    :raises TooManyRequestsException: Если токенов недостаточно.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    capacity, rate = parse_limit(name)
+    try:
+        allowed, retry_after_ms = await _TOKEN_BUCKET_SCRIPT(
+            keys=[f"ratelimit:{name}:{identity}"], args=[capacity, rate, cost]
+        )
+    except RedisError as e:
+        # Недоступность Redis не должна блокировать вход и отправку сообщений
+        logger.warning(f"Rate limit check skipped for {name}: {e}")
+        return
+    if not allowed:
+        raise TooManyRequestsException(retry_after=max(1, -(-retry_after_ms // 1000)))
+
+
+def rate_limit_by_ip(name: str):
+    """
+    Зависимость FastAPI: ограничение частоты запросов маршрута по IP клиента.
+    """
+
+    async def dependency(request: Request):
+        await check_rate_limit(name, f"ip:{get_client_ip(request)}")
+
+    return dependency
+
+
+def rate_limit_by_user(name: str):
+    """
+    Зависимость FastAPI: ограничение частоты запросов маршрута по ID пользователя.
+
+    Пользователь определяется по JWT и сессии в Redis, без обращения к базе данных.
+    """
+
+    async def dependency(user_id: int = Depends(get_current_user_id)):
+        await check_rate_limit(name, f"user:{user_id}")
+
+    return dependency
@@ -0,0 +1,68 @@
+import hashlib
+import logging
+from typing import Optional, Tuple
+from uuid import UUID
+
+import orjson
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.redis.redis_client import redis_client
+
+
+logger = logging.getLogger(__name__)
+
+
+def client_message_key(sender_id: int, client_message_id: UUID) -> str:
+    """
+    Ключ соответствия клиентского ID сообщения и ID сообщения в базе данных.
+    """
+    return f"client_message:{sender_id}:{client_message_id}"
+
+
+def payload_digest(values: dict) -> str:
+    """
+    Отпечаток колонок сообщения: повтор с тем же клиентским ID должен его совпадать.
+    """
+    return hashlib.sha1(orjson.dumps(values, option=orjson.OPT_SORT_KEYS)).hexdigest()[:16]
+
+
+async def get_sent_message(
+    sender_id: int, client_message_id: UUID
+) -> Optional[Tuple[int, str]]:
+    """
+    Возвращает ID и отпечаток уже сохраненного сообщения или None.
+
+    Ошибки Redis не прерывают отправку: повтор все равно отсеет уникальный
+    индекс в базе данных.
+    """
+    try:
+        value = await redis_client.get(client_message_key(sender_id, client_message_id))
+    except RedisError as e:
+        logger.warning(f"Client message id lookup failed: {e}")
+        return None
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode()
+    message_id, _, digest = value.partition(":")
+    if not digest:
+        # Ключ без отпечатка: содержимое проверяется по базе данных
+        return None
+    return int(message_id), digest
+
+
+async def remember_sent_message(
+    sender_id: int, client_message_id: UUID, message_id: int, digest: str
+):
+    """
+    Запоминает ID и отпечаток сохраненного сообщения на CLIENT_MESSAGE_ID_TTL секунд.
+    """
+    try:
+        await redis_client.set(
+            client_message_key(sender_id, client_message_id),
+            f"{message_id}:{digest}",
+            ex=settings.CLIENT_MESSAGE_ID_TTL,
+        )
+    except RedisError as e:
+        logger.warning(f"Client message id was not cached: {e}")
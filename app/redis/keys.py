@@ -0,0 +1,29 @@
+"""
+Ключи Redis с данными пользователя.
+
+В режиме кластера ID пользователя заключается в hash tag ({42}): сессия и
+отметка онлайн одного пользователя попадают в один слот, и их можно удалить
+одной командой, а пользователи распределяются по узлам. В остальных режимах
+ключи не меняются, чтобы переход не сбрасывал действующие сессии.
+"""
+from app.config import settings
+
+
+def user_key(prefix: str, user_id: int) -> str:
+    if settings.REDIS_MODE == "cluster":
+        return f"{prefix}:{{{user_id}}}"
+    return f"{prefix}:{user_id}"
+
+
+def session_key(user_id: int) -> str:
+    """
+    Ключ сессионного токена пользователя.
+    """
+    return user_key("session", user_id)
+
+
+def online_key(user_id: int) -> str:
+    """
+    Ключ отметки, что пользователь онлайн.
+    """
+    return user_key("online", user_id)
@@ -1,5 +1,232 @@
+"""
+Общий клиент Redis.
+
+Режим задается REDIS_MODE:
+- standalone: один узел из REDIS_URL, пул BlockingConnectionPool ограничен
+  REDIS_MAX_CONNECTIONS и ждет свободное соединение до REDIS_POOL_TIMEOUT;
+- sentinel: адрес мастера REDIS_SENTINEL_SERVICE запрашивается у REDIS_SENTINELS,
+  пароль и номер базы берутся из REDIS_URL; пул так же ограничен и ждет
+  свободное соединение до REDIS_POOL_TIMEOUT;
+- cluster: Redis Cluster, REDIS_URL - один из начальных узлов, пул на каждом
+  узле ограничен REDIS_MAX_CONNECTIONS.
+
+Таймауты, проверка соединений и повторы при сетевых ошибках общие для всех режимов.
+"""
+import time
+from typing import List
+
 from redis import asyncio as aioredis
+from redis.asyncio.client import Pipeline
+from redis.asyncio.cluster import ClusterPipeline, RedisCluster
+from redis.asyncio.connection import BlockingConnectionPool, parse_url
+from redis.asyncio.retry import Retry
+from redis.asyncio.sentinel import Sentinel, SentinelConnectionPool
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
 from app.config import settings
+from app.observability.stats import record_redis
+
+
+class CountingPipeline(Pipeline):
+    """
+    Pipeline, учитывающий команды в статистике текущего запроса.
+    """
+
+    async def execute(self, raise_on_error: bool = True):
+        record_redis(len(self.command_stack))
+        return await super().execute(raise_on_error)
+
+
+class CountingRedis(aioredis.Redis):
+    """
+    Клиент Redis, учитывающий команды в статистике текущего запроса.
+    """
+
+    async def execute_command(self, *args, **options):
+        record_redis()
+        return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> CountingPipeline:
+        return CountingPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+class CountingClusterPipeline(ClusterPipeline):
+    async def execute(self, raise_on_error: bool = True, allow_redirections: bool = True):
+        record_redis(len(self._command_stack))
+        return await super().execute(raise_on_error, allow_redirections)
+
+
+class CountingRedisCluster(RedisCluster):
+    """
+    Клиент Redis Cluster, учитывающий команды в статистике текущего запроса.
+    """
+
+    async def execute_command(self, *args, **kwargs):
+        record_redis()
+        return await super().execute_command(*args, **kwargs)
+
+    def pipeline(self, transaction=None, shard_hint=None) -> CountingClusterPipeline:
+        # Кластер не поддерживает MULTI: pipeline только группирует команды по узлам
+        return CountingClusterPipeline(self)
+
+
+class PoolStatsMixin:
+    """
+    Счетчики использования пула соединений: занятые соединения, пик и время ожидания.
+    """
+
+    in_use = 0
+    peak_in_use = 0
+    acquired = 0
+    acquire_seconds = 0.0
+
+    async def get_connection(self, command_name, *keys, **options):
+        started = time.perf_counter()
+        connection = await super().get_connection(command_name, *keys, **options)
+        self.acquire_seconds += time.perf_counter() - started
+        self.acquired += 1
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        return connection
+
+    async def release(self, connection):
+        self.in_use -= 1
+        await super().release(connection)
+
+
+class InstrumentedBlockingConnectionPool(PoolStatsMixin, BlockingConnectionPool):
+    pass
+
+
+class BlockingSentinelConnectionPool(SentinelConnectionPool, BlockingConnectionPool):
+    """
+    Пул мастера Sentinel, ожидающий свободное соединение до timeout.
+
+    SentinelConnectionPool наследует ConnectionPool и при исчерпании
+    max_connections сразу выбрасывает "Too many connections". Здесь выдача и
+    возврат соединений берутся из BlockingConnectionPool, а адрес мастера и
+    проверка принадлежности соединения - из SentinelConnectionPool: соединение
+    со старым мастером после переключения не возвращается в пул, вместо него
+    освобождается место для нового. При смене мастера BlockingConnectionPool
+    закрывает и занятые соединения, их команды повторяются по retry.
+    """
+
+
+class InstrumentedSentinelConnectionPool(PoolStatsMixin, BlockingSentinelConnectionPool):
+    pass
+
+
+def connection_options() -> dict:
+    """
+    Параметры соединений из настроек, общие для всех режимов.
+    """
+    return {
+        "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+        "retry": Retry(
+            ExponentialBackoff(
+                cap=settings.REDIS_RETRY_BACKOFF_CAP_MS / 1000,
+                base=settings.REDIS_RETRY_BACKOFF_MS / 1000,
+            ),
+            settings.REDIS_RETRY_ATTEMPTS,
+        ),
+        "retry_on_error": [ConnectionError, TimeoutError],
+    }
+
+
+def parse_sentinels(sentinels: List[str]) -> List[tuple]:
+    """
+    Разбирает адреса Sentinel вида "host:port".
+    """
+    addresses = []
+    for address in sentinels:
+        host, _, port = address.rpartition(":")
+        addresses.append((host, int(port)))
+    return addresses
+
+
+def create_redis_client():
+    if settings.REDIS_MODE == "cluster":
+        return CountingRedisCluster.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            **connection_options(),
+        )
+    if settings.REDIS_MODE == "sentinel":
+        url_options = parse_url(settings.REDIS_URL)
+        url_options.pop("host", None)
+        url_options.pop("port", None)
+        options = {**connection_options(), **url_options}
+        sentinel = Sentinel(
+            parse_sentinels(settings.REDIS_SENTINELS),
+            sentinel_kwargs={
+                key: value for key, value in options.items() if key.startswith("socket_")
+            },
+        )
+        return sentinel.master_for(
+            settings.REDIS_SENTINEL_SERVICE,
+            redis_class=CountingRedis,
+            connection_pool_class=InstrumentedSentinelConnectionPool,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            **options,
+        )
+    pool = InstrumentedBlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        **connection_options(),
+    )
+    return CountingRedis(connection_pool=pool)
+
+
+def create_pubsub_client():
+    """
+    Клиент для подписок Pub/Sub.
+
+    Асинхронный клиент Redis Cluster не поддерживает подписки. PUBLISH в
+    кластере доходит до всех узлов, поэтому в этом режиме подписка идет через
+    отдельный клиент начального узла из REDIS_URL.
+    """
+    if is_cluster():
+        return aioredis.Redis.from_url(settings.REDIS_URL, **connection_options())
+    return redis_client
+
+
+def is_cluster() -> bool:
+    return isinstance(redis_client, RedisCluster)
+
+
+def pool_stats() -> dict:
+    """
+    Использование соединений Redis текущим процессом.
+
+    В режиме кластера соединения суммируются по всем узлам.
+    """
+    if isinstance(redis_client, RedisCluster):
+        # Пулы узлов кластера не имеют публичных счетчиков
+        nodes = redis_client.get_nodes()
+        created = sum(len(node._connections) for node in nodes)
+        idle = sum(len(node._free) for node in nodes)
+        return {
+            "mode": settings.REDIS_MODE,
+            "nodes": len(nodes),
+            "max_connections": settings.REDIS_MAX_CONNECTIONS * len(nodes),
+            "in_use": created - idle,
+            "idle": idle,
+        }
+    pool = redis_client.connection_pool
+    return {
+        "mode": settings.REDIS_MODE,
+        "max_connections": pool.max_connections,
+        "in_use": pool.in_use,
+        "peak_in_use": pool.peak_in_use,
+        "acquired": pool.acquired,
+        "acquire_seconds": round(pool.acquire_seconds, 6),
+    }
+
 
-redis_url = settings.REDIS_URL
-redis_client = aioredis.from_url(redis_url)
+redis_client = create_redis_client()
@@ -0,0 +1,73 @@
+import time
+from typing import Optional
+
+from app.config import settings
+from app.redis.redis_client import redis_client
+
+
+# Версия справочника пользователей, увеличивается при регистрации и верификации
+USERS_VERSION_KEY = "users:version"
+
+# Атомарно сохраняет максимум из текущего и нового значения водяного знака,
+# чтобы параллельные отправки не откатывали его назад
+_SET_MAX_SCRIPT = redis_client.register_script(
+    """
+    local current = tonumber(redis.call('GET', KEYS[1]) or '-1')
+    local value = tonumber(ARGV[1])
+    if value > current then
+        redis.call('SET', KEYS[1], value, 'EX', ARGV[2])
+        return value
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return current
+    """
+)
+
+
+def conversation_key(user_id_1: int, user_id_2: int) -> str:
+    """
+    Ключ водяного знака переписки, не зависящий от порядка собеседников.
+    """
+    low, high = sorted((user_id_1, user_id_2))
+    return f"conversation:{low}:{high}:last_message_id"
+
+
+async def get_conversation_watermark(user_id_1: int, user_id_2: int) -> Optional[int]:
+    """
+    Возвращает ID последнего сообщения переписки или None, если значение не в Redis.
+    """
+    value = await redis_client.get(conversation_key(user_id_1, user_id_2))
+    return int(value) if value is not None else None
+
+
+async def set_conversation_watermark(user_id_1: int, user_id_2: int, message_id: int) -> int:
+    """
+    Поднимает водяной знак переписки до message_id и возвращает актуальное значение.
+    """
+    value = await _SET_MAX_SCRIPT(
+        keys=[conversation_key(user_id_1, user_id_2)],
+        args=[message_id, settings.WATERMARK_TTL],
+    )
+    return int(value)
+
+
+async def get_users_version() -> str:
+    """
+    Возвращает версию справочника пользователей.
+
+    Если ключа нет (например, после очистки Redis), версия инициализируется
+    текущим временем, чтобы не совпасть с ETag, выданными до очистки.
+    """
+    version = await redis_client.get(USERS_VERSION_KEY)
+    if version is None:
+        await redis_client.set(USERS_VERSION_KEY, time.time_ns(), nx=True)
+        version = await redis_client.get(USERS_VERSION_KEY)
+    return version.decode() if isinstance(version, bytes) else str(version)
+
+
+async def bump_users_version():
+    """
+    Увеличивает версию справочника пользователей.
+    """
+    await get_users_version()
+    await redis_client.incr(USERS_VERSION_KEY)
@@ -0,0 +1,124 @@
+from enum import Enum
+from typing import AsyncIterable, Iterable, Sequence
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+
+class ResponseFormat(str, Enum):
+    """
+    Формат ответа для эндпоинтов, отдающих большие списки.
+
+    - json: стандартный путь FastAPI (валидация pydantic и stdlib json).
+    - orjson: проекция колонок и сериализация через orjson одним буфером.
+    - stream: потоковый JSON-массив, отдается частями без сборки списка в памяти.
+    - ndjson: потоковый NDJSON, один объект на строку.
+    """
+
+    json = "json"
+    orjson = "orjson"
+    stream = "stream"
+    ndjson = "ndjson"
+
+
+# Количество строк, сериализуемых в один фрагмент потокового ответа
+STREAM_CHUNK_ROWS = 500
+
+# Клиент может хранить ответ, но обязан перепроверять его при каждом запросе
+ETAG_CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+
+def rows_to_dicts(fields: Sequence[str], rows: Iterable[Sequence]) -> list[dict]:
+    """
+    Преобразует строки-кортежи проекции в словари с указанными полями.
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
+
+async def iter_json_array(fields: Sequence[str], rows: AsyncIterable[Sequence]):
+    """
+    Сериализует асинхронный поток строк в JSON-массив по частям.
+    """
+    yield b"["
+    first = True
+    chunk = []
+    async for row in rows:
+        chunk.append(orjson.dumps(dict(zip(fields, row))))
+        if len(chunk) >= STREAM_CHUNK_ROWS:
+            yield (b"" if first else b",") + b",".join(chunk)
+            first = False
+            chunk = []
+    if chunk:
+        yield (b"" if first else b",") + b",".join(chunk)
+    yield b"]"
+
+
+async def iter_ndjson(fields: Sequence[str], rows: AsyncIterable[Sequence]):
+    """
+    Сериализует асинхронный поток строк в NDJSON по частям.
+    """
+    chunk = []
+    async for row in rows:
+        chunk.append(orjson.dumps(dict(zip(fields, row))))
+        if len(chunk) >= STREAM_CHUNK_ROWS:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+def fast_list_response(
+    response_format: ResponseFormat,
+    fields: Sequence[str],
+    rows: Iterable[Sequence] = (),
+    stream: AsyncIterable[Sequence] = None,
+):
+    """
+    Формирует ответ быстрого пути для списка строк проекции.
+
+    :param response_format: Запрошенный формат (кроме ResponseFormat.json).
+    :param fields: Имена полей, в порядке колонок проекции.
+    :param rows: Уже загруженные строки (для формата orjson).
+    :param stream: Асинхронный поток строк (для форматов stream и ndjson).
+    """
+    if response_format == ResponseFormat.ndjson:
+        return StreamingResponse(
+            iter_ndjson(fields, stream), media_type="application/x-ndjson"
+        )
+    if response_format == ResponseFormat.stream:
+        return StreamingResponse(
+            iter_json_array(fields, stream), media_type="application/json"
+        )
+    return ORJSONResponse(rows_to_dicts(fields, rows))
+
+
+def weak_etag(*parts) -> str:
+    """
+    Формирует слабый ETag из частей водяного знака.
+    """
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Проверяет, совпадает ли ETag с одним из значений заголовка If-None-Match.
+
+    Сравнение слабое: префикс W/ не учитывается.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    expected = etag.removeprefix("W/")
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == expected:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Ответ 304 без тела с тем же ETag.
+    """
+    return Response(status_code=304, headers={"ETag": etag, **ETAG_CACHE_HEADERS})
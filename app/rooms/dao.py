@@ -0,0 +1,152 @@
+from typing import List
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.orm import aliased
+
+from app.chat.models import Message
+from app.dao.base import BaseDAO
+from app.dao.routing import read_session, write_session
+from app.rooms.models import Room, RoomMember
+
+
+# Непрочитанные сообщения считаются не дальше этого значения (клиент покажет "99+")
+UNREAD_COUNT_CAP = 100
+
+
+class RoomsDAO(BaseDAO):
+    model = Room
+
+    @classmethod
+    async def create_room(cls, name: str, owner_id: int, member_ids: List[int]) -> Room:
+        """
+        Асинхронно создает комнату и добавляет участников в одной транзакции.
+
+        Аргументы:
+            name: Название комнаты.
+            owner_id: ID создателя, добавляется в участники автоматически.
+            member_ids: ID остальных участников.
+
+        Возвращает:
+            Созданную комнату.
+        """
+        async with write_session() as session:
+            async with session.begin():
+                room = cls.model(name=name, owner_id=owner_id)
+                session.add(room)
+                await session.flush()
+                user_ids = sorted({owner_id, *member_ids})
+                await session.execute(
+                    RoomMember.__table__.insert(),
+                    [{"room_id": room.id, "user_id": user_id} for user_id in user_ids],
+                )
+            return room
+
+    @classmethod
+    async def find_for_user(cls, user_id: int):
+        """
+        Асинхронно возвращает комнаты пользователя с количеством непрочитанных сообщений.
+
+        Счетчики не хранятся, а считаются при чтении по индексу (room_id, id),
+        поэтому отправка сообщения в комнату не обновляет строки участников.
+
+        Аргументы:
+            user_id: ID пользователя.
+
+        Возвращает:
+            Список строк (id, name, unread_count), упорядоченный по ID комнаты.
+        """
+        unread = (
+            select(Message.id)
+            .where(
+                Message.room_id == RoomMember.room_id,
+                Message.id > RoomMember.last_read_message_id,
+                Message.sender_id != user_id,
+            )
+            .limit(UNREAD_COUNT_CAP)
+            .correlate(RoomMember)
+            .subquery()
+        )
+        unread_count = select(func.count()).select_from(unread).scalar_subquery()
+        query = (
+            select(cls.model.id, cls.model.name, unread_count.label("unread_count"))
+            .join(RoomMember, RoomMember.room_id == cls.model.id)
+            .where(RoomMember.user_id == user_id)
+            .order_by(cls.model.id)
+        )
+        async with read_session() as session:
+            result = await session.execute(query)
+            return result.all()
+
+
+class RoomMembersDAO(BaseDAO):
+    model = RoomMember
+
+    @classmethod
+    async def get_member_ids(cls, room_id: int) -> List[int]:
+        """
+        Асинхронно возвращает ID всех участников комнаты.
+        """
+        async with read_session() as session:
+            result = await session.execute(
+                select(cls.model.user_id).where(cls.model.room_id == room_id)
+            )
+            return list(result.scalars())
+
+    @classmethod
+    async def share_room(cls, user_id_1: int, user_id_2: int) -> bool:
+        """
+        Асинхронно проверяет, состоят ли пользователи в общей комнате.
+        """
+        other = aliased(cls.model)
+        async with read_session() as session:
+            query = select(
+                select(cls.model.room_id)
+                .join(other, other.room_id == cls.model.room_id)
+                .where(cls.model.user_id == user_id_1, other.user_id == user_id_2)
+                .exists()
+            )
+            result = await session.execute(query)
+            return bool(result.scalar())
+
+    @classmethod
+    async def add_members(cls, room_id: int, user_ids: List[int]) -> int:
+        """
+        Асинхронно добавляет участников в комнату, пропуская уже добавленных.
+
+        Возвращает:
+            Количество новых участников.
+        """
+        added = await cls.upsert_many(
+            ({"room_id": room_id, "user_id": user_id} for user_id in set(user_ids)),
+            index_elements=("room_id", "user_id"),
+            returning=("user_id",),
+        )
+        return len(added)
+
+    @classmethod
+    async def mark_read(cls, room_id: int, user_id: int, message_id: int) -> int:
+        """
+        Асинхронно сдвигает отметку прочтения участника вперед до message_id.
+
+        Отметка никогда не сдвигается назад, повторное чтение старой страницы
+        не пишет в базу. Запись не привязывает чтения к основной базе.
+
+        Возвращает:
+            Количество измененных записей (0 или 1).
+        """
+        query = (
+            update(cls.model)
+            .where(
+                and_(
+                    cls.model.room_id == room_id,
+                    cls.model.user_id == user_id,
+                    cls.model.last_read_message_id < message_id,
+                )
+            )
+            .values(last_read_message_id=message_id)
+            .execution_options(synchronize_session=False)
+        )
+        async with write_session(sticky=False) as session:
+            async with session.begin():
+                result = await session.execute(query)
+                return result.rowcount
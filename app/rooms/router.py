@@ -0,0 +1,193 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.exc import IntegrityError
+
+from app.chat.connections import manager
+from app.chat.dao import ClientMessageIdConflictError, MessagesDAO
+from app.exceptions import (
+    ClientMessageIdConflictException,
+    ForbiddenException,
+    NotRoomMemberException,
+    RoomMemberNotFoundException,
+    RoomNotFoundException,
+)
+from app.outbox.events import NEW_MESSAGE_NOTIFICATION, telegram_notification
+from app.rate_limit import rate_limit_by_user
+from app.responses import rows_to_dicts
+from app.rooms.dao import RoomMembersDAO, RoomsDAO
+from app.rooms.schemas import (
+    RoomCreate,
+    RoomMembersAdd,
+    RoomMessageCreate,
+    RoomMessagePage,
+    RoomMessageRead,
+    RoomRead,
+)
+from app.users.auth import get_online_user_ids
+from app.users.dao import UsersDAO
+from app.users.dependencies import get_current_user_id
+
+
+router = APIRouter(prefix="/rooms", tags=["Rooms"])
+
+
+@router.post("/", response_model=RoomRead)
+async def create_room(
+    room: RoomCreate, current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Создает комнату. Создатель становится ее владельцем и участником.
+
+    :param room: Название комнаты и ID участников
+    :param current_user_id: ID текущего пользователя, извлекается через зависимость
+    :raises RoomMemberNotFoundException: Если один из участников не существует.
+    """
+    try:
+        new_room = await RoomsDAO.create_room(room.name, current_user_id, room.member_ids)
+    except IntegrityError:
+        raise RoomMemberNotFoundException
+    return RoomRead(id=new_room.id, name=new_room.name)
+
+
+@router.get("/", response_model=List[RoomRead])
+async def get_rooms(current_user_id: int = Depends(get_current_user_id)):
+    """
+    Возвращает комнаты текущего пользователя с количеством непрочитанных сообщений.
+    """
+    rooms = await RoomsDAO.find_for_user(current_user_id)
+    return [RoomRead(id=id_, name=name, unread_count=unread) for id_, name, unread in rooms]
+
+
+@router.post("/{room_id}/members")
+async def add_room_members(
+    room_id: int,
+    members: RoomMembersAdd,
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """
+    Добавляет участников в комнату. Доступно только владельцу комнаты.
+
+    :raises RoomNotFoundException: Если комнаты не существует.
+    :raises ForbiddenException: Если текущий пользователь не владелец комнаты.
+    :raises RoomMemberNotFoundException: Если один из участников не существует.
+    """
+    owner_id = await RoomsDAO.find_value("owner_id", id=room_id)
+    if owner_id is None:
+        raise RoomNotFoundException
+    if owner_id != current_user_id:
+        raise ForbiddenException
+    try:
+        added = await RoomMembersDAO.add_members(room_id, members.user_ids)
+    except IntegrityError:
+        raise RoomMemberNotFoundException
+    return {"room_id": room_id, "added": added}
+
+
+@router.get("/{room_id}/messages", response_model=RoomMessagePage)
+async def get_room_messages(
+    room_id: int,
+    before_id: Optional[int] = Query(None, description="Курсор из next_cursor"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """
+    Возвращает сообщения комнаты страницами от новых к старым.
+
+    Чтение последней страницы сдвигает отметку прочтения пользователя,
+    из которой при следующем запросе списка комнат считаются непрочитанные.
+
+    :param room_id: ID комнаты
+    :param before_id: Вернуть сообщения старше указанного ID
+    :param limit: Размер страницы
+    :param current_user_id: ID текущего пользователя, извлекается через зависимость
+    :raises NotRoomMemberException: Если пользователь не участник комнаты.
+    """
+    last_read = await RoomMembersDAO.find_value(
+        "last_read_message_id", room_id=room_id, user_id=current_user_id
+    )
+    if last_read is None:
+        raise NotRoomMemberException
+
+    rows = await MessagesDAO.get_room_message_rows(room_id, before_id, limit)
+    if rows and before_id is None:
+        await RoomMembersDAO.mark_read(room_id, current_user_id, rows[-1][0])
+        await UsersDAO.set_notification_sent(current_user_id, False)
+
+    return RoomMessagePage(
+        items=rows_to_dicts(MessagesDAO.room_read_fields, rows),
+        next_cursor=rows[0][0] if len(rows) == limit else None,
+    )
+
+
+@router.post(
+    "/{room_id}/messages",
+    response_model=RoomMessageRead,
+    dependencies=[Depends(rate_limit_by_user("send_message"))],
+)
+async def send_room_message(
+    room_id: int,
+    message: RoomMessageCreate,
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """
+    Отправляет сообщение в комнату.
+
+    Сообщение сохраняется один раз независимо от размера комнаты. Событие
+    WebSocket получают только участники онлайн (одна проверка MGET и один
+    pipeline Redis); для остальных непрочитанные считаются при чтении, а
+    уведомление в Telegram сохраняется в outbox вместе с сообщением и
+    публикуется relay одной задачей Celery. Повтор с тем же
+    client_message_id возвращает сохраненное сообщение без повторной рассылки,
+    повтор с другой комнатой или текстом отклоняется с 409.
+
+    :param room_id: ID комнаты
+    :param message: Содержимое сообщения
+    :param current_user_id: ID текущего пользователя, извлекается через зависимость
+    :raises NotRoomMemberException: Если пользователь не участник комнаты.
+    """
+    member_ids = await RoomMembersDAO.get_member_ids(room_id)
+    if current_user_id not in member_ids:
+        raise NotRoomMemberException
+
+    online_ids = await get_online_user_ids(member_ids)
+    offline_ids = [
+        user_id
+        for user_id in member_ids
+        if user_id not in online_ids and user_id != current_user_id
+    ]
+    # Флаг notification_sent выставляет relay одним запросом только тем,
+    # кто еще не был уведомлен
+    outbox = []
+    if offline_ids:
+        outbox.append(
+            telegram_notification(offline_ids, NEW_MESSAGE_NOTIFICATION, countdown=60)
+        )
+
+    try:
+        message_id, created = await MessagesDAO.add_idempotent(
+            message.client_message_id,
+            outbox=outbox,
+            sender_id=current_user_id,
+            room_id=room_id,
+            content=message.content,
+        )
+    except ClientMessageIdConflictError:
+        raise ClientMessageIdConflictException
+    message_data = {
+        "id": message_id,
+        "room_id": room_id,
+        "sender_id": current_user_id,
+        "content": message.content,
+    }
+    if message.client_message_id is not None:
+        message_data["client_message_id"] = str(message.client_message_id)
+    # Повтор уже сохраненного сообщения: рассылка и уведомления не повторяются
+    if not created:
+        return message_data
+
+    await manager.notify_many(
+        [user_id for user_id in member_ids if user_id in online_ids], message_data
+    )
+
+    return message_data
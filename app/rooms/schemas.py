@@ -0,0 +1,45 @@
+from typing import List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+
+class RoomCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100, description="Название комнаты")
+    member_ids: List[int] = Field(
+        default_factory=list, description="ID участников, кроме создателя"
+    )
+
+
+class RoomRead(BaseModel):
+    id: int = Field(..., description="Уникальный идентификатор комнаты")
+    name: str = Field(..., description="Название комнаты")
+    unread_count: int = Field(
+        0, description="Количество непрочитанных сообщений (не больше 100)"
+    )
+
+
+class RoomMembersAdd(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, description="ID новых участников")
+
+
+class RoomMessageCreate(BaseModel):
+    content: str = Field(..., description="Содержимое сообщения")
+    client_message_id: Optional[UUID] = Field(
+        None, description="ID сообщения, сгенерированный клиентом; повторы с ним безопасны"
+    )
+
+
+class RoomMessageRead(BaseModel):
+    id: int = Field(..., description="Уникальный идентификатор сообщения")
+    room_id: int = Field(..., description="ID комнаты")
+    sender_id: int = Field(..., description="ID отправителя сообщения")
+    content: str = Field(..., description="Содержимое сообщения")
+    client_message_id: Optional[UUID] = Field(None, description="ID сообщения клиента")
+
+
+class RoomMessagePage(BaseModel):
+    items: List[RoomMessageRead] = Field(..., description="Сообщения по возрастанию ID")
+    next_cursor: Optional[int] = Field(
+        None, description="Курсор более старой страницы (передается как before_id)"
+    )
@@ -0,0 +1,149 @@
+"""
+Запуск API-сервера uvicorn.
+
+- Воркеры: SERVER_WORKERS или по числу ядер, доступных процессу (учитываются
+  привязка к CPU и квота cgroup, то есть лимит cpus контейнера). Родительский
+  процесс открывает сокет до запуска воркеров (pre-fork), подключения между
+  воркерами распределяет ядро, упавший воркер перезапускается.
+- uvloop и httptools используются, если установлены.
+- События WebSocket между воркерами доставляются через Redis Pub/Sub
+  (app/chat/fanout.py). Бот в режиме TG_MODE=polling запускается одним
+  отдельным процессом, а не в каждом воркере.
+- Плавная остановка: при штатной остановке uvicorn сразу разрывает все
+  WebSocket-подключения, а lifespan приложения получает shutdown уже после
+  этого. DrainingServer сначала перестает принимать подключения и отключает
+  клиентов через manager.drain() (подсказка задержки переподключения,
+  отправка очереди, код 1012), затем передает управление остановке uvicorn.
+
+Запуск:
+    python -m app.serve --host 0.0.0.0 --port 8000 [--workers 4] [--reload]
+"""
+import argparse
+import logging
+import math
+import multiprocessing
+import os
+from importlib.util import find_spec
+
+import uvicorn
+from uvicorn.supervisors import ChangeReload, Multiprocess
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class DrainingServer(uvicorn.Server):
+    async def shutdown(self, sockets=None):
+        # Приложение уже импортировано процессом сервера
+        from app.chat.connections import manager
+
+        # Новые подключения не принимаются, пока существующие отключаются
+        for server in self.servers:
+            server.close()
+        for sock in sockets or []:
+            sock.close()
+        await manager.drain()
+        await super().shutdown(sockets)
+
+
+def available_cpus() -> int:
+    """
+    Количество ядер, доступных процессу.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    # Квота cgroup v2 ("<квота> <период>" или "max <период>")
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def run_telegram_bot():
+    from app.telegram.runner import main
+
+    main()
+
+
+def start_polling_bot():
+    """
+    Запускает бота TG_MODE=polling отдельным процессом и отключает его в воркерах.
+
+    getUpdates допускает только одного получателя обновлений, поэтому бот из
+    lifespan каждого воркера конфликтовал бы с остальными.
+    """
+    process = multiprocessing.get_context("spawn").Process(
+        target=run_telegram_bot, name="telegram-bot"
+    )
+    process.start()
+    # Воркеры запускаются после бота и наследуют окружение без polling
+    os.environ["TG_MODE"] = "off"
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API-сервер my_chat")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.SERVER_WORKERS,
+        help="Количество воркеров, 0 - по числу доступных ядер",
+    )
+    parser.add_argument(
+        "--reload", action="store_true", help="Перезапуск при изменении кода (один процесс)"
+    )
+    args = parser.parse_args()
+
+    workers = 1 if args.reload else args.workers or available_cpus()
+    loop = "uvloop" if find_spec("uvloop") else "asyncio"
+    http = "httptools" if find_spec("httptools") else "h11"
+    config = uvicorn.Config(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        reload=args.reload,
+        loop=loop,
+        http=http,
+        ws="websockets",
+        ws_per_message_deflate=True,
+        backlog=settings.SERVER_BACKLOG,
+        # Дольше keepalive_timeout прокси: соединение не закрывается сервером
+        # в момент, когда nginx отправляет в него запрос
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE_S,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT_S,
+    )
+    server = DrainingServer(config)
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Starting {workers} worker(s), loop={loop}, http={http}")
+
+    if config.should_reload:
+        sock = config.bind_socket()
+        ChangeReload(config, target=server.run, sockets=[sock]).run()
+        return
+    if workers == 1:
+        server.run()
+        return
+
+    bot = start_polling_bot() if settings.TG_MODE == "polling" else None
+    try:
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    finally:
+        if bot is not None:
+            bot.terminate()
+            bot.join()
+
+
+if __name__ == "__main__":
+    main()
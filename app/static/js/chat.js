@@ -1,7 +1,18 @@
 // Сохраняем текущий выбранный userId и WebSocket соединение
 let selectedUserId = null;
 let socket = null;
-let messagePollingInterval = null;
+// ID последнего полученного события: по нему сервер досылает пропущенное после переподключения
+let lastEventId = null;
+let reconnectTimeout = null;
+// Задержка переподключения, которую сервер прислал перед остановкой процесса
+let reconnectAfterMs = null;
+// Окно переподключения после перезапуска сервера без подсказки задержки
+const RESTART_RECONNECT_WINDOW_MS = 10000;
+// Эфемерные события: время последнего "печатает" и ID последнего просмотренного сообщения
+let lastTypingSentAt = 0;
+let lastSeenMessageId = 0;
+let chatStatusTimeout = null;
+const TYPING_INTERVAL_MS = 3000;
 
 // Функция выхода из аккаунта
 async function logout() {
@@ -24,7 +35,8 @@ async function logout() {
 // Функция выбора пользователя
 async function selectUser(userId, userName, event) {
     selectedUserId = userId;
-    document.getElementById('chatHeader').innerHTML = `<span>Чат с ${userName}</span><button class="logout-button" id="logoutButton">Выход</button>`;
+    lastSeenMessageId = 0;
+    document.getElementById('chatHeader').innerHTML = `<span>Чат с ${userName} <small id="chatStatus"></small></span><button class="logout-button" id="logoutButton">Выход</button>`;
     document.getElementById('messageInput').disabled = false;
     document.getElementById('sendButton').disabled = false;
 
@@ -39,84 +51,243 @@ async function selectUser(userId, userName, event) {
 
     await loadMessages(userId);
     connectWebSocket();
-    startMessagePolling(userId);
 }
 
 // Загрузка сообщений
 async function loadMessages(userId) {
     try {
-        const response = await fetch(`/chat/messages/${userId}`);
+        const response = await fetch(`/chat/messages/${userId}?format=orjson`);
         const messages = await response.json();
 
         const messagesContainer = document.getElementById('messages');
         messagesContainer.innerHTML = messages.map(message =>
-            createMessageElement(message.content, message.recipient_id)
+            createMessageElement(message.content, message.recipient_id, {id: message.id})
         ).join('');
+        sendSeen(userId, messages);
     } catch (error) {
         console.error('Ошибка загрузки сообщений:', error);
     }
 }
 
-// Подключение WebSocket
+// Поддерживаемые версии протокола WebSocket в порядке предпочтения.
+// msgpack предлагается, только если на странице подключен декодер MessagePack.
+function webSocketProtocols() {
+    const protocols = [];
+    if (window.MessagePack) protocols.push('mychat.v2.msgpack');
+    protocols.push('mychat.v2.json');
+    return protocols;
+}
+
+// Разбор кадра в список событий с учетом согласованного протокола
+function decodeFrame(data, protocol) {
+    if (protocol === 'mychat.v2.msgpack') {
+        return window.MessagePack.decode(new Uint8Array(data)).events;
+    }
+    if (protocol === 'mychat.v2.json') {
+        return JSON.parse(data).events;
+    }
+    return [JSON.parse(data)];
+}
+
+// Обработка одного события, полученного через WebSocket
+function handleSocketEvent(incomingMessage) {
+    if (incomingMessage.eid) lastEventId = incomingMessage.eid;
+
+    // Пропуск старше буфера сервера: перечитываем историю целиком
+    if (incomingMessage.type === 'resync') {
+        if (selectedUserId) loadMessages(selectedUserId);
+        return;
+    }
+
+    // Сервер останавливается: переподключаемся через указанную задержку,
+    // чтобы клиенты не пришли на новые процессы одновременно
+    if (incomingMessage.type === 'reconnect') {
+        reconnectAfterMs = incomingMessage.after_ms;
+        return;
+    }
+
+    // Эфемерные события собеседника: "печатает" и "просмотрено"
+    if (incomingMessage.type === 'typing' || incomingMessage.type === 'seen') {
+        if (String(incomingMessage.sender_id) === String(selectedUserId)) {
+            showChatStatus(incomingMessage.type === 'typing' ? 'печатает…' : 'просмотрено', incomingMessage.type === 'typing');
+        }
+        return;
+    }
+
+    // Сообщения комнат не относятся к личным перепискам (API /rooms)
+    if (incomingMessage.room_id) return;
+
+    // Эхо своего сообщения: подтверждаем уже показанное сообщение
+    // или добавляем отправленное из другой вкладки
+    if (incomingMessage.sender_id === currentUserId) {
+        if (!confirmMessage(incomingMessage.client_message_id, incomingMessage.id)
+            && String(incomingMessage.recipient_id) === String(selectedUserId)) {
+            addMessage(incomingMessage.content, incomingMessage.recipient_id, {id: incomingMessage.id});
+        }
+        return;
+    }
+
+    if (String(incomingMessage.sender_id) === String(selectedUserId)) {
+        addMessage(incomingMessage.content, incomingMessage.recipient_id, {id: incomingMessage.id});
+        sendSeen(selectedUserId, [incomingMessage]);
+    }
+}
+
+// Подключение WebSocket (одно на пользователя, переживает смену чата)
 function connectWebSocket() {
-    if (socket) socket.close();
+    if (socket && socket.readyState <= WebSocket.OPEN) return;
 
-    socket = new WebSocket(`wss://${window.location.host}/chat/ws/${selectedUserId}`);
+    const query = lastEventId ? `?last_event_id=${encodeURIComponent(lastEventId)}` : '';
+    socket = new WebSocket(`wss://${window.location.host}/chat/ws/${currentUserId}${query}`, webSocketProtocols());
+    socket.binaryType = 'arraybuffer';
 
     socket.onopen = () => console.log('WebSocket соединение установлено');
 
     socket.onmessage = (event) => {
-        const incomingMessage = JSON.parse(event.data);
-        if (incomingMessage.recipient_id === selectedUserId) {
-            addMessage(incomingMessage.content, incomingMessage.recipient_id);
+        decodeFrame(event.data, socket.protocol).forEach(handleSocketEvent);
+    };
+
+    socket.onclose = (event) => {
+        console.log('WebSocket соединение закрыто');
+        // Переподключаемся с последним ID события, сервер дошлет пропущенное
+        let delay = 1000 + Math.random() * 2000;
+        if (reconnectAfterMs !== null) {
+            delay = reconnectAfterMs;
+        } else if (event.code === 1012) {
+            delay = Math.random() * RESTART_RECONNECT_WINDOW_MS;
         }
+        reconnectAfterMs = null;
+        clearTimeout(reconnectTimeout);
+        reconnectTimeout = setTimeout(connectWebSocket, delay);
     };
+}
 
-    socket.onclose = () => console.log('WebSocket соединение закрыто');
+// Статус собеседника в заголовке чата; "печатает" гаснет сам
+function showChatStatus(text, temporary) {
+    const status = document.getElementById('chatStatus');
+    if (!status) return;
+    status.textContent = text;
+    clearTimeout(chatStatusTimeout);
+    if (temporary) {
+        chatStatusTimeout = setTimeout(() => { status.textContent = ''; }, TYPING_INTERVAL_MS + 500);
+    }
 }
 
-// Отправка сообщения
-async function sendMessage() {
-    const messageInput = document.getElementById('messageInput');
-    const message = messageInput.value.trim();
+// Отправка эфемерного события; при закрытом соединении событие просто теряется
+function sendEphemeral(event) {
+    if (socket && socket.readyState === WebSocket.OPEN) {
+        socket.send(JSON.stringify(event));
+    }
+}
 
-    if (message && selectedUserId) {
-        const payload = {recipient_id: selectedUserId, content: message};
+// "Печатает": не чаще раза в TYPING_INTERVAL_MS, сервер дополнительно прореживает
+function sendTyping() {
+    const now = Date.now();
+    if (!selectedUserId || now - lastTypingSentAt < TYPING_INTERVAL_MS) return;
+    lastTypingSentAt = now;
+    sendEphemeral({type: 'typing', to: parseInt(selectedUserId, 10)});
+}
+
+// "Просмотрено": только когда появилось новое входящее сообщение
+function sendSeen(userId, messages) {
+    const incoming = messages.filter(message => String(message.sender_id) === String(userId));
+    if (!incoming.length) return;
+    const lastId = incoming[incoming.length - 1].id;
+    if (lastId <= lastSeenMessageId) return;
+    lastSeenMessageId = lastId;
+    sendEphemeral({type: 'seen', to: parseInt(userId, 10), message_id: lastId});
+}
+
+// Клиентский ID сообщения: повтор отправки с ним не создает дубликат на сервере
+function newClientMessageId() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, c => {
+        const r = Math.random() * 16 | 0;
+        return (c === 'x' ? r : (r & 0x3 | 0x8)).toString(16);
+    });
+}
 
+// POST сообщения с повторами при сетевых ошибках и ответах 5xx
+async function postMessage(payload, attempts = 3) {
+    for (let attempt = 1; ; attempt++) {
+        let response = null;
         try {
-            await fetch('/chat/messages', {
+            response = await fetch('/chat/messages', {
                 method: 'POST',
                 headers: {'Content-Type': 'application/json'},
                 body: JSON.stringify(payload)
             });
+        } catch (error) {
+            if (attempt >= attempts) throw error;
+        }
+        if (response) {
+            if (response.ok) return response.json();
+            if (response.status < 500 || attempt >= attempts) {
+                throw new Error(`Сервер ответил ${response.status}`);
+            }
+        }
+        await new Promise(resolve => setTimeout(resolve, 500 * attempt));
+    }
+}
 
-            socket.send(JSON.stringify(payload));
-            addMessage(message, selectedUserId);
-            messageInput.value = '';
+// Отправка сообщения: показываем сразу, подтверждаем ID из ответа или события WebSocket
+async function sendMessage() {
+    const messageInput = document.getElementById('messageInput');
+    const message = messageInput.value.trim();
+
+    if (message && selectedUserId) {
+        const clientMessageId = newClientMessageId();
+        const recipientId = parseInt(selectedUserId, 10);
+        addMessage(message, recipientId, {clientMessageId, pending: true});
+        messageInput.value = '';
+        lastTypingSentAt = 0;
+
+        try {
+            const saved = await postMessage({
+                recipient_id: recipientId,
+                content: message,
+                client_message_id: clientMessageId
+            });
+            confirmMessage(clientMessageId, saved.id);
         } catch (error) {
+            const element = findMessageElement('client-id', clientMessageId);
+            if (element) element.classList.replace('pending', 'failed');
             console.error('Ошибка при отправке сообщения:', error);
         }
     }
 }
 
-// Добавление сообщения в чат
-function addMessage(text, recipient_id) {
+function findMessageElement(attribute, value) {
+    if (value === undefined || value === null) return null;
+    return document.querySelector(`#messages [data-${attribute}="${CSS.escape(String(value))}"]`);
+}
+
+// Помечает показанное до ответа сервера сообщение сохраненным
+function confirmMessage(clientMessageId, id) {
+    const element = findMessageElement('client-id', clientMessageId);
+    if (!element) return false;
+    element.dataset.id = id;
+    element.classList.remove('pending', 'failed');
+    return true;
+}
+
+// Добавление сообщения в чат; повторно доставленные события не дублируются
+function addMessage(text, recipient_id, options = {}) {
+    if (findMessageElement('id', options.id)) return;
     const messagesContainer = document.getElementById('messages');
-    messagesContainer.insertAdjacentHTML('beforeend', createMessageElement(text, recipient_id));
+    messagesContainer.insertAdjacentHTML('beforeend', createMessageElement(text, recipient_id, options));
     messagesContainer.scrollTop = messagesContainer.scrollHeight;
 }
 
 // Создание HTML элемента сообщения
-function createMessageElement(text, recipient_id) {
+function createMessageElement(text, recipient_id, options = {}) {
     const userID = parseInt(selectedUserId, 10);
-    const messageClass = userID === recipient_id ? 'my-message' : 'other-message';
-    return `<div class="message ${messageClass}">${text}</div>`;
-}
-
-// Запуск опроса новых сообщений
-function startMessagePolling(userId) {
-    clearInterval(messagePollingInterval);
-    messagePollingInterval = setInterval(() => loadMessages(userId), 1000);
+    const classes = ['message', userID === recipient_id ? 'my-message' : 'other-message'];
+    if (options.pending) classes.push('pending');
+    const attributes = [];
+    if (options.id !== undefined) attributes.push(`data-id="${options.id}"`);
+    if (options.clientMessageId) attributes.push(`data-client-id="${options.clientMessageId}"`);
+    return `<div class="${classes.join(' ')}" ${attributes.join(' ')}>${text}</div>`;
 }
 
 // Обработка нажатий на пользователя
@@ -176,6 +347,8 @@ setInterval(fetchUsers, 10000); // Обновление каждые 10 секу
 // Обработчики для кнопки отправки и ввода сообщения
 document.getElementById('sendButton').onclick = sendMessage;
 
+document.getElementById('messageInput').oninput = sendTyping;
+
 document.getElementById('messageInput').onkeypress = async (e) => {
     if (e.key === 'Enter') {
         await sendMessage();
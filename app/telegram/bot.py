@@ -1,33 +1,81 @@
 import logging
+from functools import lru_cache
 
-from aiogram import Bot, Dispatcher, F
+from aiogram import Bot, Dispatcher, F, Router
 from aiogram.enums import ParseMode
 from aiogram.filters import CommandStart
 from aiogram.types import Message
 from aiogram.utils.markdown import hbold
 from aiogram.client.bot import DefaultBotProperties
 from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from sqlalchemy.exc import IntegrityError
 
 from app.config import settings
+from app.redis.watermarks import bump_users_version
 from app.telegram.dao import TelegramUsersDAO
-from app.users.dao import UsersDAO
-from app.telegram.schemas import TelegramUserUpdate
-from app.users.schemas import UserUpdate
 
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Создание бота
-bot = Bot(
-    token=settings.TG_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-)
-# Создание диспетчера с хранилищем состояний в памяти
-storage = MemoryStorage()
-dp = Dispatcher(storage=storage)
+
+def create_session():
+    """
+    Создает HTTP-сессию бота.
+
+    Если задан TG_API_URL, запросы уходят на указанный сервер Bot API
+    (локальный telegram-bot-api или заглушка для тестов).
+    """
+    if settings.TG_API_URL:
+        return AiohttpSession(api=TelegramAPIServer.from_base(settings.TG_API_URL))
+    return None
+
+
+def create_storage() -> BaseStorage:
+    """
+    Создает хранилище состояний FSM.
+
+    Состояния хранятся в Redis, чтобы сценарий /verification продолжался,
+    даже если следующее обновление обработает другой процесс.
+    """
+    if settings.TG_FSM_STORAGE == "redis":
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        return RedisStorage.from_url(settings.REDIS_URL)
+    return MemoryStorage()
+
+
+@lru_cache
+def get_bot() -> Bot:
+    """
+    Возвращает экземпляр бота, создавая его при первом обращении.
+    """
+    return Bot(
+        token=settings.TG_TOKEN,
+        session=create_session(),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+
+
+@lru_cache
+def get_dispatcher() -> Dispatcher:
+    """
+    Возвращает диспетчер с хранилищем состояний и обработчиками бота,
+    создавая его при первом обращении.
+    """
+    dp = Dispatcher(storage=create_storage())
+    dp.include_router(router)
+    return dp
+
+
+# Обработчики бота; диспетчер подключает их в get_dispatcher
+router = Router()
 
 
 # Определение состояний для FSM
@@ -35,7 +83,7 @@ class VerificationState(StatesGroup):
     waiting_for_token = State()
 
 
-@dp.message(CommandStart())
+@router.message(CommandStart())
 async def command_start_handler(message: Message):
     """
     Обрабатывает команду /start. Приветствует пользователя и объясняет функционал бота.
@@ -50,7 +98,7 @@ async def command_start_handler(message: Message):
     )
 
 
-@dp.message(F.text == "/verification")
+@router.message(F.text == "/verification")
 async def command_verification_handler(message: Message, state: FSMContext):
     """
     Обрабатывает команду /verification. Запрашивает токен для верификации.
@@ -61,17 +109,25 @@ async def command_verification_handler(message: Message, state: FSMContext):
     await state.set_state(VerificationState.waiting_for_token)
 
 
-@dp.message(VerificationState.waiting_for_token)
+@router.message(VerificationState.waiting_for_token)
 async def handle_token_input(message: Message, state: FSMContext):
     """
     Обрабатывает ввод токена пользователем. Проверяет валидность токена и верифицирует пользователя.
     """
-    token = message.text
+    token = (message.text or "").strip()
     logger.info(f"User {message.from_user.id} entered token: {token}")
-    # Поиск пользователя по токену
-    tg_user = await TelegramUsersDAO.find_one_or_none(token=token)
+    try:
+        # Проверка токена, привязка Telegram и верификация одним запросом
+        user_id = await TelegramUsersDAO.redeem_token(token, message.chat.id)
+    except IntegrityError:
+        logger.warning(f"Telegram user {message.from_user.id} is already bound")
+        await message.answer(
+            "Этот Telegram-аккаунт уже привязан к другому пользователю Mychat."
+        )
+        await state.clear()
+        return
 
-    if not tg_user:
+    if user_id is None:
         logger.warning(f"Invalid token attempt by user {message.from_user.id}")
         await message.answer(
             "Неверный токен или срок действия токена истек. Пожалуйста, попробуйте снова."
@@ -79,34 +135,17 @@ async def handle_token_input(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    # Обновляем данные пользователя Telegram
-    tg_update_data = TelegramUserUpdate(telegram_id=message.chat.id)
-    await TelegramUsersDAO.update(
-        {"id": tg_user.id}, **tg_update_data.model_dump(exclude_unset=True)
+    await bump_users_version()
+    logger.info(f"User {message.from_user.id} successfully verified.")
+    await message.answer(
+        "Вы успешно верифицированы! Теперь вы можете использовать приложение Mychat. "
+        "Авторизуйтесь на сайте."
     )
 
-    # Поиск пользователя mychat в системе по email
-    user = await UsersDAO.find_one_or_none(email=tg_user.email)
-    if user:
-        # Обновляем данные верификации пользователя
-        user_update_data = UserUpdate(is_verified=True)
-        await UsersDAO.update(
-            {"id": user.id}, **user_update_data.model_dump(exclude_unset=True)
-        )
-
-        logger.info(f"User {message.from_user.id} successfully verified.")
-        await message.answer(
-            "Вы успешно верифицированы! Теперь вы можете использовать приложение Mychat. "
-            "Авторизуйтесь на сайте."
-        )
-    else:
-        logger.error(f"User {message.from_user.id} not found in system.")
-        await message.answer("Пользователь не найден.")
-
     await state.clear()
 
 
-@dp.message()
+@router.message()
 async def default_message_handler(message: Message):
     """
     Обрабатывает все неподдерживаемые сообщения.
@@ -120,4 +159,4 @@ async def start_telegram_bot():
     Запускает Telegram-бота.
     """
     logger.info("Bot is starting...")
-    await dp.start_polling(bot)
+    await get_dispatcher().start_polling(get_bot())
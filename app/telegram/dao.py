@@ -1,6 +1,70 @@
+from typing import List, Optional
+
+from sqlalchemy import func, select, update
+
 from app.dao.base import BaseDAO
+from app.dao.routing import read_session, write_session
 from app.telegram.models import TelegramUser
+from app.users.models import User
 
 
 class TelegramUsersDAO(BaseDAO):
     model = TelegramUser
+
+    @classmethod
+    async def redeem_token(cls, token: str, telegram_id: int) -> Optional[int]:
+        """
+        Асинхронно использует токен верификации одним SQL-запросом.
+
+        В одной транзакции привязывает telegram_id, аннулирует токен и
+        отмечает пользователя mychat верифицированным через main_user_id.
+        Повторное или параллельное использование того же токена ничего не найдет.
+
+        Аргументы:
+            token: Токен верификации из письма.
+            telegram_id: ID чата Telegram пользователя.
+
+        Возвращает:
+            ID верифицированного пользователя mychat или None, если токен
+            неверный или срок его действия истек.
+
+        Исключения:
+            IntegrityError: Если этот telegram_id уже привязан к другому пользователю.
+        """
+        redeemed = (
+            update(cls.model)
+            .where(cls.model.token == token, cls.model.token_expires_at > func.now())
+            .values(telegram_id=telegram_id, token=None, token_expires_at=None)
+            .returning(cls.model.main_user_id)
+            .cte("redeemed")
+        )
+        statement = (
+            update(User)
+            .where(User.id == redeemed.c.main_user_id)
+            .values(is_verified=True)
+            .returning(User.id)
+        )
+        async with write_session() as session:
+            async with session.begin():
+                result = await session.execute(statement)
+                return result.scalar_one_or_none()
+
+    @classmethod
+    async def get_telegram_ids(cls, user_ids: List[int]) -> List[int]:
+        """
+        Асинхронно возвращает ID чатов Telegram для привязанных пользователей mychat.
+
+        Аргументы:
+            user_ids: ID пользователей mychat.
+
+        Возвращает:
+            ID чатов Telegram пользователей, которые привязали бота.
+        """
+        if not user_ids:
+            return []
+        query = select(cls.model.telegram_id).where(
+            cls.model.main_user_id.in_(user_ids), cls.model.telegram_id.is_not(None)
+        )
+        async with read_session() as session:
+            result = await session.execute(query)
+            return list(result.scalars())
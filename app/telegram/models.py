@@ -1,4 +1,5 @@
-from typing import TYPE_CHECKING
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
 from sqlalchemy import ForeignKey, String, Integer
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
@@ -12,7 +13,11 @@ class TelegramUser(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     telegram_id: Mapped[int] = mapped_column(Integer, nullable=True, unique=True)
-    token: Mapped[str] = mapped_column(String, nullable=False)
+    # Одноразовый токен верификации, обнуляется при использовании
+    token: Mapped[Optional[str]] = mapped_column(
+        String, nullable=True, unique=True, index=True
+    )
+    token_expires_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
     email: Mapped[str] = mapped_column(String, nullable=False)
 
     main_user_id: Mapped[int] = mapped_column(
@@ -0,0 +1,46 @@
+"""
+Отдельный сервис Telegram-бота.
+
+Принимает обновления через вебхук и обрабатывает их пулом обработчиков,
+поэтому API-процессы можно масштабировать независимо от бота:
+
+    python -m app.telegram.runner
+
+В режиме TG_MODE=polling сервис опрашивает getUpdates, это удобно для
+локальной разработки без публичного URL.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI
+
+from app.config import settings
+from app.telegram.webhook import router, start_webhook, stop_webhook
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Регистрирует вебхук и запускает обработчики обновлений на время работы сервиса.
+    """
+    await start_webhook()
+    yield
+    await stop_webhook()
+
+
+app = FastAPI(lifespan=lifespan, docs_url=None, redoc_url=None)
+app.include_router(router)
+
+
+def main():
+    if settings.TG_MODE == "polling":
+        from app.telegram.bot import start_telegram_bot
+
+        asyncio.run(start_telegram_bot())
+        return
+    uvicorn.run(app, host=settings.TG_WEBHOOK_HOST, port=settings.TG_WEBHOOK_PORT)
+
+
+if __name__ == "__main__":
+    main()
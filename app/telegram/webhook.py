@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import secrets
+from typing import List, Optional
+
+from aiogram.types import Update
+from fastapi import APIRouter, Header, Request, status
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+from app.exceptions import ForbiddenException
+from app.telegram.bot import get_bot, get_dispatcher
+
+
+logger = logging.getLogger(__name__)
+
+
+def update_shard_key(update: Update) -> int:
+    """
+    Ключ распределения обновления по обработчикам.
+
+    Обновления одного чата попадают к одному обработчику и выполняются по порядку,
+    иначе, например, токен мог бы обработаться раньше команды /verification.
+    """
+    event = update.message or update.edited_message or update.callback_query
+    if event is not None and event.from_user is not None:
+        return event.from_user.id
+    return update.update_id
+
+
+class UpdateWorkerPool:
+    """
+    Ограниченный пул обработчиков обновлений Telegram.
+
+    У каждого обработчика своя очередь ограниченного размера. Если очередь
+    переполнена, вебхук отвечает 503 и Telegram повторит доставку позже.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.queues: List[asyncio.Queue] = [
+            asyncio.Queue(maxsize=queue_size) for _ in range(workers)
+        ]
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._worker(queue)) for queue in self.queues
+        ]
+
+    async def stop(self, timeout: float = 10):
+        """
+        Дожидается обработки принятых обновлений и останавливает обработчики.
+        """
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self.queues)), timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Telegram update queues were not drained in time")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, update: Update) -> bool:
+        """
+        Ставит обновление в очередь. Возвращает False, если очередь переполнена.
+        """
+        queue = self.queues[update_shard_key(update) % len(self.queues)]
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            update = await queue.get()
+            try:
+                await get_dispatcher().feed_update(get_bot(), update)
+            except Exception:
+                logger.exception(f"Failed to handle update {update.update_id}")
+            finally:
+                queue.task_done()
+
+
+pool: Optional[UpdateWorkerPool] = None
+
+router = APIRouter(prefix="/telegram", tags=["Telegram"])
+
+
+@router.post("/webhook")
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(None),
+):
+    """
+    Принимает обновления Telegram и передает их в пул обработчиков.
+
+    Ответ возвращается сразу после постановки в очередь, поэтому медленные
+    обработчики не задерживают доставку следующих обновлений.
+    """
+    if not x_telegram_bot_api_secret_token or not secrets.compare_digest(
+        x_telegram_bot_api_secret_token, settings.TG_WEBHOOK_SECRET
+    ):
+        raise ForbiddenException
+
+    update = Update.model_validate(await request.json(), context={"bot": get_bot()})
+    if pool is None or not pool.submit(update):
+        return JSONResponse(
+            {"ok": False}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return {"ok": True}
+
+
+async def start_webhook():
+    """
+    Запускает пул обработчиков и регистрирует вебхук в Telegram.
+    """
+    global pool
+    if not settings.TG_WEBHOOK_SECRET:
+        raise RuntimeError("TG_WEBHOOK_SECRET must be set in webhook mode")
+    pool = UpdateWorkerPool(settings.TG_WORKERS, settings.TG_UPDATE_QUEUE_SIZE)
+    pool.start()
+    await get_bot().set_webhook(
+        url=settings.TG_WEBHOOK_URL,
+        secret_token=settings.TG_WEBHOOK_SECRET,
+        allowed_updates=get_dispatcher().resolve_used_update_types(),
+    )
+    logger.info(f"Bot webhook is set to {settings.TG_WEBHOOK_URL}")
+
+
+async def stop_webhook():
+    """
+    Останавливает пул обработчиков. Вебхук в Telegram не удаляется, чтобы
+    обновления накапливались на стороне Telegram во время перезапуска.
+    """
+    if pool is not None:
+        await pool.stop()
+    await get_dispatcher().storage.close()
+    await get_bot().session.close()
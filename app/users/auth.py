@@ -1,9 +1,12 @@
 from datetime import datetime, timedelta, timezone
+from typing import List, Set
 from passlib.context import CryptContext
 from pydantic import EmailStr
 from jose import jwt
+from starlette.concurrency import run_in_threadpool
 from app.config import get_auth_data
-from app.redis.redis_client import redis_client
+from app.redis.keys import online_key
+from app.redis.redis_client import is_cluster, redis_client
 from app.users.dao import UsersDAO
 
 
@@ -57,14 +60,11 @@ async def authenticate_user(email: EmailStr, password: str):
     :return: Объект пользователя, если аутентификация успешна, иначе None.
     """
     user = await UsersDAO.find_one_or_none(email=email)
-    if (
-        not user
-        or not user.is_verified
-        or verify_password(
-            plain_password=password, hashed_password=user.hashed_password
-        )
-        is False
-    ):
+    if not user or not user.is_verified:
+        return None
+    # bcrypt занимает сотни миллисекунд CPU, в event loop он останавливает
+    # все WebSocket-подключения процесса
+    if not await run_in_threadpool(verify_password, password, user.hashed_password):
         return None
     return user
 
@@ -76,4 +76,24 @@ async def is_user_online(user_id: int) -> bool:
     :param user_id: ID пользователя.
     :return: True, если пользователь онлайн, иначе False.
     """
-    return await redis_client.exists(f"online:{user_id}") == 1
+    return await redis_client.exists(online_key(user_id)) == 1
+
+
+async def get_online_user_ids(user_ids: List[int]) -> Set[int]:
+    """
+    Возвращает ID пользователей из списка, которые сейчас онлайн.
+
+    Проверка выполняется одним MGET независимо от количества пользователей
+    (в кластере - одним MGET на каждый узел).
+
+    :param user_ids: ID пользователей.
+    :return: Множество ID пользователей онлайн.
+    """
+    if not user_ids:
+        return set()
+    keys = [online_key(user_id) for user_id in user_ids]
+    if is_cluster():
+        values = await redis_client.mget_nonatomic(keys)
+    else:
+        values = await redis_client.mget(keys)
+    return {user_id for user_id, value in zip(user_ids, values) if value is not None}
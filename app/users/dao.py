@@ -1,12 +1,30 @@
-from sqlalchemy import select
+from typing import List
+
+from sqlalchemy import update
+
 from app.dao.base import BaseDAO
+from app.dao.cache import cached
+from app.dao.routing import write_session
 from app.users.models import User
-from app.database import async_session_maker
 
 
 class UsersDAO(BaseDAO):
     model = User
 
+    @classmethod
+    @cached("users")
+    async def find_directory(cls):
+        """
+        Возвращает справочник пользователей: только ID и имя, без ORM-объектов.
+
+        Результат кэшируется и сбрасывается при записи в таблицу users через BaseDAO.
+
+        Возвращает:
+            Список словарей {"id", "name"}, упорядоченный по ID.
+        """
+        rows = await cls.find_all_projected(("id", "name"), order_by=("id",))
+        return [row._asdict() for row in rows]
+
     @classmethod
     async def set_notification_sent(cls, user_id: int, sent: bool):
         """
@@ -15,8 +33,63 @@ class UsersDAO(BaseDAO):
         Аргументы:
             user_id: Идентификатор пользователя.
             sent: Значение, которое будет установлено для поля notification_sent.
+
+        Возвращает:
+            Количество измененных записей: 0, если флаг уже имел это значение.
+        """
+        # Строка не перезаписывается, если флаг не меняется (история опрашивается
+        # каждую секунду). Служебная запись не привязывает чтения к основной базе.
+        query = (
+            update(cls.model)
+            .where(
+                cls.model.id == user_id,
+                cls.model.notification_sent.is_distinct_from(sent),
+            )
+            .values(notification_sent=sent)
+            .execution_options(synchronize_session=False)
+        )
+        async with write_session(sticky=False) as session:
+            async with session.begin():
+                result = await session.execute(query)
+                return result.rowcount
+
+    @classmethod
+    async def claim_notifications(cls, user_ids: List[int]) -> List[int]:
+        """
+        Атомарно отмечает, что пользователям отправлено уведомление.
+
+        Одним запросом выставляет notification_sent только тем, у кого флаг еще
+        не стоит, и возвращает их ID. Параллельные отправки не уведомят
+        пользователя дважды.
+
+        Аргументы:
+            user_ids: ID пользователей, которым нужно уведомление.
+
+        Возвращает:
+            ID пользователей, которым уведомление нужно отправить сейчас.
+        """
+        if not user_ids:
+            return []
+        async with write_session(sticky=False) as session:
+            async with session.begin():
+                result = await session.execute(cls.claim_notifications_query(user_ids))
+                return list(result.scalars())
+
+    @classmethod
+    def claim_notifications_query(cls, user_ids: List[int]):
+        """
+        Запрос claim_notifications для выполнения в чужой транзакции (relay outbox).
         """
-        return await cls.update(filter_by={"id": user_id}, notification_sent=sent)
+        return (
+            update(cls.model)
+            .where(
+                cls.model.id.in_(user_ids),
+                cls.model.notification_sent.is_not(True),
+            )
+            .values(notification_sent=True)
+            .returning(cls.model.id)
+            .execution_options(synchronize_session=False)
+        )
 
     @classmethod
     async def is_notification_sent(cls, user_id: int) -> bool:
@@ -30,7 +103,4 @@ class UsersDAO(BaseDAO):
             bool: True, если уведомление было отправлено, иначе False.
                 Если пользователь не найден, возвращает None.
         """
-        async with async_session_maker() as session:
-            query = select(cls.model.notification_sent).where(cls.model.id == user_id)
-            result = await session.execute(query)
-            return result.scalar_one_or_none()
+        return await cls.find_value("notification_sent", id=user_id)
@@ -4,12 +4,14 @@ from jose import jwt, JWTError
 from fastapi import Request, HTTPException, status, Depends
 
 from app.config import get_auth_data
+from app.dao.routing import bind_user
 from app.exceptions import (
     TokenExpiredException,
     NoJwtException,
     NoUserIdException,
     TokenNoFoundException,
 )
+from app.redis.keys import session_key
 from app.redis.redis_client import redis_client
 from app.users.dao import UsersDAO
 
@@ -28,16 +30,21 @@ def get_token(request: Request):
     return token
 
 
-async def get_current_user(token: str = Depends(get_token)):
+async def get_current_user_id(token: str = Depends(get_token)) -> int:
     """
-    Декодирует JWT токен и возвращает текущего аутентифицированного пользователя.
+    Декодирует JWT токен, проверяет сессию в Redis и возвращает ID пользователя.
+
+    Не обращается к базе данных, поэтому подходит для горячих эндпоинтов,
+    которым нужен только идентификатор текущего пользователя.
 
     :param token: JWT токен, полученный через Depends.
-    :return: Объект пользователя, если аутентификация успешна.
+    :return: ID аутентифицированного пользователя.
     :raises NoJwtException: Если токен не удалось декодировать.
     :raises TokenExpiredException: Если срок действия токена истек или токен не найден в Redis.
     :raises NoUserIdException: Если идентификатор пользователя отсутствует в payload токена.
     """
+    if not token:
+        raise TokenNoFoundException
     try:
         auth_data = get_auth_data()
         payload = jwt.decode(
@@ -56,16 +63,29 @@ async def get_current_user(token: str = Depends(get_token)):
         raise NoUserIdException
 
     # Проверка токена в Redis
-    redis_key = f"session:{user_id}"
+    redis_key = session_key(int(user_id))
     stored_token = await redis_client.get(redis_key)
 
     if stored_token is None:
-        raise TokenExpiredException("Session expired or not found")
+        raise TokenExpiredException
 
     # Обновление срока действия токена в Redis
     await redis_client.set(redis_key, token, ex=3600)
 
-    user = await UsersDAO.find_one_or_none_by_id(int(user_id))
+    # Чтения этого запроса учитывают недавние записи пользователя (реплики)
+    bind_user(int(user_id))
+    return int(user_id)
+
+
+async def get_current_user(user_id: int = Depends(get_current_user_id)):
+    """
+    Возвращает текущего аутентифицированного пользователя.
+
+    :param user_id: ID пользователя, полученный через Depends.
+    :return: Объект пользователя, если аутентификация успешна.
+    :raises NoUserIdException: Если пользователь не найден.
+    """
+    user = await UsersDAO.find_one_or_none_by_id(user_id)
     if not user:
         raise NoUserIdException
     return user
@@ -1,18 +1,26 @@
 import secrets
+from datetime import timedelta
 from typing import List
 
 from fastapi import APIRouter, Depends, Response
 from fastapi.requests import Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.templating import Jinja2Templates
-from fastapi_cache.decorator import cache
+from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
 
+from app.assets.manifest import asset_url
 from app.exceptions import (
     UserAlreadyExistsException,
     NoVerifiOrIncorrectEmailOrPasswordException,
     PasswordMismatchException,
 )
+from app.outbox.events import celery_task
+from app.rate_limit import rate_limit_by_ip
+from app.redis.keys import online_key, session_key
 from app.redis.redis_client import redis_client
+from app.redis.watermarks import bump_users_version, get_users_version
+from app.responses import ETAG_CACHE_HEADERS, etag_matches, not_modified, weak_etag
 from app.telegram.dao import TelegramUsersDAO
 from app.users.auth import get_password_hash, authenticate_user, create_access_token
 from app.users.dao import UsersDAO
@@ -25,18 +33,27 @@ from app.config import settings
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_url"] = asset_url
 
 
-@router.get("/users", response_model=List[UserRead])
-@cache(expire=60)  # Кэширование результатов запроса на 1 минуту
-async def get_users():
+@router.get("/users", response_model=List[UserRead], response_class=ORJSONResponse)
+async def get_users(request: Request, response: Response):
     """
     Получение списка всех пользователей.
 
+    Ответ помечается слабым ETag по версии справочника. При совпадении
+    If-None-Match возвращается 304 после одного обращения к Redis. Сам
+    справочник берется из кэша DAO, который сбрасывается при записи в users.
+
     :return: Список пользователей с их ID и именами.
     """
-    users_all = await UsersDAO.find_all()
-    return [{"id": user.id, "name": user.name} for user in users_all]
+    version = await get_users_version()
+    etag = weak_etag("u", version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers.update({"ETag": etag, **ETAG_CACHE_HEADERS})
+    return await UsersDAO.find_directory()
 
 
 @router.get("/", response_class=HTMLResponse, summary="Страница авторизации")
@@ -50,7 +67,7 @@ async def get_auth_page(request: Request):
     return templates.TemplateResponse("auth.html", {"request": request})
 
 
-@router.post("/register/")
+@router.post("/register/", dependencies=[Depends(rate_limit_by_ip("register"))])
 async def register_user(user_data: UserRegister) -> dict:
     """
     Регистрация нового пользователя.
@@ -60,38 +77,51 @@ async def register_user(user_data: UserRegister) -> dict:
     :raises UserAlreadyExistsException: Если пользователь с таким email уже существует.
     :raises PasswordMismatchException: Если пароли не совпадают.
     """
-    user = await UsersDAO.find_one_or_none(email=user_data.email)
-    if user:
+    if await UsersDAO.find_value("id", email=user_data.email) is not None:
         raise UserAlreadyExistsException
 
     if user_data.password != user_data.password_check:
         raise PasswordMismatchException("Пароли не совпадают")
 
-    hashed_password = get_password_hash(user_data.password)
-    await UsersDAO.add(
+    hashed_password = await run_in_threadpool(get_password_hash, user_data.password)
+    user = await UsersDAO.add(
         name=user_data.name, email=user_data.email, hashed_password=hashed_password
     )
-
-    user = await UsersDAO.find_one_or_none(email=user_data.email)
+    await bump_users_version()
 
     # Генерируем токен для верификации
     token = secrets.token_hex(16)
-    await TelegramUsersDAO.add(email=user_data.email, token=token, main_user_id=user.id)
-
     tg_url = settings.TG_URL
     verification_message = (
         f"Перейдите по ссылке {tg_url} в ТГ бот для верификации и нажмите команду 'Старт'. "
-        f"Ваш персональный токен для верификации: {token}"
+        f"Ваш персональный токен для верификации: {token}. "
+        f"Токен действителен {settings.VERIFICATION_TOKEN_TTL // 3600} ч."
     )
 
-    send_email.delay(user_data.email, "Подтверждение регистрации", verification_message)
+    # Письмо сохраняется в outbox в одной транзакции с токеном: оно уходит,
+    # только если токен записан, и публикуется relay без ожидания брокера
+    await TelegramUsersDAO.add(
+        outbox=[
+            celery_task(
+                send_email,
+                user_data.email,
+                "Подтверждение регистрации",
+                verification_message,
+            )
+        ],
+        email=user_data.email,
+        token=token,
+        token_expires_at=func.now()
+        + timedelta(seconds=settings.VERIFICATION_TOKEN_TTL),
+        main_user_id=user.id,
+    )
 
     return {
         "message": "Вы успешно зарегистрированы! Проверьте свою почту для подтверждения."
     }
 
 
-@router.post("/login/")
+@router.post("/login/", dependencies=[Depends(rate_limit_by_ip("login"))])
 async def auth_user(response: Response, user_data: UserAuth):
     """
     Авторизация пользователя.
@@ -107,11 +137,12 @@ async def auth_user(response: Response, user_data: UserAuth):
 
     access_token = create_access_token({"sub": str(check.id)})
 
-    # Сохраняем сессионный токен в Redis
-    redis_key = f"session:{check.id}"
-    await redis_client.set(redis_key, access_token, ex=3600)
-    # Сохраняем информацию о том, что пользователь онлайн
-    await redis_client.set(f"online:{check.id}", "true", ex=3600)
+    # Сохраняем сессионный токен и информацию о том, что пользователь онлайн,
+    # за один обмен с Redis
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.set(session_key(check.id), access_token, ex=3600)
+    pipe.set(online_key(check.id), "true", ex=3600)
+    await pipe.execute()
 
     response.set_cookie(key="users_access_token", value=access_token, httponly=True)
     return {
@@ -132,12 +163,9 @@ async def logout_user(
     :param response: Объект ответа FastAPI для удаления cookies.
     :return: Сообщение об успешном выходе.
     """
-    # Удаляем сессионный токен из Redis
-    redis_key = f"session:{current_user.id}"
-    await redis_client.delete(redis_key)
-    # Удаляем информацию о том, что пользователь онлайн
-    online_key = f"online:{current_user.id}"
-    await redis_client.delete(online_key)
+    # Удаляем сессионный токен и информацию о том, что пользователь онлайн
+    # (в кластере ключи пользователя в одном слоте, DEL выполняется одной командой)
+    await redis_client.delete(session_key(current_user.id), online_key(current_user.id))
 
     response.delete_cookie(key="users_access_token")
     return {"message": "Пользователь успешно вышел из системы"}
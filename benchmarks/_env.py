@@ -0,0 +1,26 @@
+"""
+Минимальное окружение для запуска бенчмарков без файла .env.
+
+Значения подставляются только для переменных, которые не заданы явно,
+поэтому бенчмарки можно запускать и против настоящих сервисов.
+"""
+import os
+
+DEFAULTS = {
+    "DATABASE_URL": "sqlite+aiosqlite:///./bench.sqlite3",
+    "SECRET_KEY": "bench",
+    "ALGORITHM": "HS256",
+    "TG_TOKEN": "42:bench",
+    "TG_URL": "t.me/bench",
+    "CELERY_BROKER_URL": "redis://localhost:6379/0",
+    "REDIS_URL": "redis://localhost:6379/0",
+    "SMTP_SERVER": "localhost",
+    "SMTP_PORT": "25",
+    "SMTP_USER": "bench",
+    "SMTP_PASSWORD": "bench",
+    "SHOW_WITH_NGROK": "false",
+    "NGROK_AUTH_TOKEN": "bench",
+}
+
+for key, value in DEFAULTS.items():
+    os.environ.setdefault(key, value)
@@ -0,0 +1,96 @@
+"""
+Бенчмарк сообщений задач Celery: формат, сжатие и хранение результатов.
+
+Для каждого варианта сериализации (json, msgpack, с zlib и без) публикует
+задачи уведомления в отдельную очередь Redis без воркеров и выводит скорость
+публикации, размер одного сообщения и память очереди в брокере. Затем
+сохраняет столько же результатов задач, как делал прежний result_backend,
+и выводит занятую ими память.
+
+Нужен запущенный Redis (CELERY_BROKER_URL). Запуск из корня репозитория:
+
+    python -m benchmarks.celery_tasks --tasks 20000
+"""
+import argparse
+import os
+import time
+import uuid
+
+from benchmarks import _env  # noqa: F401
+
+import redis
+from celery import Celery
+
+VARIANTS = (
+    ("json", None),
+    ("json", "zlib"),
+    ("msgpack", None),
+    ("msgpack", "zlib"),
+)
+TASK_NAME = "app.celery.tasks.send_telegram_notification"
+MESSAGE = "У вас новое непрочитанное сообщение в mychat."
+
+
+def make_app(broker_url: str, serializer: str, compression, result_backend=None) -> Celery:
+    app = Celery("bench", broker=broker_url, backend=result_backend)
+    app.conf.update(
+        task_serializer=serializer,
+        result_serializer=serializer,
+        accept_content=["json", "msgpack"],
+        task_compression=compression,
+    )
+    return app
+
+
+def bench_publish(broker_url: str, client: redis.Redis, serializer: str, compression, count: int):
+    app = make_app(broker_url, serializer, compression)
+    queue = f"bench.{serializer}.{compression or 'plain'}"
+    client.delete(queue)
+
+    start = time.perf_counter()
+    with app.producer_or_acquire() as producer:
+        for i in range(count):
+            app.send_task(
+                TASK_NAME, args=(i, MESSAGE), queue=queue, producer=producer, countdown=60
+            )
+    elapsed = time.perf_counter() - start
+
+    message_size = len(client.lindex(queue, 0) or b"")
+    queue_memory = client.memory_usage(queue, samples=0) or 0
+    client.delete(queue)
+    name = f"{serializer}+{compression}" if compression else serializer
+    print(
+        f"{name:<14} {count / elapsed:>9.0f} tasks/s  message {message_size:>5} B  "
+        f"queue {queue_memory / 1024:>9.0f} KiB"
+    )
+
+
+def bench_results(broker_url: str, client: redis.Redis, count: int):
+    app = make_app(broker_url, "json", None, result_backend=broker_url)
+    task_ids = [f"bench-{uuid.uuid4()}" for _ in range(count)]
+    before = client.info("memory")["used_memory"]
+    for task_id in task_ids:
+        app.backend.store_result(task_id, None, "SUCCESS")
+    used = client.info("memory")["used_memory"] - before
+    for start in range(0, count, 1000):
+        client.delete(
+            *[app.backend.get_key_for_task(task_id) for task_id in task_ids[start:start + 1000]]
+        )
+    print(f"{'results':<14} {count} task results kept in Redis: {used / 1024:.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=20_000)
+    parser.add_argument("--broker", default=os.environ["CELERY_BROKER_URL"])
+    args = parser.parse_args()
+
+    client = redis.Redis.from_url(args.broker)
+    print(f"tasks: {args.tasks}")
+    for serializer, compression in VARIANTS:
+        bench_publish(args.broker, client, serializer, compression, args.tasks)
+    bench_results(args.broker, client, args.tasks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Локальная заглушка Telegram Bot API.
+
+Отвечает на методы, которые использует бот (getMe, setWebhook, deleteWebhook,
+getUpdates, sendMessage), и запоминает все вызовы. Позволяет запускать бота и
+нагрузочные тесты уведомлений без обращения к api.telegram.org:
+
+    python -m benchmarks.fake_telegram_api --port 8082
+    TG_API_URL=http://localhost:8082 python -m app.telegram.runner
+
+Список принятых вызовов доступен по GET /_calls.
+"""
+import argparse
+import asyncio
+import time
+
+from aiohttp import web
+
+
+calls = []
+
+
+def ok(result):
+    return web.json_response({"ok": True, "result": result})
+
+
+async def handle_method(request: web.Request):
+    method = request.match_info["method"]
+    if request.content_type == "application/json":
+        params = await request.json()
+    else:
+        params = dict(await request.post())
+    calls.append({"method": method, "params": params, "ts": time.time()})
+
+    if method == "getMe":
+        return ok(
+            {"id": 42, "is_bot": True, "first_name": "mychat", "username": "mychat_bot"}
+        )
+    if method == "getUpdates":
+        # Имитация long polling без новых обновлений
+        await asyncio.sleep(min(float(params.get("timeout", 0) or 0), 1))
+        return ok([])
+    if method == "sendMessage":
+        return ok(
+            {
+                "message_id": len(calls),
+                "date": int(time.time()),
+                "chat": {"id": int(params["chat_id"]), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        )
+    return ok(True)
+
+
+async def handle_calls(request: web.Request):
+    return web.json_response(calls)
+
+
+def create_app() -> web.Application:
+    application = web.Application()
+    application.router.add_get("/_calls", handle_calls)
+    application.router.add_route("*", "/bot{token}/{method}", handle_method)
+    return application
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
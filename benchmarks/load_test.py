@@ -0,0 +1,156 @@
+"""
+Нагрузочный тест HTTP: прежний запуск uvicorn против python -m app.serve.
+
+По очереди запускает сервер каждым способом на свободном порту, ждет ответа
+на --path и нагружает его из нескольких клиентских процессов (aiohttp) в
+течение --duration секунд. Выводит запросы в секунду, p50 и p99 задержки и
+число ошибок. По умолчанию запрашивается страница авторизации: она не
+обращается к базе данных, и тест измеряет сам сервер.
+
+Запуск из корня репозитория (нужен Redis из REDIS_URL):
+
+    python -m benchmarks.load_test --duration 10 --concurrency 64 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import quantiles
+from typing import List, Tuple
+
+from benchmarks import _env  # noqa: F401
+
+import aiohttp
+
+LAUNCHERS = ("uvicorn", "serve")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_command(launcher: str, port: int, workers: int) -> List[str]:
+    if launcher == "uvicorn":
+        # Прежняя команда docker-compose без --reload
+        return [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+            "--ws", "websockets", "--ws-per-message-deflate", "true",
+        ]
+    return [
+        sys.executable, "-m", "app.serve", "--port", str(port), "--workers", str(workers),
+    ]
+
+
+async def wait_ready(url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url) as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start in {timeout} s")
+
+
+async def hammer(url: str, concurrency: int, duration: float) -> Tuple[List[float], int]:
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async def client(session):
+        nonlocal errors
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                async with session.get(url) as response:
+                    await response.read()
+                    if response.status >= 500:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def run_client(url: str, concurrency: int, duration: float) -> Tuple[List[float], int]:
+    return asyncio.run(hammer(url, concurrency, duration))
+
+
+def measure(launcher: str, args) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{args.path}"
+    env = {**os.environ, "TG_MODE": "off", "SHOW_WITH_NGROK": "false"}
+    server = subprocess.Popen(
+        server_command(launcher, port, args.workers),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    try:
+        asyncio.run(wait_ready(url, args.startup_timeout))
+        per_process = max(1, args.concurrency // args.client_processes)
+        started = time.perf_counter()
+        with ProcessPoolExecutor(args.client_processes) as pool:
+            results = list(
+                pool.map(
+                    run_client,
+                    [url] * args.client_processes,
+                    [per_process] * args.client_processes,
+                    [args.duration] * args.client_processes,
+                )
+            )
+        elapsed = time.perf_counter() - started
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait(timeout=60)
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    cuts = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "launcher": launcher,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": cuts[49] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "errors": sum(result[1] for result in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--path", default="/auth/")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--client-processes", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=0, help="Воркеры app.serve, 0 - по ядрам")
+    parser.add_argument("--launchers", nargs="+", choices=LAUNCHERS, default=list(LAUNCHERS))
+    parser.add_argument("--startup-timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    for launcher in args.launchers:
+        result = measure(launcher, args)
+        print(
+            f"{result['launcher']:<8} {result['rps']:>9.1f} req/s  "
+            f"p50 {result['p50_ms']:>7.1f} ms  p99 {result['p99_ms']:>7.1f} ms  "
+            f"errors {result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Бенчмарк задержки event loop при проверке паролей bcrypt.
+
+Запускает сторож задержки (app/observability/loop_lag.py) и параллельно
+выполняет проверки пароля, как при одновременных входах пользователей:
+сначала прямо в event loop, затем в пуле потоков. Выводит p50, p99 и
+максимум задержки loop и количество зафиксированных блокировок.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.loop_lag --logins 50 --concurrency 10
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import _env  # noqa: F401
+
+from starlette.concurrency import run_in_threadpool
+
+from app.observability.loop_lag import LoopLagMonitor
+from app.users.auth import get_password_hash, verify_password
+
+PASSWORD = "bench-password"
+
+
+async def run(hashed: str, logins: int, concurrency: int, offload: bool, monitor_args):
+    monitor = LoopLagMonitor(*monitor_args)
+    monitor.start()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            if offload:
+                await run_in_threadpool(verify_password, PASSWORD, hashed)
+            else:
+                verify_password(PASSWORD, hashed)
+            # Передаем управление loop, как при обращении к базе после проверки
+            await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    # Даем сторожу сделать последний тик после нагрузки
+    await asyncio.sleep(monitor.interval * 2)
+    await monitor.stop()
+
+    lag = monitor.histogram.as_dict()
+    name = "threadpool" if offload else "inline"
+    print(
+        f"{name:<11} {logins / elapsed:>7.1f} logins/s  lag p50 <= {lag['p50_ms']:>6.0f} ms  "
+        f"p99 <= {lag['p99_ms']:>6.0f} ms  max {lag['max_ms']:>7.1f} ms  stalls {monitor.stalls}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--interval-ms", type=float, default=10)
+    parser.add_argument("--threshold-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    hashed = get_password_hash(PASSWORD)
+    # Стеки не снимаются: в бенчмарке интересна только задержка
+    monitor_args = (args.interval_ms, args.threshold_ms, float("inf"))
+    print(f"logins: {args.logins}, concurrency: {args.concurrency}")
+    for offload in (False, True):
+        asyncio.run(run(hashed, args.logins, args.concurrency, offload, monitor_args))
+
+
+if __name__ == "__main__":
+    main()
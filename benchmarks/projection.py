@@ -0,0 +1,95 @@
+"""
+Бенчмарк проекций BaseDAO на больших выборках.
+
+Сравнивает find_all (ORM-объекты с инструментированием и identity map) с
+find_all_projected (namedtuple из выбранных колонок). Для каждого варианта
+выводит лучшее время, время и пиковую память на строку.
+
+По умолчанию использует SQLite (нужен aiosqlite), база заполняется при
+первом запуске. Запуск из корня репозитория:
+
+    python -m benchmarks.projection --rows 100000 --repeat 5
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from benchmarks import _env  # noqa: F401
+
+from sqlalchemy import func, insert, select
+
+from app.chat.models import Message  # noqa: F401 - регистрирует таблицу в metadata
+from app.database import Base, async_session_maker, engine
+from app.telegram.models import TelegramUser  # noqa: F401
+from app.rooms.models import Room  # noqa: F401
+from app.users.dao import UsersDAO
+from app.users.models import User
+
+
+async def prepare(rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session_maker() as session:
+        existing = await session.scalar(select(func.count()).select_from(User))
+        if existing >= rows:
+            return
+        async with session.begin():
+            await session.execute(
+                insert(User),
+                [
+                    {
+                        "name": f"user{i}",
+                        "email": f"user{i}@example.com",
+                        "hashed_password": "x" * 60,
+                        "is_verified": True,
+                        "notification_sent": False,
+                    }
+                    for i in range(existing, rows)
+                ],
+            )
+
+
+async def measure(name: str, fetch, repeat: int):
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(await fetch())
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = await fetch()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    print(
+        f"{name:<10} {count:>8} rows {best * 1000:>9.1f} ms "
+        f"{best / count * 1e6:>7.2f} us/row  peak {peak / 1024:>9.0f} KiB "
+        f"{peak / count:>7.0f} B/row"
+    )
+
+
+async def run(rows: int, repeat: int):
+    await prepare(rows)
+    await measure("orm", UsersDAO.find_all, repeat)
+    await measure(
+        "projected",
+        lambda: UsersDAO.find_all_projected(("id", "name"), order_by=("id",)),
+        repeat,
+    )
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Наполнение базы тестовыми пользователями и сообщениями.
+
+Пользователи создаются через BaseDAO.insert_many, сообщения загружаются
+через COPY (MessagesDAO.copy_messages). Все пользователи верифицированы и
+имеют пароль из --password, поэтому подходят для нагрузочных тестов.
+Схема должна быть создана миграциями (alembic upgrade head).
+
+Запуск из корня репозитория против PostgreSQL из .env:
+
+    python -m benchmarks.seed --users 1000 --messages 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.chat.dao import MessagesDAO
+from app.database import engine
+from app.redis.watermarks import bump_users_version
+from app.users.auth import get_password_hash
+from app.users.dao import UsersDAO
+
+
+def generate_messages(user_ids, count: int, seed: int):
+    rng = random.Random(seed)
+    for i in range(count):
+        sender_id, recipient_id = rng.sample(user_ids, 2)
+        yield sender_id, recipient_id, f"Сообщение {i}: " + "x" * rng.randint(0, 200)
+
+
+async def run(args):
+    hashed_password = get_password_hash(args.password)
+    prefix = args.email_prefix
+
+    start = time.perf_counter()
+    users = await UsersDAO.insert_many(
+        (
+            {
+                "name": f"{prefix}{i}",
+                "email": f"{prefix}{i}@example.com",
+                "hashed_password": hashed_password,
+                "is_verified": True,
+            }
+            for i in range(args.users)
+        ),
+        returning=("id",),
+    )
+    await bump_users_version()
+    print(f"users: {len(users)} in {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    user_ids = [user.id for user in users]
+    count = await MessagesDAO.copy_messages(
+        generate_messages(user_ids, args.messages, args.seed)
+    )
+    elapsed = time.perf_counter() - start
+    print(f"messages: {count} in {elapsed:.1f} s ({count / elapsed:.0f} rows/s)")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--email-prefix", default="loadtest")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if args.users < 2:
+        parser.error("--users must be at least 2")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
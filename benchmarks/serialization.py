@@ -0,0 +1,116 @@
+"""
+Микробенчмарк сериализации истории сообщений.
+
+Сравнивает стандартный путь FastAPI (ORM-объекты -> валидация pydantic ->
+jsonable_encoder -> json.dumps) с быстрым путем (кортежи проекции -> orjson)
+и с потоковой отдачей NDJSON. Для каждого варианта выводит пропускную
+способность в МБ/с, пиковое потребление памяти за вызов и количество блоков
+памяти, занятых к моменту возврата результата.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.serialization --rows 100000 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from typing import List
+
+from benchmarks import _env  # noqa: F401
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.chat.models import Message
+from app.chat.schemas import MessageRead
+from app.chat.dao import MessagesDAO
+from app.responses import iter_ndjson, rows_to_dicts
+
+import orjson
+
+
+def make_rows(count: int):
+    return [
+        (i, i % 50, (i + 1) % 50, f"Сообщение номер {i} " + "x" * (i % 120))
+        for i in range(1, count + 1)
+    ]
+
+
+def make_orm_messages(rows):
+    return [
+        Message(id=i, sender_id=s, recipient_id=r, content=c) for i, s, r, c in rows
+    ]
+
+
+def default_path(messages) -> bytes:
+    # То же, что делает FastAPI для response_model=List[MessageRead] + JSONResponse
+    adapter = TypeAdapter(List[MessageRead])
+    validated = adapter.validate_python(messages, from_attributes=True)
+    content = jsonable_encoder(validated)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def orjson_path(rows) -> bytes:
+    return orjson.dumps(rows_to_dicts(MessagesDAO.read_fields, rows))
+
+
+def ndjson_path(rows) -> int:
+    async def source():
+        for row in rows:
+            yield row
+
+    async def consume():
+        total = 0
+        async for chunk in iter_ndjson(MessagesDAO.read_fields, source()):
+            total += len(chunk)
+        return total
+
+    return asyncio.run(consume())
+
+
+def measure(name: str, func, payload, repeat: int):
+    size = 0
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(payload)
+        best = min(best, time.perf_counter() - start)
+        size = result if isinstance(result, int) else len(result)
+
+    # Пиковая память за вызов и количество блоков, которые удерживает результат
+    tracemalloc.start()
+    result = func(payload)
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    del result
+
+    mb_per_s = size / best / 1024 / 1024
+    print(
+        f"{name:<10} {size / 1024:>10.0f} KiB {best * 1000:>9.1f} ms "
+        f"{mb_per_s:>9.1f} MiB/s  peak {peak / 1024:>9.0f} KiB  blocks {blocks}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    messages = make_orm_messages(rows)
+
+    print(f"rows: {args.rows}")
+    measure("default", default_path, messages, args.repeat)
+    measure("orjson", orjson_path, rows, args.repeat)
+    measure("ndjson", ndjson_path, rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Отчет о времени запуска API и воркера Celery.
+
+1. Разбивка времени импорта (python -X importtime) по пакетам верхнего уровня.
+2. Время до первого обслуженного запроса: от запуска uvicorn до первого ответа.
+
+Результат можно сохранить в JSON и сравнивать между коммитами как регрессионный
+бенчмарк; с --max-import-ms скрипт завершается с ошибкой при превышении порога:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --module app.celery.tasks --skip-serve
+    python -m benchmarks.startup --json startup.json --max-import-ms 1500
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+from benchmarks import _env
+
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\s*)(\S+)")
+
+
+def bench_env() -> dict:
+    env = dict(os.environ)
+    for key, value in _env.DEFAULTS.items():
+        env.setdefault(key, value)
+    return env
+
+
+def import_breakdown(module: str) -> dict:
+    """
+    Импортирует модуль в отдельном процессе и суммирует собственное время
+    импорта модулей по пакетам верхнего уровня.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=bench_env(),
+    )
+    if completed.returncode != 0:
+        raise SystemExit(completed.stderr)
+
+    packages = defaultdict(int)
+    total_us = 0
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        packages[name.split(".")[0]] += int(self_us)
+        if name == module:
+            total_us = int(cumulative_us)
+    top = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "packages_ms": {name: round(us / 1000, 1) for name, us in top},
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(app: str, path: str, timeout: float) -> float:
+    """
+    Запускает uvicorn и измеряет время до первого ответа на path, в миллисекундах.
+    """
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        env=bench_env(),
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1)
+                return round((time.perf_counter() - started) * 1000, 1)
+            except urllib.error.HTTPError:
+                # Любой HTTP-ответ означает, что приложение обслуживает запросы
+                return round((time.perf_counter() - started) * 1000, 1)
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                if process.poll() is not None:
+                    raise SystemExit("uvicorn exited before serving a request")
+                time.sleep(0.02)
+        raise SystemExit(f"No response from {app} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--app", default="app.main:app")
+    parser.add_argument("--path", default="/openapi.json")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--skip-serve", action="store_true")
+    parser.add_argument("--json", dest="json_path")
+    parser.add_argument("--max-import-ms", type=float)
+    args = parser.parse_args()
+
+    report = import_breakdown(args.module)
+    print(f"import {report['module']}: {report['total_ms']} ms")
+    for name, ms in list(report["packages_ms"].items())[: args.top]:
+        print(f"  {name:<24} {ms:>8.1f} ms")
+
+    if not args.skip_serve:
+        report["first_request_ms"] = time_to_first_request(
+            args.app, args.path, args.timeout
+        )
+        print(f"time to first request ({args.app}): {report['first_request_ms']} ms")
+
+    if args.json_path:
+        with open(args.json_path, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.max_import_ms is not None and report["total_ms"] > args.max_import_ms:
+        raise SystemExit(
+            f"import time {report['total_ms']} ms exceeds {args.max_import_ms} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+#!/bin/bash
+# Реплика для локального стенда: при первом запуске копирует основную базу
+# через pg_basebackup (-R создает standby.signal), затем работает как hot standby.
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_isready -h db -U "$POSTGRES_USER"; do
+        sleep 1
+    done
+    mkdir -p "$PGDATA"
+    chown postgres:postgres "$PGDATA"
+    chmod 700 "$PGDATA"
+    PGPASSWORD="$POSTGRES_PASSWORD" gosu postgres \
+        pg_basebackup -h db -U "$POSTGRES_USER" -D "$PGDATA" -X stream -R
+fi
+
+exec gosu postgres postgres -c hot_standby=on